@@ -166,5 +166,4 @@ class ComboImpl(_ActionInterface):
         self.name = name
 
 
-# map each action to other actions as well as it's similarity to that other action
-action_ambiguity_map = None
+# the similarity of every action to every other action is perception.ACTION_AMBIGUITY
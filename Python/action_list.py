@@ -22,6 +22,10 @@ Tag = {
     "NON_CONTACT": ReactionTag(),
     "CONTACT": ReactionTag(),
     "RETURN": ReactionTag(),
+    # closes the distance to the opponent
+    "STEP": ReactionTag(),
+    # opens the distance to the opponent
+    "PUSH": AttackTag(),
 }
 
 
@@ -84,7 +88,7 @@ Movement = {
         weight_distribution_necessity=0,
         likely_vulnerabilites_after_execution=[],
         range=Range.NULL,
-        tags=[Tag["QUICK"]],
+        tags=[Tag["QUICK"], Tag["STEP"]],
         name="step",
     ),
     "STEP_ACROSS_BODY": ReactionImpl(
@@ -104,8 +108,7 @@ Combo = {
 }
 
 
-# map each action to other actions as well as it's similarity to that other action
-action_ambiguity_map = None
+# the similarity of every action to every other action is perception.ACTION_AMBIGUITY
 
 
 BasicAttackPack = {}
@@ -0,0 +1,239 @@
+"""
+Compiled form of the action catalog in action_list.py. Every action gets a dense integer
+id (also stored on the action as action.id) and its properties are laid out in numpy
+arrays indexed by that id, so candidates can be filtered and scored with array
+operations instead of attribute lookups on the action objects.
+
+Per action arrays (A = number of actions):
+    kind                int8    (A,)    ATTACK, REACTION or COMBO
+    body_part_mask      uint8   (A,)    bit (1 << BodyPart) set for every body part
+    target_locations    int16   (A, 6)  Location id per BodyPart, -1 if unused
+    tag_bits            uint64  (A,)    bit (1 << ActionTag.id) set for every tag
+    range               int8    (A,)    Range value
+    init_weight         float64 (A, 2)  init weight distribution
+    final_weight        float64 (A, 2)  final weight distribution
+    weight_necessity    float64 (A,)
+    vulnerability_bits  uint64  (A,)    bit (1 << Location id) per likely vulnerability
+    components          int32   (A, N)  ids of a combo's actions, -1 padded. A plain
+                                        action is its own only component
+"""
+
+import sys
+import os
+
+dir = os.path.dirname(__file__)
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+from common import _LocationImpl
+from action import ActionTag, AttackImpl, ComboImpl
+import action_list
+
+NUM_BODY_PARTS = 6
+ATTACK = 0
+REACTION = 1
+COMBO = 2
+
+
+def body_part_bit(body_part):
+    return np.uint8(1 << body_part)
+
+
+def tag_bits(tags):
+    bits = np.uint64(0)
+    for tag in tags:
+        bits |= np.uint64(1 << tag.id)
+    return bits
+
+
+def location_bits(locations):
+    bits = np.uint64(0)
+    for location in locations:
+        bits |= np.uint64(1 << location)
+    return bits
+
+
+# number of bits set in every element of the uint64 array <bits>
+def popcount(bits):
+    bits = np.ascontiguousarray(bits, dtype=np.uint64)
+    bytes_ = bits.view(np.uint8).reshape(bits.shape + (8,))
+    return np.unpackbits(bytes_, axis=-1).sum(axis=-1, dtype=np.int64)
+
+
+class ActionTable:
+    def __init__(self, actions=()):
+        self.actions = []
+        self.names = []
+        self._name_to_id = {}
+        self._max_components = 1
+
+        self.kind = np.empty(0, dtype=np.int8)
+        self.body_part_mask = np.empty(0, dtype=np.uint8)
+        self.target_locations = np.empty((0, NUM_BODY_PARTS), dtype=np.int16)
+        self.tag_bits = np.empty(0, dtype=np.uint64)
+        self.range = np.empty(0, dtype=np.int8)
+        self.init_weight = np.empty((0, 2))
+        self.final_weight = np.empty((0, 2))
+        self.weight_necessity = np.empty(0)
+        self.vulnerability_bits = np.empty(0, dtype=np.uint64)
+        self.components = np.empty((0, 1), dtype=np.int32)
+        self.add_all(actions)
+
+    def __len__(self):
+        return len(self.actions)
+
+    # compile <actions> and give each its id. A combo's actions are added first
+    def add_all(self, actions):
+        rows = []
+        for action in actions:
+            self._collect(action, rows)
+        if not rows:
+            return
+
+        start = len(self.actions)
+        for action in rows:
+            action.id = len(self.actions)
+            self.actions.append(action)
+            self.names.append(action.name)
+            self._name_to_id.setdefault(action.name, action.id)
+            if isinstance(action, ComboImpl):
+                self._max_components = max(self._max_components, len(action.actions))
+
+        count = len(rows)
+        kind = np.empty(count, dtype=np.int8)
+        body_part_mask = np.zeros(count, dtype=np.uint8)
+        target_locations = np.full((count, NUM_BODY_PARTS), -1, dtype=np.int16)
+        tags = np.zeros(count, dtype=np.uint64)
+        ranges = np.empty(count, dtype=np.int8)
+        init_weight = np.empty((count, 2))
+        final_weight = np.empty((count, 2))
+        weight_necessity = np.empty(count)
+        vulnerability_bits = np.zeros(count, dtype=np.uint64)
+        components = np.full((count, self._max_components), -1, dtype=np.int32)
+        for row, action in enumerate(rows):
+            kind[row] = _kind(action)
+            for body_part, location in action.target_body_locations.items():
+                body_part_mask[row] |= body_part_bit(body_part)
+                target_locations[row, body_part] = location
+            tags[row] = tag_bits(action.tags)
+            ranges[row] = action.range.value
+            init_weight[row] = action.init_weight_distribution
+            final_weight[row] = action.final_weight_distribution
+            weight_necessity[row] = action.weight_distribution_necessity
+            vulnerability_bits[row] = location_bits(
+                action.likely_vulnerabilites_after_execution
+            )
+            if isinstance(action, ComboImpl):
+                ids = [component.id for component in action.actions]
+            else:
+                ids = [start + row]
+            components[row, : len(ids)] = ids
+
+        # earlier rows may need more padding for the longest combo
+        if self.components.shape[1] < self._max_components:
+            padding = self._max_components - self.components.shape[1]
+            self.components = np.pad(
+                self.components, ((0, 0), (0, padding)), constant_values=-1
+            )
+        self.kind = np.concatenate([self.kind, kind])
+        self.body_part_mask = np.concatenate([self.body_part_mask, body_part_mask])
+        self.target_locations = np.concatenate(
+            [self.target_locations, target_locations]
+        )
+        self.tag_bits = np.concatenate([self.tag_bits, tags])
+        self.range = np.concatenate([self.range, ranges])
+        self.init_weight = np.concatenate([self.init_weight, init_weight])
+        self.final_weight = np.concatenate([self.final_weight, final_weight])
+        self.weight_necessity = np.concatenate(
+            [self.weight_necessity, weight_necessity]
+        )
+        self.vulnerability_bits = np.concatenate(
+            [self.vulnerability_bits, vulnerability_bits]
+        )
+        self.components = np.concatenate([self.components, components])
+
+    # actions not compiled yet, components before the combos using them
+    def _collect(self, action, rows):
+        if self.contains(action) or action in rows:
+            return
+        if isinstance(action, ComboImpl):
+            for component in action.actions:
+                self._collect(component, rows)
+        rows.append(action)
+
+    def contains(self, action):
+        action_id = getattr(action, "id", None)
+        return (
+            action_id is not None
+            and action_id < len(self.actions)
+            and self.actions[action_id] is action
+        )
+
+    def id_of_name(self, name):
+        return self._name_to_id[name]
+
+    def component_ids(self, action_id):
+        components = self.components[action_id]
+        return components[components >= 0]
+
+    def has_tag(self, action_id, tag):
+        return bool(self.tag_bits[action_id] & np.uint64(1 << tag.id))
+
+    def involves_part(self, action_id, body_part):
+        return bool(self.body_part_mask[action_id] & body_part_bit(body_part))
+
+    # ids of every action using <body_part>
+    def with_part(self, body_part):
+        return np.nonzero(self.body_part_mask & body_part_bit(body_part))[0]
+
+    # ids of every action that has all of <tags>
+    def with_tags(self, tags):
+        bits = tag_bits(tags)
+        return np.nonzero((self.tag_bits & bits) == bits)[0]
+
+    # Properties a combo of <component_ids> would have, merged with array ops the same
+    # way ComboImpl merges its actions. Lets combo candidates be scored without
+    # building a ComboImpl for each one.
+    # Returns (body part mask, tag bits, range, vulnerability bits, id of the action
+    # whose weight distribution the combo takes)
+    def merge(self, component_ids):
+        ids = np.asarray(component_ids)
+        body_part_mask = np.bitwise_or.reduce(self.body_part_mask[ids])
+        tags = np.bitwise_or.reduce(self.tag_bits[ids])
+        vulnerability_bits = np.bitwise_or.reduce(self.vulnerability_bits[ids])
+        combo_range = self.range[ids].max()
+        # last action with the highest necessity, like ComboImpl's >= comparison
+        necessity = self.weight_necessity[ids]
+        weighted = ids[len(ids) - 1 - np.argmax(necessity[::-1])]
+        return body_part_mask, tags, combo_range, vulnerability_bits, weighted
+
+
+# id of <action>, compiling it into ACTION_TABLE first if it's not part of the catalog
+def action_id(action):
+    if getattr(action, "id", None) is None:
+        ACTION_TABLE.add_all([action])
+    return action.id
+
+
+def _kind(action):
+    if isinstance(action, ComboImpl):
+        return COMBO
+    if isinstance(action, AttackImpl):
+        return ATTACK
+    return REACTION
+
+
+# every action in action_list.py
+def compile_catalog():
+    assert ActionTag.current_id <= 64, "Tag bitsets only hold 64 tags"
+    assert _LocationImpl.current_id <= 64, "Location bitsets only hold 64 locations"
+    return ActionTable(
+        list(action_list.Attack.values())
+        + list(action_list.Reaction.values())
+        + list(action_list.Movement.values())
+        + list(action_list.Combo.values())
+    )
+
+
+ACTION_TABLE = compile_catalog()
@@ -0,0 +1,191 @@
+"""
+Runs many headless fights across a process pool. Every match gets its own seed derived
+from the batch seed and the match's index, so any single match can be replayed on its
+own with replay_match() or `python batch.py matchups.json --replay <index>`.
+With --trace-dir every match is also recorded to <trace dir>/match_<index> (see
+fight_trace.py).
+
+matchups.json holds a list of contestant parameter pairs, each a dict of Contestant
+keyword arguments:
+[
+    [{"name": "Jack", "reaction_time": 6}, {"name": "Jill", "reaction_time": 10}],
+    ...
+]
+"""
+
+import sys
+import os
+
+dir = os.path.dirname(__file__)
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import argparse
+import json
+import multiprocessing
+import numpy as np
+from logger import set_debug_level
+
+DEFAULT_DELTA = 0.1
+DEFAULT_TIME_LIMIT = 1
+
+
+# Outcome of a single match in a batch
+class MatchResult:
+    def __init__(self, index, seed, names, winner):
+        self.index = index
+        self.seed = seed
+        self.names = names
+        self.winner = winner
+
+    def to_dict(self):
+        return {
+            "index": self.index,
+            "seed": self.seed,
+            "names": self.names,
+            "winner": self.winner,
+        }
+
+    def __repr__(self):
+        return f"MatchResult ({self.to_dict()})"
+
+
+# Seed of match <match_index> in a batch. Independent of how many matches the batch
+# has, which worker runs the match and in what order matches finish.
+def match_seed(batch_seed: int, match_index: int):
+    seed_sequence = np.random.SeedSequence(batch_seed, spawn_key=(match_index,))
+    return int(seed_sequence.generate_state(1, dtype=np.uint32)[0])
+
+
+# Run one match with the given seed. Contestants get ids 1 and 2 so they are placed
+# the same way as in main(). If trace_path is given the match is recorded there
+def run_match(
+    matchup,
+    seed,
+    delta=DEFAULT_DELTA,
+    time_limit=DEFAULT_TIME_LIMIT,
+    index=0,
+    trace_path=None,
+):
+    from main import fight
+    from contestant import Contestant
+    from fight_trace import TraceWriter
+
+    contestants = [
+        Contestant(**{**params, "id": contestant_id})
+        for contestant_id, params in enumerate(matchup, start=1)
+    ]
+    recorder = TraceWriter(trace_path) if trace_path else None
+    winner = fight(contestants, delta, time_limit, "headless", recorder, seed)
+    return MatchResult(index, seed, [c.name for c in contestants], winner)
+
+
+# Re-run match <match_index> of a batch exactly as it ran in the batch
+def replay_match(
+    matchups,
+    match_index,
+    batch_seed=0,
+    delta=DEFAULT_DELTA,
+    time_limit=DEFAULT_TIME_LIMIT,
+    trace_dir=None,
+):
+    seed = match_seed(batch_seed, match_index)
+    return run_match(
+        matchups[match_index],
+        seed,
+        delta,
+        time_limit,
+        match_index,
+        _trace_path(trace_dir, match_index),
+    )
+
+
+def _trace_path(trace_dir, index):
+    return os.path.join(trace_dir, f"match_{index}") if trace_dir else None
+
+
+def _run_indexed_match(job):
+    index, matchup, batch_seed, delta, time_limit, trace_dir = job
+    return run_match(
+        matchup,
+        match_seed(batch_seed, index),
+        delta,
+        time_limit,
+        index,
+        _trace_path(trace_dir, index),
+    )
+
+
+# Run every matchup across a pool of <processes> workers (default: one per core) and
+# yield MatchResults as matches finish, which isn't necessarily in index order
+def run_batch(
+    matchups,
+    batch_seed=0,
+    processes=None,
+    delta=DEFAULT_DELTA,
+    time_limit=DEFAULT_TIME_LIMIT,
+    log_level="warning",
+    chunksize=1,
+    trace_dir=None,
+):
+    jobs = (
+        (index, matchup, batch_seed, delta, time_limit, trace_dir)
+        for index, matchup in enumerate(matchups)
+    )
+    with multiprocessing.Pool(
+        processes or os.cpu_count(), initializer=set_debug_level, initargs=(log_level,)
+    ) as pool:
+        for result in pool.imap_unordered(_run_indexed_match, jobs, chunksize):
+            yield result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a batch of headless fights.")
+    parser.add_argument("matchups", help="json file with a list of contestant pairs")
+    parser.add_argument("--seed", type=int, default=0, help="batch seed")
+    parser.add_argument(
+        "--processes", type=int, default=None, help="worker count (default: cores)"
+    )
+    parser.add_argument("--delta", type=float, default=DEFAULT_DELTA)
+    parser.add_argument("--time-limit", type=float, default=DEFAULT_TIME_LIMIT)
+    parser.add_argument(
+        "--replay", type=int, default=None, help="only re-run the match at this index"
+    )
+    parser.add_argument("--log-level", default="warning")
+    parser.add_argument(
+        "--trace-dir", default=None, help="record every match to this directory"
+    )
+    args = parser.parse_args(argv)
+
+    with open(args.matchups) as matchups_file:
+        matchups = json.load(matchups_file)
+
+    if args.replay is not None:
+        set_debug_level(args.log_level)
+        results = [
+            replay_match(
+                matchups,
+                args.replay,
+                args.seed,
+                args.delta,
+                args.time_limit,
+                args.trace_dir,
+            )
+        ]
+    else:
+        results = run_batch(
+            matchups,
+            args.seed,
+            args.processes,
+            args.delta,
+            args.time_limit,
+            args.log_level,
+            trace_dir=args.trace_dir,
+        )
+    # one json line per finished match
+    for result in results:
+        print(json.dumps(result.to_dict()), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Benchmarks of the simulation hot paths, from Vec3 arithmetic up to a full headless
+fight. Every run measures ops/sec, bytes allocated per op and peak bytes per op,
+compares them with the previous run stored in the baseline file and then replaces it.
+Nothing needs Blender.
+
+Run with: python benchmarks/kernels.py [--baseline PATH] [--only NAME ...]
+Exits with 1 if --fail-on-regression is given and a benchmark got slower (or
+allocates more) than the previous run by more than --tolerance.
+"""
+
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import argparse
+import json
+import platform
+import time
+import numpy as np
+from benchmarks.measure import time_per_op, bytes_per_op, peak_bytes
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+BASELINE_VERSION = 1
+# allocation changes smaller than this are noise
+ALLOCATION_SLACK = 64
+
+
+def _vec3_benchmarks():
+    from common import Vec3
+
+    a, b = Vec3([0.1, 0.2, 0.3]), Vec3([0.4, 0.5, 0.6])
+    return [
+        ("vec3.add", lambda: a + b, 20000),
+        ("vec3.sub", lambda: a - b, 20000),
+        ("vec3.scale", lambda: a * 2.0, 20000),
+        ("vec3.norm", lambda: a.norm(), 20000),
+        ("vec3.normalize", lambda: a.normalize(), 20000),
+    ]
+
+
+def _transform_benchmarks():
+    from common import Transform, Vec3, global_to_local, local_to_global
+
+    angle = 0.3
+    matrix = np.eye(4)
+    matrix[:3, :3] = [
+        [np.cos(angle), -np.sin(angle), 0],
+        [np.sin(angle), np.cos(angle), 0],
+        [0, 0, 1],
+    ]
+    matrix[:3, 3] = [1.0, 2.0, 0.0]
+    point = Vec3([0.5, -0.2, 1.7])
+    transform = Transform(matrix)
+    points = np.random.default_rng(0).random((64, 3))
+    return [
+        ("global_to_local", lambda: global_to_local(point, matrix), 10000),
+        ("local_to_global", lambda: local_to_global(point, matrix), 10000),
+        ("global_to_local.cached", lambda: global_to_local(point, transform), 10000),
+        ("transform.to_local_64", lambda: transform.to_local(points), 10000),
+    ]
+
+
+def _collision_benchmarks():
+    from common import Vec3
+    from collision import BoundingBox, BoundingSphere, pack_boxes
+    from collision import swept_spheres_vs_boxes
+
+    box_a = BoundingBox(Vec3([0, 0, 0]), Vec3([0.1, 0.2, 0.3]), Vec3([1, 1, 1]))
+    box_b = BoundingBox(Vec3([1.5, 0, 0]), Vec3([0.3, 0.2, 0.1]), Vec3([1, 1, 1]))
+    sphere_a = BoundingSphere(Vec3([0.5, 0.5, 0.5]), 0.5)
+    sphere_b = BoundingSphere(Vec3([1.2, 0.5, 0.5]), 0.5)
+    # the 4 limbs of a contestant swept against the 2 hit boxes of an opponent
+    centers, rotations, half_extents = pack_boxes([box_a, box_b])
+    rng = np.random.default_rng(0)
+    starts, ends = rng.normal(size=(2, 4, 1, 3))
+    radii = np.full((4, 1), 0.1)
+
+    def swept():
+        return swept_spheres_vs_boxes(
+            starts, ends, radii, centers[None], rotations[None], half_extents[None]
+        )
+
+    return [
+        ("collision.sphere_sphere", lambda: sphere_a.collision(sphere_b), 10000),
+        ("collision.box_box", lambda: box_a.collision(box_b), 5000),
+        ("collision.box_sphere", lambda: box_a.collision(sphere_a), 10000),
+        ("collision.swept_4x2", swept, 1000),
+    ]
+
+
+# two contestants facing each other in a headless environment, and the state they
+# perceive
+def _fight_setup():
+    from contestant import Contestant
+    from environment import Environment
+
+    np.random.seed(0)
+    jack, jill = Contestant("Jack", id=1), Contestant("Jill", id=2)
+    env = Environment({jack: 1, jill: 2}, pose_backend="headless")
+    return jack, jill, env, env.current_state()
+
+
+def _contestant_benchmarks():
+    from action_list import Attack
+
+    jack, jill, env, env_state = _fight_setup()
+    jab = Attack["JAB_HEAD"]
+
+    # update changes the contestant (reaction window, current actions), so every
+    # run starts again from a new one
+    fresh = {}
+
+    def new_contestant():
+        fresh["jack"], _, _, fresh["env_state"] = _fight_setup()
+
+    def update():
+        return fresh["jack"].update(fresh["env_state"])
+
+    return [
+        (
+            "contestant._get_strike_locations",
+            lambda: jack._get_strike_locations(jab, jill._body_locations),
+            2000,
+        ),
+        ("contestant.choose_actions", lambda: jack.choose_actions(env_state), 1000),
+        ("contestant.update", update, 1000, new_contestant),
+    ]
+
+
+def _path_benchmarks():
+    from paths import PathSet
+
+    rng = np.random.default_rng(0)
+    paths = PathSet()
+    for degree in range(2, 5):
+        for _ in range(16):
+            paths.append(rng.random((degree, 3)))
+    progress = rng.random(len(paths))
+    curve = rng.random((4, 3))
+    return [
+        ("paths.set_cubic", lambda: paths.set(0, curve), 5000),
+        ("paths.evaluate_48", lambda: paths.evaluate(progress), 5000),
+    ]
+
+
+def _ik_benchmarks():
+    from contestant import Contestant
+    from headless.pose_engine import PoseEngine
+
+    contestants = [Contestant(f"Fighter{i}", id=i) for i in range(1, 51)]
+    pose_engine = PoseEngine(contestants)
+    return [("ik.solve_limbs_50", pose_engine.solve_limbs, 500)]
+
+
+def _physics_benchmarks():
+    from physics import PhysicsStore
+
+    rng = np.random.default_rng(0)
+    store = PhysicsStore()
+    masses = {part: mass for part, mass in enumerate([10, 40, 4, 4, 20, 20])}
+    for contestant_id in range(1, 51):
+        store.add_body(contestant_id, masses, rng.random((6, 3)))
+    rows = np.arange(len(store))
+    positions = rng.random((len(store), 3))
+
+    def tick():
+        store.drive(rows, positions)
+        store.step()
+
+    return [("physics.tick_50", tick, 5000)]
+
+
+def _random_benchmarks():
+    from random_streams import RandomStream, CHOICE_STREAM
+
+    stream = RandomStream(0, 1, CHOICE_STREAM)
+    return [
+        ("random_streams.uniform", stream.uniform, 100000),
+        ("random_streams.uniforms_8", lambda: stream.uniforms(8), 20000),
+    ]
+
+
+def _interpolation_benchmarks():
+    from sim_clock import resample
+
+    rng = np.random.default_rng(0)
+    times = np.arange(1, 51) * 0.1
+    body_locations = rng.random((50, 2, 8, 3))
+    transforms = np.tile(np.eye(4), (50, 2, 1, 1))
+    transforms[..., :3, 3] = rng.random((50, 2, 3))
+    frame_times = np.arange(0, 5, 1 / 60)
+    return [
+        (
+            "sim_clock.resample_5s_60fps",
+            lambda: resample(times, body_locations, transforms, frame_times),
+            200,
+        )
+    ]
+
+
+def _fight_benchmarks():
+    from contestant import Contestant
+    from main import fight
+
+    def headless_fight():
+        np.random.seed(0)
+        contestants = [Contestant("Jack", id=1), Contestant("Jill", id=2)]
+        return fight(contestants, 0.1, 5, pose_backend="headless")
+
+    return [("fight.headless_5s", headless_fight, 3)]
+
+
+# every group of benchmarks, with the prefixes of the names of its benchmarks. Groups
+# are only built if --only can select one of them
+BENCHMARK_GROUPS = [
+    (("vec3.",), _vec3_benchmarks),
+    (("global_to_local", "local_to_global", "transform."), _transform_benchmarks),
+    (("collision.",), _collision_benchmarks),
+    (("contestant.",), _contestant_benchmarks),
+    (("paths.",), _path_benchmarks),
+    (("ik.",), _ik_benchmarks),
+    (("physics.",), _physics_benchmarks),
+    (("random_streams.",), _random_benchmarks),
+    (("sim_clock.",), _interpolation_benchmarks),
+    (("fight.",), _fight_benchmarks),
+]
+
+
+# {name: {"ops_per_sec", "bytes_per_op", "peak_bytes"}} of every benchmark whose name
+# starts with one of <only> (all of them if empty). A benchmark can have a setup
+# function, called before every measurement
+def run_benchmarks(only=()):
+    results = {}
+    for prefixes, group in BENCHMARK_GROUPS:
+        if only and not any(
+            prefix.startswith(name) or name.startswith(prefix)
+            for prefix in prefixes
+            for name in only
+        ):
+            continue
+        for name, fn, number, *setup in group():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            setup = setup[0] if setup else None
+            seconds = time_per_op(fn, number, setup=setup)
+            if setup:
+                setup()
+            bytes_per_call = bytes_per_op(fn, max(number // 10, 1))
+            if setup:
+                setup()
+            results[name] = {
+                "ops_per_sec": 1.0 / seconds,
+                "bytes_per_op": bytes_per_call,
+                "peak_bytes": peak_bytes(fn),
+            }
+    return results
+
+
+# (name, ops/sec change, bytes/op change, regressed) for every benchmark of <results>,
+# relative to <previous>. Changes are None for benchmarks that are new
+def compare(results, previous, tolerance=0.2):
+    rows = []
+    for name, result in results.items():
+        old = previous.get(name)
+        if old is None:
+            rows.append((name, None, None, False))
+            continue
+        speed = result["ops_per_sec"] / old["ops_per_sec"] - 1.0
+        allocation = result["bytes_per_op"] - old["bytes_per_op"]
+        regressed = speed < -tolerance or allocation > max(
+            tolerance * old["bytes_per_op"], ALLOCATION_SLACK
+        )
+        rows.append((name, speed, allocation, regressed))
+    return rows
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline.get("version") != BASELINE_VERSION:
+        return {}
+    return baseline["results"]
+
+
+def save_baseline(path, results):
+    baseline = {
+        "version": BASELINE_VERSION,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "results": results,
+    }
+    with open(path, "w") as baseline_file:
+        json.dump(baseline, baseline_file, indent=4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--only", nargs="*", default=[])
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument(
+        "--no-save", action="store_true", help="don't replace the baseline"
+    )
+    args = parser.parse_args()
+
+    from logger import set_debug_level
+
+    set_debug_level("warning")
+    previous = load_baseline(args.baseline)
+    results = run_benchmarks(args.only)
+    rows = compare(results, previous, args.tolerance)
+
+    header = f"{'benchmark':<34}{'ops/s':>12}{'B/op':>9}{'peak B':>10}{'vs last':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, speed, allocation, regressed in rows:
+        result = results[name]
+        change = "new" if speed is None else f"{speed * 100:+.1f}%"
+        flag = "  REGRESSED" if regressed else ""
+        print(
+            f"{name:<34}{result['ops_per_sec']:>12.1f}{result['bytes_per_op']:>9.0f}"
+            f"{result['peak_bytes']:>10}{change:>10}{flag}"
+        )
+
+    if not args.no_save:
+        save_baseline(args.baseline, {**previous, **results})
+    if args.fail_on_regression and any(row[3] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Timing and allocation measurements shared by the benchmarks.
+"""
+
+import sys
+import timeit
+import tracemalloc
+
+REPEAT = 5
+
+
+# seconds per call of fn, best of <repeat> runs. <setup> (untimed) runs before each
+# of them
+def time_per_op(fn, number=10000, repeat=REPEAT, setup=None):
+    times = timeit.repeat(fn, setup=setup or "pass", number=number, repeat=repeat)
+    return min(times) / number
+
+
+# bytes allocated by one call of fn, averaged over <number> calls. Results are kept
+# alive so that freed memory isn't reused and hidden from the count
+def bytes_per_op(fn, number=1000):
+    results = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(number):
+        results.append(fn())
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # don't charge the results list itself to the operation
+    return max(after - before - sys.getsizeof(results), 0) / number
+
+
+# most bytes held at once while fn runs, on top of what was held before it
+def peak_bytes(fn):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return max(peak - before, 0)
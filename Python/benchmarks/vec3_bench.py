@@ -0,0 +1,136 @@
+"""
+Microbenchmark comparing the array backed common.Vec3 with the list backed Vec3 it
+replaced. Reports time and bytes allocated per operation.
+
+Run with: python benchmarks/vec3_bench.py
+"""
+
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+from common import Vec3
+from benchmarks.measure import time_per_op, bytes_per_op
+
+N = 1000
+
+
+# The list backed vector as it was before the switch to numpy, kept here as the
+# reference point.
+class ListVec3:
+    def __init__(self, data: list = [0, 0, 0]):
+        self._data = data
+
+    @property
+    def x(self):
+        return self._data[0]
+
+    @property
+    def y(self):
+        return self._data[1]
+
+    @property
+    def z(self):
+        return self._data[2]
+
+    def __sub__(self, other):
+        return ListVec3([self.x - other.x, self.y - other.y, self.z - other.z])
+
+    def __add__(self, other):
+        return ListVec3([self.x + other.x, self.y + other.y, self.z + other.z])
+
+    def __mul__(self, other):
+        return ListVec3([self.x * other, self.y * other, self.z * other])
+
+    def magnitude(self):
+        return self.x**2 + self.y**2 + self.z**2
+
+    def normalize(self):
+        norm = self.magnitude() ** 0.5
+        if norm == 0:
+            return ListVec3(list(self._data))
+        return ListVec3([self.x / norm, self.y / norm, self.z / norm])
+
+
+# the per tick callers, written the way they were with the list backed vector
+def list_clamp(origin, target, reach):
+    return origin + (target - origin).normalize() * reach
+
+
+def array_clamp(origin, target, reach):
+    return Vec3.towards(origin, target, reach)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    points = rng.random((N, 3))
+    l_a, l_b = ListVec3(points[0].tolist()), ListVec3(points[1].tolist())
+    v_a, v_b = Vec3(points[0]), Vec3(points[1])
+    l_points = [ListVec3(point.tolist()) for point in points]
+    v_points = Vec3.from_array(points)
+    in_place = Vec3(points[2])
+
+    def in_place_add():
+        nonlocal in_place
+        in_place += v_b
+
+    # scales by one so repeated runs do not overflow, the cost is the same
+    def in_place_scale():
+        nonlocal in_place
+        in_place *= 1.0
+
+    rows = [
+        ("a - b", lambda: l_a - l_b, lambda: v_a - v_b),
+        ("a + b", lambda: l_a + l_b, lambda: v_a + v_b),
+        ("a * 2.0", lambda: l_a * 2.0, lambda: v_a * 2.0),
+        ("a += b", lambda: l_a + l_b, in_place_add),
+        ("a *= 2.0", lambda: l_a * 2.0, in_place_scale),
+        ("|a|^2", lambda: l_a.magnitude(), lambda: v_a.norm_sq()),
+        (
+            "close(a, b)",
+            lambda: (l_a - l_b).magnitude() < 0.1,
+            lambda: Vec3.close(v_a, v_b),
+        ),
+        (
+            "distance(a, b)",
+            lambda: (l_a - l_b).magnitude() ** 0.5,
+            lambda: Vec3.distance(v_a, v_b),
+        ),
+        (
+            "clamp to reach",
+            lambda: list_clamp(l_a, l_b, 0.7),
+            lambda: array_clamp(v_a, v_b, 0.7),
+        ),
+        (
+            f"{N} distances",
+            lambda: [(p - l_a).magnitude() for p in l_points],
+            lambda: np.linalg.norm(Vec3.stack(v_points) - v_a.data, axis=1),
+        ),
+        (
+            f"{N} distances, packed",
+            lambda: [(p - l_a).magnitude() for p in l_points],
+            lambda: np.linalg.norm(points - v_a.data, axis=1),
+        ),
+    ]
+
+    header = f"{'op':<22}{'list us':>10}{'array us':>10}{'speedup':>9}{'list B':>9}{'array B':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, list_fn, array_fn in rows:
+        number = 100 if "distances" in name else 10000
+        list_time = time_per_op(list_fn, number)
+        array_time = time_per_op(array_fn, number)
+        list_bytes = bytes_per_op(list_fn, 100 if "distances" in name else 1000)
+        array_bytes = bytes_per_op(array_fn, 100 if "distances" in name else 1000)
+        print(
+            f"{name:<22}{list_time * 1e6:>10.3f}{array_time * 1e6:>10.3f}"
+            f"{list_time / array_time:>8.2f}x{list_bytes:>9.0f}{array_bytes:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Imports a fight simulated headlessly into Blender in one pass. Instead of driving the
+rigs tick by tick like blender/pose_engine.py (selecting objects, switching modes and
+moving follow path constraints every tick), every keyframe of a contestant is written
+with one foreach_set per fcurve, so the number of Blender API calls depends on the
+number of contestants and channels, not on the length of the fight.
+
+    animation = InterpolatedOutput(frame_rate=24)
+    fight(contestants, 0.1, 30, pose_backend="headless", animation=animation)
+    bake_animation(animation)          # or bake_trace(FightTrace(path), 24)
+
+Each contestant's rig ("<name>_skeleton", copied from the rig template when it doesn't
+exist) gets a new action with its object location and rotation and the location of
+every ik target bone. Ik target locations are converted into bone space assuming the
+parents of the ik targets stay in their rest pose, which holds for the rig template.
+
+bpy is only imported when a bake runs without being given a module, so a stand-in
+module can be passed in to run the importer outside Blender.
+"""
+
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+from logger import get_logger
+from sim_clock import resample_trace
+
+log = get_logger("bake")
+
+RIG_TEMPLATE_NAME = "rig_template"
+# body location row (see Contestant.set_body_locations) -> ik target bone. The
+# shoulders are bone tails that follow the rig, not targets
+IK_TARGET_BONES = {
+    0: "head",
+    1: "torso",
+    2: "hand_ik.L",
+    3: "hand_ik.R",
+    4: "foot_ik.L",
+    5: "foot_ik.R",
+}
+
+
+# XYZ euler angles (..., 3) of rotation matrices (..., 3, 3), the order blender uses
+# for rotation_euler
+def matrix_to_euler(matrices):
+    m = np.asarray(matrices, dtype=np.float64)
+    x = np.arctan2(m[..., 2, 1], m[..., 2, 2])
+    y = np.arcsin(np.clip(-m[..., 2, 0], -1.0, 1.0))
+    z = np.arctan2(m[..., 1, 0], m[..., 0, 0])
+    return np.stack([x, y, z], axis=-1)
+
+
+# (F, 3) locations of (F, 3) world <points> in the rest frame of a bone whose armature
+# space rest matrix is <rest_matrix>, with the armature at (F, 4, 4) <object_matrices>
+def _world_to_bone(points, object_matrices, rest_matrix):
+    inverse = np.linalg.inv(object_matrices)
+    local = np.einsum("fij,fj->fi", inverse[:, :3, :3], points) + inverse[:, :3, 3]
+    rest_matrix = np.asarray(rest_matrix, dtype=np.float64)
+    return (local - rest_matrix[:3, 3]) @ rest_matrix[:3, :3]
+
+
+# write every key of one channel. <values> (F, n) holds one column per array index
+def _write_channel(action, data_path, frames, values, group):
+    for index in range(values.shape[1]):
+        fcurve = action.fcurves.new(data_path, index=index, action_group=group)
+        fcurve.keyframe_points.add(len(frames))
+        coordinates = np.empty((len(frames), 2), dtype=np.float32)
+        coordinates[:, 0] = frames
+        coordinates[:, 1] = values[:, index]
+        fcurve.keyframe_points.foreach_set("co", coordinates.ravel())
+        fcurve.update()
+
+
+def _rig(bpy, name):
+    armature_name = f"{name}_skeleton"
+    armature = bpy.data.objects.get(armature_name)
+    if armature is None:
+        log.debug("Creating new rig for %s", name)
+        template = bpy.data.objects[RIG_TEMPLATE_NAME]
+        armature = template.copy()
+        armature.name = armature_name
+        bpy.context.scene.collection.objects.link(armature)
+    return armature
+
+
+# Key the rig of every contestant.
+# contestant_names: name of the contestant in each slot
+# times: (F,) seconds of every frame
+# body_locations: (F, contestants, 8, 3) ik target locations
+# transforms: (F, contestants, 4, 4) transformation matrices
+# Returns the new action of every contestant
+def bake_fight(
+    contestant_names,
+    times,
+    body_locations,
+    transforms,
+    frame_rate=24,
+    frame_start=1,
+    bpy=None,
+):
+    if bpy is None:
+        import bpy
+    times = np.asarray(times, dtype=np.float64)
+    body_locations = np.asarray(body_locations, dtype=np.float64)
+    transforms = np.asarray(transforms, dtype=np.float64)
+    if not len(times):
+        raise ValueError("Nothing to bake, the fight has no frames")
+    frames = frame_start + times * frame_rate
+
+    actions = []
+    for slot, name in enumerate(contestant_names):
+        armature = _rig(bpy, name)
+        action_name = f"{name}_bake"
+        previous = bpy.data.actions.get(action_name)
+        if previous is not None:
+            bpy.data.actions.remove(previous)
+        action = bpy.data.actions.new(action_name)
+        armature.animation_data_create().action = action
+        armature.rotation_mode = "XYZ"
+
+        object_matrices = transforms[:, slot]
+        # unwrap so angles don't jump by 2 pi between frames
+        rotation = np.unwrap(matrix_to_euler(object_matrices[:, :3, :3]), axis=0)
+        _write_channel(action, "location", frames, object_matrices[:, :3, 3], "Object")
+        _write_channel(action, "rotation_euler", frames, rotation, "Object")
+
+        bones = armature.data.bones
+        for row, bone_name in IK_TARGET_BONES.items():
+            locations = _world_to_bone(
+                body_locations[:, slot, row],
+                object_matrices,
+                bones[bone_name].matrix_local,
+            )
+            data_path = f'pose.bones["{bone_name}"].location'
+            _write_channel(action, data_path, frames, locations, bone_name)
+        actions.append(action)
+
+    scene = bpy.context.scene
+    scene.render.fps = int(round(frame_rate))
+    scene.frame_start = frame_start
+    scene.frame_end = int(np.ceil(frames[-1]))
+    log.info("Baked %d frames of %d contestants", len(frames), len(contestant_names))
+    return actions
+
+
+# bake a sim_clock.InterpolatedOutput a fight was run with
+def bake_animation(animation, frame_start=1, bpy=None):
+    return bake_fight(
+        animation.contestant_names,
+        animation.times,
+        animation.body_locations,
+        animation.transforms,
+        animation.frame_rate,
+        frame_start,
+        bpy,
+    )
+
+
+# bake a fight_trace.FightTrace, interpolated to <frame_rate> fps
+def bake_trace(trace, frame_rate=24, frame_start=1, bpy=None):
+    times, body_locations, transforms = resample_trace(trace, frame_rate)
+    names = [contestant["name"] for contestant in trace.contestants]
+    return bake_fight(
+        names, times, body_locations, transforms, frame_rate, frame_start, bpy
+    )
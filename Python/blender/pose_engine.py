@@ -16,71 +16,50 @@ from blender_utils import (
 )
 import numpy as np
 from enum import Enum
-from logger import logger
+from logger import logger, get_logger
 from action_list import Tag
 from mathutils import Vector
 from action import ComboImpl
+from action_table import ACTION_TABLE
 from common import BodyPart, Vec3
+from paths import PATH_DURATION, PathSet
 import importlib, blender.blender_utils
 from contestant import Contestant, ConcreteAction
 
 importlib.reload(blender.blender_utils)
 
+log = get_logger("pose_engine")
 
-# This class contains the path that a body part will take to get to a target location
-# It contains the logic to move the ik target to the desired location and to update
-# the ik target's position and rotation
+
+# This class contains the path that a body part will take to get to a target location.
+# The path is analytic (see paths.py): no curve object is created in Blender, the ik
+# target is moved to the point of the path it has progressed to. It's stored in row
+# <row> of the PathSet <paths> its skeleton evaluates every path with
 class Path:
     class Type(Enum):
         STRAIGHT = 0
         CURVED = 1
 
-    def __init__(self, pathType: Type, points: list, ik_target, name="Path"):
+    def __init__(
+        self, pathType: Type, points: list, ik_target, paths, row, name="Path"
+    ):
         self.pathType = pathType
         self.points = points
         self.progress = 0.0
         self.ik_target = ik_target
+        self.paths = paths
+        self.row = row
         self.name = name
 
-        self.curve = None
         if pathType == Path.Type.CURVED:
-            self.curve = self._generate_bezier_curve(points, name)
+            assert len(points) in (3, 4), "Curved path must have 3 or 4 points"
         elif pathType == Path.Type.STRAIGHT:
-            self.curve = self._generate_straight_path(points, name)
+            assert len(points) == 2, "Straight path must have 2 points"
         else:
             raise ValueError("Invalid path type")
+        self.paths.set(row, [list(point) for point in points])
         return
 
-    @staticmethod
-    def _generate_straight_path(points, name="StraightPath"):
-        assert len(points) == 2, "Straight path must have 2 points"
-        assert bpy.context.mode == "OBJECT", "Must be in object mode"
-
-        curve = bpy.ops.curve.primitive_nurbs_path_add()
-        curve = bpy.context.object
-        curve.name = name
-
-        bpy.ops.object.mode_set(mode="EDIT")
-        bpy.ops.curve.select_all(action="DESELECT")
-        bpy.ops.object.mode_set(mode="OBJECT")
-        # move vertices 1 and 2 to desired locations
-        # set first point to origin
-        curve.data.splines[0].points[0].co = (0, 0, 0, 1)
-        curve.data.splines[0].points[1].co = (points[1] - points[0]).to_4d()
-        # select vertices 2, 3 and 4
-        curve.data.splines.active.points[2].select = True
-        curve.data.splines.active.points[3].select = True
-        curve.data.splines.active.points[4].select = True
-        # delete selected vertices
-        bpy.ops.object.mode_set(mode="EDIT")
-        bpy.ops.curve.delete(type="VERT")
-        bpy.ops.object.mode_set(mode="OBJECT")
-        return curve
-
-    @staticmethod
-    def _generate_bezier_curve(points):
-        pass
-
     def __hash__(self) -> int:
         hash_tuple = (
             self.ik_target,
@@ -104,27 +83,16 @@ class IKSkeleton:
     FOOT_L_PATH = "foot_l_path"
     FOOT_R_PATH = "foot_r_path"
 
-    def __init__(self, contestant: Contestant):
+    def __init__(self, contestant: Contestant, delta=0.1):
         self.contestant = contestant
+        # progress made along a path every simulation step
+        self.path_step = delta / PATH_DURATION
         self.skeleton = self._instantiate_skeleton()
         self._assign_bones_to_vars()
         # hide controller and joints
         self.current_action_paths = set()
         # actions that are being performed
         self.current_actions = set()
-        # add a follow path modifier to the hands and feet
-        self._add_follow_path_constraint(
-            self.hand_ik_l, self._generate_name(self.HAND_L_PATH)
-        )
-        self._add_follow_path_constraint(
-            self.hand_ik_r, self._generate_name(self.HAND_R_PATH)
-        )
-        self._add_follow_path_constraint(
-            self.foot_ik_l, self._generate_name(self.FOOT_L_PATH)
-        )
-        self._add_follow_path_constraint(
-            self.foot_ik_r, self._generate_name(self.FOOT_R_PATH)
-        )
         # instantiate physical armatures
         # copy controller and rigidbody armatures
         # parent controller to ik skeleton
@@ -136,6 +104,12 @@ class IKSkeleton:
             BodyPart.FOOT_R: self.foot_ik_r,
             BodyPart.HEAD: self.head_ik,
         }
+        # paths of every ik target, one row each, moved along together
+        self._path_rows = {
+            ik_target: row
+            for row, ik_target in enumerate(self._body_part_to_ik_target.values())
+        }
+        self.paths = PathSet(len(self._path_rows))
 
     def _generate_name(self, name: str):
         return f"{self.contestant.name}_{name}"
@@ -148,7 +122,7 @@ class IKSkeleton:
         armature = lookup_object_by_name(armature_name)
 
         if not armature:
-            logger.debug(f"Creating new rig for {self.contestant.name}")
+            log.debug("Creating new rig for %s", self.contestant.name)
             # get the rig template object
             select(IKSkeleton.RIG_TEMPLATE_NAME)
             # copy into new object that will be this rig
@@ -161,7 +135,7 @@ class IKSkeleton:
             armature = duplicated_object
 
         else:
-            logger.debug(f"Resetting transforms on {armature_name}")
+            log.debug("Resetting transforms on %s", armature_name)
             # reset transforms
             select(armature_name)
             self._reset_transforms_on_active()
@@ -172,66 +146,24 @@ class IKSkeleton:
             bpy.ops.pose.scale_clear()
             bpy.ops.object.posemode_toggle()
             armature.location = target_location
+            # ik targets used to follow curve objects, drop the old constraints
+            for pose_bone in armature.pose.bones:
+                for constraint in list(pose_bone.constraints):
+                    if constraint.type == "FOLLOW_PATH":
+                        pose_bone.constraints.remove(constraint)
 
         # -1 or 1 based on even or odd id
         rotation_coefficient = (self.contestant.id % 2) * 2 - 1
         armature.rotation_euler = (0, 0, rotation_coefficient * np.pi / 2.0)
         return armature
 
-    # this needs revision
-    def _add_follow_path_constraint(self, ik_target, name="Follow Path"):
-        # assert that we're in object mode
-        set_object_mode()
-        # add a follow path modifier to the ik target
-        bpy.ops.object.select_all(action="DESELECT")
-        self.skeleton.select_set(True)
-        bpy.context.view_layer.objects.active = self.skeleton
-        set_pose_mode()
-        # set active opse bone to the ik target
-        bpy.context.object.data.bones.active = ik_target.bone
-        # print slected bone name from context
-        # if this ik target has a follow path modifier, return
-        if name in ik_target.constraints:
-            ik_target.bone.select = False
-            set_object_mode()
-            return
-        # add follow path bone constraint
-        bpy.ops.pose.constraint_add(type="FOLLOW_PATH")
-        # select last constraint added
-        follow_path_constraint = list(ik_target.constraints.values())[-1]
-        follow_path_constraint.name = name
-        # set follow path constraint properties
-        follow_path_constraint.use_curve_follow = True
-        follow_path_constraint.forward_axis = "FORWARD_Y"
-        follow_path_constraint.up_axis = "UP_Z"
-        follow_path_constraint.offset_factor = 0.0
-        follow_path_constraint.use_fixed_location = True
-        follow_path_constraint.use_curve_radius = False
-        follow_path_constraint.use_curve_follow = False
-        ik_target.bone.select = False
-        set_object_mode()
-
-    # set the follow path modifier target to none and offset to zero
-    def _reset_follow_path_constraint(self, ik_target):
-        # remove follow path modifier from the ik target
-        bpy.ops.object.select_all(action="DESELECT")
-        self.skeleton.select_set(True)
-        bpy.context.view_layer.objects.active = self.skeleton
-        bpy.ops.object.modifier_remove(modifier="Follow Path")
-
-    # set the follow path modifier target to given curve
-    def _set_follow_path_constraint_target(self, path):
-        # get follow path constraints
-        # log constraint names
-        logger.debug(f"Constraints: {path.ik_target.constraints.keys()}")
-        logger.debug(f"ik target: {path.ik_target.name}")
-        follow_path_constraint = path.ik_target.constraints[path.name]
-        follow_path_constraint.target = path.curve
-
-    # set the follow path modifier offset to given value
-    def _set_follow_path_constraint_offset(self, path: Path):
-        follow_path_constraint = path.ik_target.constraints[path.name]
-        follow_path_constraint.offset_factor = path.progress
+    # move an ik target to <world_position>. The parents of the ik targets are
+    # assumed to be in their rest pose
+    def _move_ik_target(self, ik_target, world_position):
+        armature_position = self.skeleton.matrix_world.inverted() @ world_position
+        rest = ik_target.bone.matrix_local
+        offset = armature_position - rest.translation
+        ik_target.location = rest.to_3x3().inverted() @ offset
 
     def _reset_transforms_on_active(self):
         # Set the object's location to the origin (0, 0, 0)
@@ -259,7 +191,7 @@ class IKSkeleton:
     # this function takes an action and breaks it into a series of paths
     # that the body parts will take to get to the target locations
     def _generate_action_paths(self, action: ConcreteAction):
-        logger.debug(f"Generating paths for action: {action.name}")
+        log.debug("Generating paths for action: %s", action.name)
         # get ik targets for involved body locations mapping
         parts = [part for part in action.target_body_locations.keys()]
         part_iks = {}
@@ -272,29 +204,40 @@ class IKSkeleton:
         involved_ik = part_iks[parts[0]]
         init_point = self._get_world_position(involved_ik)
         final_point = Vector(action.strike_locations[0].data)
-        if BodyPart.FOOT_L in action.target_body_locations.keys():
+        if ACTION_TABLE.involves_part(action.id, BodyPart.FOOT_L):
             path = Path(
                 Path.Type.STRAIGHT,
                 [init_point, final_point],
                 involved_ik,
+                self.paths,
+                self._path_rows[involved_ik],
                 self.contestant.name + "_" + self.FOOT_L_PATH,
             )
         # if action involved foot, use FOOT_L_PATH and FOOT_R_PATH
-        elif Tag["STRAIGHT_PATH"] in action.tags:
+        elif ACTION_TABLE.has_tag(action.id, Tag["STRAIGHT_PATH"]):
             path = Path(
                 Path.Type.STRAIGHT,
                 [init_point, final_point],
                 involved_ik,
+                self.paths,
+                self._path_rows[involved_ik],
                 self.contestant.name + "_" + self.HAND_L_PATH,
             )
-        self._set_follow_path_constraint_target(path)
         return [path]
 
-    def _progress_path(self, path: Path):
-        if path.progress < 1.0:
-            path.progress += 0.1
-            # set ik target follow path modifier offset to path progress
-            self._set_follow_path_constraint_offset(path)
+    # move every unfinished path one step along, evaluating them in one call
+    def _progress_paths(self, paths):
+        moving = [path for path in paths if path.progress < 1.0]
+        if not moving:
+            return
+        for path in moving:
+            path.progress = min(path.progress + self.path_step, 1.0)
+        positions = self.paths.evaluate(
+            np.array([path.progress for path in moving]),
+            [path.row for path in moving],
+        )
+        for path, position in zip(moving, positions):
+            self._move_ik_target(path.ik_target, Vector(position))
 
     # Performing an action updates it's completeness
     # for now snap body part to location
@@ -303,16 +246,15 @@ class IKSkeleton:
         if not action:
             return
 
-        logger.debug(f"Performing action: {action.name}")
+        log.debug("Performing action: %s", action.name)
         # if action is not in current actions, add it
         if action not in self.current_actions:
             self.current_actions.add(action)
             self.current_action_paths.update(self._generate_action_paths(action))
-            logger.debug(f"Paths: {self.current_action_paths}")
+            log.debug("Paths: %s", self.current_action_paths)
 
         # progress each body part along it's path
-        for path in self.current_action_paths:
-            self._progress_path(path)
+        self._progress_paths(self.current_action_paths)
 
     # need to do processing on the target location if characters limbs can't stretch
     def _progress_body_part_to_location(self, bodypart, location):
@@ -394,7 +336,7 @@ class PoseEngine:
 
         self._skeleton_map = {}
         for contestant in contestants:
-            ik_armature = IKSkeleton(contestant)
+            ik_armature = IKSkeleton(contestant, delta=1.0 / sim_frame_rate)
             phys_armature = PhysAnimSkeleton(contestant)
             self._skeleton_map[contestant] = [
                 ik_armature,
@@ -408,11 +350,11 @@ class PoseEngine:
         return self._skeleton_map[contestant][0].get_ik_target_locations()
 
     def _keyframe(self):
-        logger.debug(f"keyframing..")
+        log.debug("keyframing..")
         pass
 
     def update(self, contestant, actions, hits=[]):
-        logger.debug(f"------------Start Pose-----------")
+        log.debug("------------Start Pose-----------")
         ik_skeleton = self._skeleton_map[contestant][0]
         phys_skeleton = self._skeleton_map[contestant][1]
 
@@ -420,7 +362,7 @@ class PoseEngine:
         select(f"{ik_skeleton.contestant.name}_skeleton")
         # update ik skeleton to perform current action. procedural animation
         for action in actions:
-            logger.debug(f"Action: {action.name}")
+            log.debug("Action: %s", action.name)
             ik_skeleton.perform(action)
         set_object_mode()
         # deselect active object
@@ -434,9 +376,14 @@ class PoseEngine:
         # positions with hit skeleton, interpolating weight between ik and phys down
         # until zero over time
         self._keyframe()
-        logger.debug(f"---------------------------------")
+        log.debug("---------------------------------")
         return ik_skeleton, phys_skeleton
 
+    # the rig's ik constraints pose the limbs and the shoulders follow the rig, so
+    # there's nothing to solve once per tick here
+    def pose(self):
+        return
+
 
 # on action:
 # - get ik targets for involved body locations mapping
@@ -456,11 +403,8 @@ class PoseEngine:
 
 
 # TODO:
-# - Every function with path modifier in the name needs review
-# - Implement path curve creation. Note: path center should start from world center
 # - when hand exceeds length of arm, turn shoulders
 # - when leg exceeds length of leg, turn hips
-# - let time steps be independent of frame rate of animationr
 def main():
     os.system("cls")
     # logger.info("Program started.")
@@ -470,8 +414,6 @@ def main():
 
     # pose_engine = PoseEngine([Jack, Jill])
     # pose_engine.update(Jack, [jab_jills_head], None)
-    # x = Path._generate_straight_path([Vector([0, 0, 0]), Vector([1, 1, 1])])
-    # x.select_set(True)
 
     logger.info("Program ended.")
 
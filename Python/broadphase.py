@@ -0,0 +1,195 @@
+"""
+Broadphase for hit detection. Keeps every hit volume in the scene sorted along one
+axis so only limbs and body parts that are actually near each other get an exact test.
+"""
+
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+
+# A bounding box registered with the broadphase
+class _Proxy:
+    def __init__(self, owner, team, kind, aabb_min, aabb_max):
+        # whatever the caller wants back when this proxy is part of a pair
+        self.owner = owner
+        self.team = team
+        self.kind = kind
+        self.aabb_min = np.asarray(aabb_min, dtype=np.float64)
+        self.aabb_max = np.asarray(aabb_max, dtype=np.float64)
+
+
+# Sweep and prune over the endpoints of every proxy's bounding box on one axis.
+# Endpoints are kept sorted between updates, so moving a proxy only costs the swaps
+# needed to get its endpoints back in order (usually none or a few, since bodies move
+# a little every tick). Every swap between a min and a max endpoint starts or stops an
+# overlap on the sweep axis, which keeps the set of overlapping pairs up to date
+# without ever testing all pairs.
+# Only pairs between a STRIKER and a TARGET of different teams are tracked.
+class SweepAndPrune:
+    STRIKER = 0
+    TARGET = 1
+
+    def __init__(self, axis=0):
+        self.axis = axis
+        self._proxies = {}
+        self._next_handle = 0
+        # sorted endpoints on the sweep axis, stored as parallel lists
+        self._values = []
+        self._handles = []
+        self._is_min = []
+        # handle -> [index of min endpoint, index of max endpoint]
+        self._positions = {}
+        # pairs overlapping on the sweep axis. striker handle -> set of target handles
+        self._overlaps = {}
+
+    def add_proxy(self, owner, team, kind, aabb_min, aabb_max):
+        handle = self._next_handle
+        self._next_handle += 1
+        proxy = _Proxy(owner, team, kind, aabb_min, aabb_max)
+        self._proxies[handle] = proxy
+        if kind == SweepAndPrune.STRIKER:
+            self._overlaps[handle] = set()
+
+        low, high = proxy.aabb_min[self.axis], proxy.aabb_max[self.axis]
+        # every proxy already overlapping on the sweep axis starts as a pair
+        for other_handle, other in self._proxies.items():
+            if other_handle == handle or not self._tracks(handle, other_handle):
+                continue
+            if other.aabb_min[self.axis] <= high and other.aabb_max[self.axis] >= low:
+                self._add_pair(handle, other_handle)
+
+        max_index = bisect_right(self._values, high)
+        self._insert_endpoint(max_index, high, handle, False)
+        min_index = bisect_left(self._values, low)
+        self._insert_endpoint(min_index, low, handle, True)
+        self._reindex()
+        return handle
+
+    def remove_proxy(self, handle):
+        proxy = self._proxies.pop(handle)
+        if proxy.kind == SweepAndPrune.STRIKER:
+            del self._overlaps[handle]
+        else:
+            for targets in self._overlaps.values():
+                targets.discard(handle)
+        for index in sorted(self._positions.pop(handle), reverse=True):
+            del self._values[index]
+            del self._handles[index]
+            del self._is_min[index]
+        self._reindex()
+
+    # move a proxy to a new bounding box. Cost is proportional to how many endpoints
+    # it passes on the sweep axis
+    def update_proxy(self, handle, aabb_min, aabb_max):
+        proxy = self._proxies[handle]
+        old_low = proxy.aabb_min[self.axis]
+        proxy.aabb_min = np.asarray(aabb_min, dtype=np.float64)
+        proxy.aabb_max = np.asarray(aabb_max, dtype=np.float64)
+        min_index, max_index = self._positions[handle]
+        # move the leading endpoint first so neither endpoint has to pass the other
+        if proxy.aabb_min[self.axis] < old_low:
+            self._move_endpoint(min_index, proxy.aabb_min[self.axis])
+            self._move_endpoint(self._positions[handle][1], proxy.aabb_max[self.axis])
+        else:
+            self._move_endpoint(max_index, proxy.aabb_max[self.axis])
+            self._move_endpoint(self._positions[handle][0], proxy.aabb_min[self.axis])
+
+    def owner(self, handle):
+        return self._proxies[handle].owner
+
+    # targets whose bounding box overlaps the striker's on every axis
+    def candidates(self, striker_handle):
+        striker = self._proxies[striker_handle]
+        result = []
+        for target_handle in self._overlaps[striker_handle]:
+            target = self._proxies[target_handle]
+            if np.all(striker.aabb_min <= target.aabb_max) and np.all(
+                target.aabb_min <= striker.aabb_max
+            ):
+                result.append(target_handle)
+        return result
+
+    # every (striker handle, target handle) pair whose bounding boxes overlap
+    def pairs(self):
+        return [
+            (striker_handle, target_handle)
+            for striker_handle in self._overlaps
+            for target_handle in self.candidates(striker_handle)
+        ]
+
+    def _tracks(self, handle, other_handle):
+        proxy, other = self._proxies[handle], self._proxies[other_handle]
+        return proxy.kind != other.kind and proxy.team != other.team
+
+    def _add_pair(self, handle, other_handle):
+        if self._proxies[handle].kind == SweepAndPrune.STRIKER:
+            self._overlaps[handle].add(other_handle)
+        else:
+            self._overlaps[other_handle].add(handle)
+
+    def _remove_pair(self, handle, other_handle):
+        if self._proxies[handle].kind == SweepAndPrune.STRIKER:
+            self._overlaps[handle].discard(other_handle)
+        else:
+            self._overlaps[other_handle].discard(handle)
+
+    def _insert_endpoint(self, index, value, handle, is_min):
+        self._values.insert(index, value)
+        self._handles.insert(index, handle)
+        self._is_min.insert(index, is_min)
+
+    # rebuild the handle -> endpoint index map after the lists were resized
+    def _reindex(self):
+        self._positions = {handle: [0, 0] for handle in self._proxies}
+        for index, (handle, is_min) in enumerate(zip(self._handles, self._is_min)):
+            self._positions[handle][0 if is_min else 1] = index
+
+    # set the value of the endpoint at <index> and insertion sort it back into place
+    def _move_endpoint(self, index, value):
+        values = self._values
+        values[index] = value
+        while index > 0 and values[index - 1] > value:
+            self._swap(index - 1, index, moving_left=True)
+            index -= 1
+        while index < len(values) - 1 and values[index + 1] < value:
+            self._swap(index, index + 1, moving_left=False)
+            index += 1
+
+    # swap neighbouring endpoints <left> and <right>. The moving endpoint is <right>
+    # when moving left and <left> when moving right.
+    def _swap(self, left, right, moving_left):
+        handles, is_min = self._handles, self._is_min
+        moving, passed = (right, left) if moving_left else (left, right)
+        moving_handle, passed_handle = handles[moving], handles[passed]
+        if (
+            moving_handle != passed_handle
+            and is_min[moving] != is_min[passed]
+            and self._tracks(moving_handle, passed_handle)
+        ):
+            # a min moving left past a max (or a max moving right past a min) starts
+            # an overlap, the opposite swaps end one
+            starts_overlap = is_min[moving] == moving_left
+            if starts_overlap:
+                self._add_pair(moving_handle, passed_handle)
+            else:
+                self._remove_pair(moving_handle, passed_handle)
+
+        self._values[left], self._values[right] = (
+            self._values[right],
+            self._values[left],
+        )
+        handles[left], handles[right] = handles[right], handles[left]
+        is_min[left], is_min[right] = is_min[right], is_min[left]
+        self._positions[handles[left]][0 if is_min[left] else 1] = left
+        self._positions[handles[right]][0 if is_min[right] else 1] = right
+
+
+# bounding box of a sphere
+def sphere_aabb(center, radius):
+    return center - radius, center + radius
+
+
+# bounding box of an oriented box given its rotation matrix and half extents
+def box_aabb(center, rotation, half_extents):
+    extents = np.abs(rotation) @ half_extents
+    return center - extents, center + extents
@@ -0,0 +1,325 @@
+from common import Vec3
+import numpy as np
+
+
+class BoundingVolume:
+    def __init__(self, loc: Vec3):
+        self.location = loc
+        pass
+
+    def collision(self, object):
+        pass
+
+
+class BoundingSphere(BoundingVolume):
+    def __init__(self, loc: Vec3, radius: float):
+        super().__init__(loc)
+        self.radius = radius
+
+    def collision(self, object):
+        if isinstance(object, BoundingBox):
+            return _box_sphere_collision(object, self)
+        elif isinstance(object, BoundingSphere):
+            return _sphere_sphere_collision(object, self)
+        else:
+            print("Invalid collsion object")
+        return False
+
+
+class BoundingBox(BoundingVolume):
+    def __init__(self, loc: Vec3, rot: Vec3, half_extents: Vec3):
+        super().__init__(loc)
+        self.rotation = rot
+        self.half_extents = half_extents
+
+    @property
+    def rotation(self):
+        return self._rotation
+
+    # assigning a new rotation invalidates the cached rotation matrix
+    @rotation.setter
+    def rotation(self, rot: Vec3):
+        self._rotation = rot
+        self._cached_angles = None
+        self._rotation_matrix = None
+
+    # Rotation matrix from the Euler angles. It's cached and only rebuilt when the
+    # rotation is reassigned or modified in place.
+    def rotation_matrix(self):
+        angles = np.asarray(self._rotation, dtype=np.float64)
+        if self._rotation_matrix is None or not np.array_equal(
+            angles, self._cached_angles
+        ):
+            self._cached_angles = angles.copy()
+            self._rotation_matrix = euler_to_rotation_matrix(angles)
+        return self._rotation_matrix
+
+    def collision(self, object: BoundingVolume):
+        if isinstance(object, BoundingBox):
+            return _box_box_collision(self, object)
+        elif isinstance(object, BoundingSphere):
+            return _box_sphere_collision(box=self, sphere=object)
+        else:
+            print("Invalid collsion object")
+        return False
+
+
+# Rotation matrices (Rz @ Ry @ Rx) for Euler angles of shape (..., 3). Returns an
+# array of shape (..., 3, 3)
+def euler_to_rotation_matrix(angles):
+    angles = np.asarray(angles, dtype=np.float64)
+    cos, sin = np.cos(angles), np.sin(angles)
+    cos_x, cos_y, cos_z = cos[..., 0], cos[..., 1], cos[..., 2]
+    sin_x, sin_y, sin_z = sin[..., 0], sin[..., 1], sin[..., 2]
+
+    matrix = np.empty(angles.shape[:-1] + (3, 3))
+    matrix[..., 0, 0] = cos_z * cos_y
+    matrix[..., 0, 1] = cos_z * sin_y * sin_x - sin_z * cos_x
+    matrix[..., 0, 2] = cos_z * sin_y * cos_x + sin_z * sin_x
+    matrix[..., 1, 0] = sin_z * cos_y
+    matrix[..., 1, 1] = sin_z * sin_y * sin_x + cos_z * cos_x
+    matrix[..., 1, 2] = sin_z * sin_y * cos_x - cos_z * sin_x
+    matrix[..., 2, 0] = -sin_y
+    matrix[..., 2, 1] = cos_y * sin_x
+    matrix[..., 2, 2] = cos_y * cos_x
+    return matrix
+
+
+def _sphere_sphere_collision(s1: BoundingSphere, s2: BoundingSphere):
+    dist_btw_spheres = Vec3.distance(s1.location, s2.location)
+    return dist_btw_spheres <= s1.radius + s2.radius
+
+
+# next and previous axis of each axis, to write cross products as array operations
+_NEXT_AXIS = np.array([1, 2, 0])
+_PREV_AXIS = np.array([2, 0, 1])
+
+
+# Separating axis test of two oriented boxes. They overlap unless one of the 15
+# candidate axes separates them: the 3 face normals of each box and the 9 cross
+# products of an edge of one with an edge of the other. Everything is measured in
+# box1's frame
+def _box_box_collision(box1: BoundingBox, box2: BoundingBox):
+    rotation1, rotation2 = box1.rotation_matrix(), box2.rotation_matrix()
+    half1, half2 = box1.half_extents.data, box2.half_extents.data
+    # box2's axes and center in box1's frame
+    rotation = rotation1.T @ rotation2
+    offset = rotation1.T @ (box2.location - box1.location).data
+    # the epsilon keeps near parallel edges, whose cross product is almost zero, from
+    # separating boxes that touch
+    abs_rotation = np.abs(rotation) + 1e-9
+
+    # face normals of box1, then of box2
+    if (np.abs(offset) > half1 + abs_rotation @ half2).any():
+        return False
+    if (np.abs(offset @ rotation) > half1 @ abs_rotation + half2).any():
+        return False
+
+    # edge i of box1 crossed with edge j of box2, as (3, 3) arrays over i and j
+    i1, i2 = _NEXT_AXIS, _PREV_AXIS
+    radius1 = (
+        half1[i1, np.newaxis] * abs_rotation[i2]
+        + half1[i2, np.newaxis] * abs_rotation[i1]
+    )
+    radius2 = half2[i1] * abs_rotation[:, i2] + half2[i2] * abs_rotation[:, i1]
+    distance = np.abs(
+        offset[i2, np.newaxis] * rotation[i1] - offset[i1, np.newaxis] * rotation[i2]
+    )
+    return not (distance > radius1 + radius2).any()
+
+
+def _box_sphere_collision(box: BoundingBox, sphere: BoundingSphere):
+    hits = spheres_vs_boxes(
+        sphere.location.data[np.newaxis],
+        np.array([sphere.radius]),
+        box.location.data[np.newaxis],
+        box.rotation_matrix()[np.newaxis],
+        box.half_extents.data[np.newaxis],
+    )
+    return bool(hits[0, 0])
+
+
+# Batched narrow phase. Tests N spheres against M oriented boxes in one pass.
+# sphere_centers: (N,3), sphere_radii: (N,)
+# box_centers: (M,3), box_rotations: (M,3,3) rotation matrices, box_half_extents: (M,3)
+# Returns an (N,M) bool array, True where sphere n touches box m
+def spheres_vs_boxes(
+    sphere_centers, sphere_radii, box_centers, box_rotations, box_half_extents
+):
+    # offset of every sphere from every box, rotated into the box's local space.
+    # Rotations are orthonormal so the transpose is the inverse
+    offsets = sphere_centers[:, np.newaxis, :] - box_centers[np.newaxis, :, :]
+    local_offsets = np.einsum("mji,nmj->nmi", box_rotations, offsets)
+
+    # closest point on each box to each sphere center, in the box's local space
+    closest_points = np.clip(local_offsets, -box_half_extents, box_half_extents)
+
+    # rotation preserves length so the distance can be measured in local space
+    dist_sq = np.sum((local_offsets - closest_points) ** 2, axis=-1)
+    return dist_sq <= (sphere_radii**2)[:, np.newaxis]
+
+
+# steps of the searches for contacts at the edges and corners of boxes in
+# swept_spheres_vs_boxes. Each one shrinks the interval left to search by at least a
+# third, 40 find times of impact to about 1e-7 of a step
+SWEEP_ITERATIONS = 40
+
+
+# (...,3) <offsets> from box centers rotated into the space of boxes with (...,3,3)
+# <rotations>. Written out per axis so every pair is computed the same way however
+# the arrays are batched
+def _to_box_space(offsets, rotations):
+    return (
+        offsets[..., 0:1] * rotations[..., 0, :]
+        + offsets[..., 1:2] * rotations[..., 1, :]
+        + offsets[..., 2:3] * rotations[..., 2, :]
+    )
+
+
+# squared distance from points moving from (...,3) <starts> by <moves> to boxes with
+# <half_extents> around the origin, at times <t> (...)
+def _moving_dist_sq(starts, moves, half_extents, t):
+    points = starts + t[..., np.newaxis] * moves
+    closest_points = np.clip(points, -half_extents, half_extents)
+    return np.sum((points - closest_points) ** 2, axis=-1)
+
+
+# Continuous narrow phase. Spheres moving in a straight line from <starts> to <ends>
+# during a step are tested against oriented boxes, so a fast limb that passes through
+# a box between two ticks still hits it. Every argument broadcasts against the others:
+# starts, ends: (...,3), radii: (...)
+# box_centers: (...,3), box_rotations: (...,3,3), box_half_extents: (...,3)
+# e.g. (N,1,3) spheres against (1,M,3) boxes for an (N,M) result.
+# Returns a bool array, True where the sphere touches the box at some point of the
+# step, and the time of impact: the fraction of the step at which they first touch
+# (0 if they already touch at the start, inf if they never do)
+def swept_spheres_vs_boxes(
+    starts,
+    ends,
+    radii,
+    box_centers,
+    box_rotations,
+    box_half_extents,
+    iterations=SWEEP_ITERATIONS,
+):
+    local_starts = _to_box_space(starts - box_centers, box_rotations)
+    local_moves = _to_box_space(ends - box_centers, box_rotations) - local_starts
+    radii = np.asarray(radii, dtype=np.float64)
+    shape = np.broadcast_shapes(local_moves.shape[:-1], radii.shape)
+    local_starts = np.broadcast_to(local_starts, shape + (3,))
+    local_moves = np.broadcast_to(local_moves, shape + (3,))
+    half_extents = np.broadcast_to(box_half_extents, shape + (3,))
+    radii_sq = np.broadcast_to(radii**2, shape)
+
+    # The sphere touches the box while its center is inside the box grown by the
+    # radius with rounded edges and corners. Clipping the path to the grown box with
+    # square corners (a slab test) gives when it can touch at all
+    grown = half_extents + radii[..., np.newaxis]
+    still = local_moves == 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inverse = 1 / local_moves
+        near = (-grown - local_starts) * inverse
+        far = (grown - local_starts) * inverse
+    inside = np.abs(local_starts) <= grown
+    near, far = np.minimum(near, far), np.maximum(near, far)
+    near = np.where(still, np.where(inside, -np.inf, np.inf), near)
+    far = np.where(still, np.where(inside, np.inf, -np.inf), far)
+    enter = np.maximum(near.max(axis=-1), 0.0)
+    leave = np.minimum(far.min(axis=-1), 1.0)
+    crosses = enter <= leave
+    enter = np.where(crosses, enter, 0.0)
+
+    # entering through a face (or already touching) touches at once. Only paths
+    # entering at an edge or corner of the grown box need a search
+    touch_enter = crosses & (
+        _moving_dist_sq(local_starts, local_moves, half_extents, enter) <= radii_sq
+    )
+    hits = touch_enter.copy()
+    time_of_impact = np.where(touch_enter, enter, np.inf)
+    search = crosses & ~touch_enter
+    if np.any(search):
+        found, first = _first_contact(
+            local_starts[search],
+            local_moves[search],
+            half_extents[search],
+            radii_sq[search],
+            enter[search],
+            leave[search],
+            iterations,
+        )
+        hits[search] = found
+        time_of_impact[search] = np.where(found, first, np.inf)
+    return hits, time_of_impact
+
+
+# First time between <low> and <high> (N,) that N moving points (see _moving_dist_sq)
+# come within sqrt(<radii_sq>) of their box. Returns whether they do and when.
+# The squared distance from a point moving in a straight line to a box is convex in
+# time, so its minimum is found with a ternary search and the first time it drops
+# under the radius with a bisection before that minimum
+def _first_contact(starts, moves, half_extents, radii_sq, low, high, iterations):
+    def dist_sq(t):
+        return _moving_dist_sq(starts, moves, half_extents, t)
+
+    begin, end = low, high
+    for _ in range(iterations):
+        third = (high - low) / 3
+        left, right = low + third, high - third
+        closer_left = dist_sq(left) <= dist_sq(right)
+        high = np.where(closer_left, right, high)
+        low = np.where(closer_left, low, left)
+    closest = (low + high) / 2
+    touch_closest = dist_sq(closest) <= radii_sq
+    touch_end = dist_sq(end) <= radii_sq
+    found = touch_closest | touch_end
+
+    # the distance only falls until the closest approach, so the first contact is
+    # the one time before it where the distance crosses the radius
+    low, high = begin, np.where(touch_closest, closest, end)
+    for _ in range(iterations):
+        middle = (low + high) / 2
+        touching = dist_sq(middle) <= radii_sq
+        high = np.where(touching, middle, high)
+        low = np.where(touching, low, middle)
+    return found, high
+
+
+# Batched sphere test. Returns an (N,M) bool array, True where sphere n of the first
+# set touches sphere m of the second
+def spheres_vs_spheres(centers_a, radii_a, centers_b, radii_b):
+    offsets = centers_a[:, np.newaxis, :] - centers_b[np.newaxis, :, :]
+    dist_sq = np.sum(offsets**2, axis=-1)
+    return dist_sq <= (radii_a[:, np.newaxis] + radii_b[np.newaxis, :]) ** 2
+
+
+# pack bounding spheres into the arrays the batched tests expect
+def pack_spheres(spheres: list):
+    centers = Vec3.stack([sphere.location for sphere in spheres])
+    radii = np.array([sphere.radius for sphere in spheres], dtype=np.float64)
+    return centers, radii
+
+
+# pack bounding boxes into the arrays the batched tests expect. Uses each box's cached
+# rotation matrix
+def pack_boxes(boxes: list):
+    centers = Vec3.stack([box.location for box in boxes])
+    rotations = np.array([box.rotation_matrix() for box in boxes]).reshape(-1, 3, 3)
+    half_extents = Vec3.stack([box.half_extents for box in boxes])
+    return centers, rotations, half_extents
+
+
+if __name__ == "__main__":
+    # Example usage
+    box1 = BoundingBox(
+        Vec3([2.0, 2.0, 2.0]),
+        Vec3([np.pi / 4.0, np.pi / 6.0, np.pi / 3.0]),
+        Vec3([1.0, 2.0, 3.0]),
+    )
+    box2 = BoundingBox(
+        Vec3([4.0, 4.0, 4.0]),
+        Vec3([np.pi / 6.0, np.pi / 4.0, np.pi / 3.0]),
+        Vec3([1.0, 2.0, 3.0]),
+    )
+    sphere = BoundingSphere(Vec3([1.59, 0.46, 0.28]), 1)
+
+    print("Collision:", box1.collision(box2), sphere.collision(box1))
@@ -0,0 +1,252 @@
+"""
+Combo generator (see "Sim logic.txt"). Combos are searched for over the compiled action
+catalog with a beam search:
+- an action scores a bonus for every target it has among the likely vulnerabilities of
+  the action before it, and a penalty for the gap between the weight distribution the
+  action before it ends on and the one it starts from
+- every extra action multiplies the weight of a combo by length_decay, so longer combos
+  are less likely
+- distance is tracked in Range levels. An attack is only allowed when its range reaches
+  the current distance, and the distance only changes through <step> (closes it by one
+  level) and <push> (opens it by one level) actions
+Combos are deduplicated by hashing the ids of their actions. The range of a combo is
+the farthest distance it can be started from.
+
+Generating is deterministic, so the library is cached on disk keyed by a hash of the
+catalog and the search parameters. Fighters load it with load_or_generate() instead of
+searching again at startup.
+"""
+
+import sys
+import os
+
+dir = os.path.dirname(__file__)
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import hashlib
+import json
+import numpy as np
+from action import ComboImpl, Range
+from action_list import Tag
+from action_table import ACTION_TABLE, ATTACK, COMBO, action_id, popcount, tag_bits
+
+GENERATOR_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "fightsim")
+# score of every target the next action has among the vulnerabilities of the last one
+VULNERABILITY_BONUS = 1.0
+# score lost for the largest possible weight distribution gap between two actions
+WEIGHT_GAP_PENALTY = 1.0
+# how much further an attack reaches for every <step> before it
+STEP_REACH_FACTOR = 1.5
+
+# distances an attack can be thrown from
+_CLOSEST = Range.PUNCH.value
+_FARTHEST = Range.PUSH_KICK.value
+
+
+# bit (1 << Location id) for every location an action targets
+def _target_bits(table):
+    locations = table.target_locations.astype(np.int64)
+    bits = np.where(locations >= 0, np.left_shift(1, np.maximum(locations, 0)), 0)
+    return np.bitwise_or.reduce(bits.astype(np.uint64), axis=1)
+
+
+# (A, A) score of following action a with action b, for every pair of actions
+def transition_scores(table=ACTION_TABLE):
+    targets = _target_bits(table)
+    opened = popcount(table.vulnerability_bits[:, None] & targets[None, :])
+    # weight distributions are percentages, so the gap is at most 200
+    gap = np.abs(table.final_weight[:, None, :] - table.init_weight[None, :, :]).sum(
+        axis=2
+    )
+    return VULNERABILITY_BONUS * opened - WEIGHT_GAP_PENALTY * gap / 200
+
+
+# Hash of everything generated combos depend on: the non combo rows of <table> and the
+# search parameters
+def catalog_hash(table=ACTION_TABLE, **params):
+    rows = np.nonzero(table.kind != COMBO)[0]
+    digest = hashlib.sha256()
+    digest.update(str(GENERATOR_VERSION).encode())
+    for column in (
+        table.kind,
+        table.body_part_mask,
+        table.target_locations,
+        table.tag_bits,
+        table.range,
+        table.init_weight,
+        table.final_weight,
+        table.weight_necessity,
+        table.vulnerability_bits,
+    ):
+        digest.update(np.ascontiguousarray(column[rows]).tobytes())
+    digest.update(json.dumps([table.names[row] for row in rows]).encode())
+    digest.update(json.dumps([Tag["STEP"].id, Tag["PUSH"].id]).encode())
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+# Beam search for combos over every attack, reaction and movement in <table>.
+# max_length: most actions in a combo
+# beam_width: partial combos kept per length, for every starting distance
+# length_decay: weight multiplier of every action after the first
+def generate_combos(table=ACTION_TABLE, max_length=3, beam_width=64, length_decay=0.5):
+    if max_length < 2:
+        raise ValueError(f"Invalid max combo length: {max_length}")
+    candidates = np.nonzero(table.kind != COMBO)[0]
+    transitions = transition_scores(table)[np.ix_(candidates, candidates)]
+    is_attack = table.kind[candidates] == ATTACK
+    reach = table.range[candidates].astype(np.int64)
+    steps = (table.tag_bits[candidates] & tag_bits([Tag["STEP"]])) != 0
+    pushes = (table.tag_bits[candidates] & tag_bits([Tag["PUSH"]])) != 0
+    length_score = np.log(length_decay)
+
+    # (distance, previous candidate index or -1) -> which candidates may come next and
+    # the distance after each of them. Memoized, since beams revisit the same states
+    moves = {}
+
+    def next_moves(distance, previous):
+        key = (distance, previous)
+        if key not in moves:
+            allowed = np.where(is_attack, reach >= distance, True)
+            # movement that doesn't change anything is pointless
+            allowed &= ~(steps & (distance <= _CLOSEST))
+            allowed &= ~(pushes & (distance > _FARTHEST))
+            # doing the same non attack twice in a row is the same as doing it once
+            if previous >= 0 and not is_attack[previous]:
+                allowed[previous] = False
+            distances = distance - steps + pushes
+            distances = np.maximum(distances, _CLOSEST)
+            moves[key] = (allowed, distances)
+        return moves[key]
+
+    # combo -> (combo, starting distance, score), deduplicated by the hash of its ids
+    found = {}
+    # farthest distance first, so a combo keeps the farthest range it works from
+    for start in range(_FARTHEST, _CLOSEST - 1, -1):
+        allowed, distances = next_moves(start, -1)
+        beam = [((int(c),), int(distances[c]), 0.0) for c in np.nonzero(allowed)[0]]
+        for _ in range(max_length - 1):
+            expansions = []
+            for sequence, distance, score in beam:
+                allowed, distances = next_moves(distance, sequence[-1])
+                scores = score + transitions[sequence[-1]] + length_score
+                for c in np.nonzero(allowed)[0]:
+                    expansions.append(
+                        (sequence + (int(c),), int(distances[c]), float(scores[c]))
+                    )
+            for sequence, _, score in expansions:
+                # a combo ends with an attack
+                if not is_attack[sequence[-1]]:
+                    continue
+                if sequence not in found:
+                    found[sequence] = (sequence, start, score)
+            expansions.sort(key=lambda expansion: -expansion[2])
+            beam = expansions[:beam_width]
+            if not beam:
+                break
+
+    entries = []
+    for sequence, start, score in sorted(
+        found.values(), key=lambda entry: (-entry[2], entry[0])
+    ):
+        entries.append(
+            {
+                "actions": [table.names[candidates[c]] for c in sequence],
+                "range": start,
+                "score": score,
+            }
+        )
+    return ComboLibrary(entries, table)
+
+
+# Library from the disk cache, generating and caching it first if the catalog or the
+# parameters changed since it was last generated
+def load_or_generate(table=ACTION_TABLE, cache_dir=DEFAULT_CACHE_DIR, **params):
+    key = catalog_hash(table, **params)
+    path = os.path.join(cache_dir, f"combos_{key}.json")
+    if os.path.exists(path):
+        return ComboLibrary.load(path, table)
+    library = generate_combos(table, **params)
+    library.save(path)
+    return library
+
+
+# Generated combos, best scoring first. Each entry holds the names of its actions, its
+# range and its score. ComboImpl objects are only built when asked for
+class ComboLibrary:
+    def __init__(self, entries, table=ACTION_TABLE):
+        self.entries = entries
+        self._table = table
+        self._combos = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    # action_table ids of the actions of every combo
+    def component_ids(self):
+        return [
+            tuple(self._table.id_of_name(name) for name in entry["actions"])
+            for entry in self.entries
+        ]
+
+    # sampling weight of every combo
+    def weights(self):
+        return np.exp([entry["score"] for entry in self.entries])
+
+    # ComboImpl of every combo. Combos already in the catalog are reused
+    def combos(self):
+        if self._combos is None:
+            existing = {}
+            for action in self._table.actions:
+                if isinstance(action, ComboImpl):
+                    ids = tuple(self._table.component_ids(action.id))
+                    existing.setdefault(ids, action)
+            self._combos = []
+            for entry, ids in zip(self.entries, self.component_ids()):
+                combo = existing.get(ids)
+                if combo is None:
+                    combo = ComboImpl(
+                        [self._table.actions[i] for i in ids],
+                        "+".join(entry["actions"]),
+                        Range(entry["range"]),
+                    )
+                self._combos.append(combo)
+        return self._combos
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # write then rename, so concurrent fighters never read half a library
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as library_file:
+            data = {"version": GENERATOR_VERSION, "combos": self.entries}
+            json.dump(data, library_file)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, table=ACTION_TABLE):
+        with open(path) as library_file:
+            data = json.load(library_file)
+        if data["version"] != GENERATOR_VERSION:
+            raise ValueError(f"Unsupported combo library version: {data['version']}")
+        return cls(data["combos"], table)
+
+
+# How far <attack> reaches for a contestant with <limb_reach> (BodyPart -> reach). An
+# attack reaches as far as its shortest limb, and every <step> before an attack in a
+# combo extends it by STEP_REACH_FACTOR (every <push> undoes one)
+def attack_reach(attack, limb_reach, table=ACTION_TABLE):
+    reach = np.inf
+    extension = 0
+    for component in table.component_ids(action_id(attack)):
+        if table.has_tag(component, Tag["STEP"]):
+            extension += 1
+        if table.has_tag(component, Tag["PUSH"]):
+            extension -= 1
+        if table.kind[component] != ATTACK:
+            continue
+        parts = np.nonzero(table.target_locations[component] >= 0)[0]
+        limb = min(limb_reach[part] for part in parts)
+        reach = min(reach, limb * STEP_REACH_FACTOR**extension)
+    return reach
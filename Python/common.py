@@ -1,4 +1,5 @@
 from enum import Enum
+import math
 import numpy as np
 
 
@@ -6,15 +7,64 @@ import numpy as np
 # when I've been hit i need to know which body part was struck, how hard, who
 # hit me, which direction is the body part headed
 class Hit:
-    def __init__(self, body_part_hit, impact, contestant_id, path_tag):
+    def __init__(
+        self,
+        body_part_hit,
+        impact,
+        contestant_id,
+        path_tag,
+        action_id,
+        time_of_impact=1.0,
+    ):
+        # ConcreteBodyPart of the victim that was struck
         self.affected_body_part = body_part_hit
         self.impact = impact
-        pass
+        # id of the contestant that landed the hit
+        self.contestant_id = contestant_id
+        # name of the action whose path caused the hit
+        self.path_tag = path_tag
+        # action_table id of that action. Names can repeat, ids can't
+        self.action_id = action_id
+        # fraction of the tick the striking limb had moved when it made contact
+        self.time_of_impact = time_of_impact
+
+    def __repr__(self):
+        return f"Hit ({self.contestant_id} -> {self.affected_body_part.contestant_id}, part: {self.affected_body_part.body_part}, action: {self.path_tag})"
 
 
+# 3d vector backed by a contiguous float64 numpy array. Binary operators return a new
+# Vec3, the in-place operators (+=, -=, *=, /=) write into the existing buffer so hot
+# loops can avoid allocating. Use from_array/stack to move between Vec3s and (N,3)
+# arrays without copying every vector.
 class Vec3:
-    def __init__(self, data: list = [0, 0, 0]):
-        self._data = data
+    __slots__ = ("_data",)
+
+    def __init__(self, data=None):
+        if data is None:
+            self._data = np.zeros(3)
+        else:
+            self._data = np.array(data, dtype=np.float64).reshape(3)
+
+    # wrap an existing float64 array of shape (3,) without copying it
+    @classmethod
+    def _wrap(cls, array):
+        vec = cls.__new__(cls)
+        vec._data = array
+        return vec
+
+    # Vec3 views over the rows of an (N,3) array. Writing to a vector writes to the
+    # array and vice versa.
+    @classmethod
+    def from_array(cls, array):
+        array = np.ascontiguousarray(array, dtype=np.float64).reshape(-1, 3)
+        return [cls._wrap(row) for row in array]
+
+    # pack a list of vectors into a single (N,3) array
+    @staticmethod
+    def stack(vectors):
+        return np.array([vector.data for vector in vectors], dtype=np.float64).reshape(
+            -1, 3
+        )
 
     @property
     def x(self):
@@ -32,6 +82,17 @@ class Vec3:
     def data(self):
         return self._data
 
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None or dtype == self._data.dtype:
+            return self._data.copy() if copy else self._data
+        return self._data.astype(dtype)
+
+    def __len__(self):
+        return 3
+
+    def __iter__(self):
+        return iter(self._data)
+
     def __repr__(self):
         return f"Vec3 ({self.__str__()})"
 
@@ -39,68 +100,174 @@ class Vec3:
         return f"[{self.x}, {self.y}, {self.z}]"
 
     def __getitem__(self, index):
-        if index > 2:
-            raise OutOfBoundsError(f"Vec3 index out of bounds getter: {index}")
         return self._data[index]
 
     def __setitem__(self, index, value: float):
-        if index > 2:
-            print("Vec3 index out of bounds setter")
         self._data[index] = value
 
     def __sub__(self, other):
-        return Vec3([self.x - other.x, self.y - other.y, self.z - other.z])
+        return Vec3._wrap(self._data - _as_array(other))
 
     def __add__(self, other):
-        return Vec3([self.x + other.x, self.y + other.y, self.z + other.z])
+        return Vec3._wrap(self._data + _as_array(other))
 
     def __mul__(self, other):
-        if isinstance(other, (float, int)):
-            return Vec3([self.x * other, self.y * other, self.z * other])
-        else:
-            raise ValueError("Figure this out later Bk")
+        if type(other) is float or type(other) is int:
+            return Vec3._wrap(self._data * other)
+        return Vec3._wrap(self._data * _as_array(other))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return Vec3._wrap(self._data / _as_array(other))
+
+    def __neg__(self):
+        return Vec3._wrap(-self._data)
+
+    def __isub__(self, other):
+        self._data -= _as_array(other)
+        return self
+
+    def __iadd__(self, other):
+        self._data += _as_array(other)
+        return self
+
+    def __imul__(self, other):
+        self._data *= _as_array(other)
+        return self
 
+    def __itruediv__(self, other):
+        self._data /= _as_array(other)
+        return self
+
+    def dot(self, other):
+        return float(self._data @ _as_array(other))
+
+    # 3 element math is cheaper on python floats than through numpy
+    def norm_sq(self):
+        x, y, z = self._data.tolist()
+        return x * x + y * y + z * z
+
+    def norm(self):
+        return math.sqrt(self.norm_sq())
+
+    # kept for older callers, this is the squared length. Use norm() for distances
     def magnitude(self):
-        return self.x**2 + self.y**2 + self.z**2
+        return self.norm_sq()
 
-    # normalize the vector
+    # unit vector in the same direction. The zero vector is returned unchanged
     def normalize(self):
-        mag = self.magnitude()
-        return Vec3([self.x / mag, self.y / mag, self.z / mag])
+        norm = self.norm()
+        if norm == 0:
+            return Vec3._wrap(self._data.copy())
+        return Vec3._wrap(self._data / norm)
+
+    def copy(self):
+        return Vec3._wrap(self._data.copy())
+
+    # squared distance between two vectors, without a temporary vector
+    @staticmethod
+    def distance_sq(v1, v2):
+        x1, y1, z1 = _as_array(v1).tolist()
+        x2, y2, z2 = _as_array(v2).tolist()
+        x, y, z = x1 - x2, y1 - y2, z1 - z2
+        return x * x + y * y + z * z
+
+    @staticmethod
+    def distance(v1, v2):
+        return math.sqrt(Vec3.distance_sq(v1, v2))
+
+    # point at the given distance from origin in the direction of target
+    @staticmethod
+    def towards(origin, target, distance):
+        ox, oy, oz = _as_array(origin).tolist()
+        tx, ty, tz = _as_array(target).tolist()
+        x, y, z = tx - ox, ty - oy, tz - oz
+        norm = math.sqrt(x * x + y * y + z * z)
+        if norm != 0:
+            x, y, z = x / norm, y / norm, z / norm
+        return Vec3([x * distance + ox, y * distance + oy, z * distance + oz])
 
     @staticmethod
     def close(v1, v2, threshold=0.1):
-        return (v1 - v2).magnitude() < threshold
+        return Vec3.distance_sq(v1, v2) < threshold
 
 
-# convert a global position to a position relative to an object's transformation matrix
-def global_to_local(glob_pos: Vec3, object_transformation_matrix):
-    # Convert the position to a 4x1 matrix
-    global_position = glob_pos.data.copy()
-    global_position.extend([1])
-    global_position_matrix = np.array(global_position).reshape(4, 1)
+# raw array behind a Vec3, or the value itself for scalars and array likes
+def _as_array(value):
+    if type(value) is Vec3:
+        return value._data
+    return getattr(value, "_data", value)
+
 
+# convert a global position to a position relative to an object's transformation
+# matrix. Pass a Transform instead of a matrix to reuse its cached inverse
+def global_to_local(glob_pos: Vec3, object_transformation_matrix):
+    if isinstance(object_transformation_matrix, Transform):
+        return Vec3._wrap(object_transformation_matrix.to_local(glob_pos.data))
     # Calculate the inverse of the object's transformation matrix
     inverse_matrix = np.linalg.inv(object_transformation_matrix)
 
     # Multiply the global position by the inverse matrix
-    local_position_matrix = np.dot(inverse_matrix, global_position_matrix)
-
-    # Convert the result back to a Vec3 and return it
-    return Vec3(local_position_matrix[:3, 0].tolist())
+    local_position = inverse_matrix[:3, :3] @ glob_pos.data + inverse_matrix[:3, 3]
+    return Vec3._wrap(local_position)
 
 
 def local_to_global(local_pos: Vec3, object_transformation_matrix):
-    local_position = local_pos.data.copy()
-    local_position.extend([1])
-    # Convert the position to a 4x1 matrix
-    local_position_matrix = np.array(local_position).reshape(4, 1)
-
+    if isinstance(object_transformation_matrix, Transform):
+        return Vec3._wrap(object_transformation_matrix.to_global(local_pos.data))
+    matrix = np.asarray(object_transformation_matrix)
     # Multiply the local position by the object's transformation matrix
-    global_position_matrix = np.dot(object_transformation_matrix, local_position_matrix)
+    global_position = matrix[:3, :3] @ local_pos.data + matrix[:3, 3]
+    return Vec3._wrap(global_position)
+
 
-    # Convert the result back to a Vec3 and return it
-    return Vec3(global_position_matrix[:3, 0].tolist())
+# 4x4 transformation matrix of an object with its inverse cached. The inverse is only
+# recomputed after set() is given a matrix with different values. Converts a (3,)
+# point or (N, 3) points at a time
+class Transform:
+    __slots__ = ("_matrix", "_inverse")
+
+    def __init__(self, matrix=None):
+        self._matrix = None
+        self._inverse = None
+        self.set(matrix)
+
+    @property
+    def matrix(self):
+        return self._matrix
+
+    @property
+    def inverse(self):
+        if self._inverse is None:
+            self._inverse = np.linalg.inv(self._matrix)
+        return self._inverse
+
+    # use <matrix> from now on. It is copied, so the caller can keep changing its own
+    def set(self, matrix):
+        if matrix is None:
+            self._matrix = self._inverse = None
+            return
+        if self._matrix is not None and np.array_equal(self._matrix, matrix):
+            return
+        self._matrix = np.array(matrix, dtype=np.float64)
+        self._inverse = None
+
+    # global <points> in the object's local space
+    def to_local(self, points):
+        return _apply(self.inverse, points)
+
+    # local <points> in global space
+    def to_global(self, points):
+        return _apply(self._matrix, points)
+
+
+# <matrix> applied to a (3,) point or (N, 3) points
+def _apply(matrix, points):
+    points = np.asarray(points, dtype=np.float64)
+    if points.ndim == 1:
+        return matrix[:3, :3] @ points + matrix[:3, 3]
+    return points @ matrix[:3, :3].T + matrix[:3, 3]
 
 
 class BodyPart:
@@ -178,16 +345,17 @@ class Direction:
         self.final_loc = final_loc
         if not final_loc:
             self.final_loc = initial_loc
-        self._dir_str = f"{initial_loc.contestant_id}{final_loc.contestant_id}"
+        # (from, to) contestant ids
+        self._ids = (initial_loc.contestant_id, self.final_loc.contestant_id)
 
     def in_same_axis(self, dir):
-        return self._dir_str == dir._dir_str[::-1] or self._dir_str == dir._dir_str
+        return self._ids == dir._ids or self._ids == dir._ids[::-1]
 
     # if we meet a direction in the same axis, this function will tell us whether we
     # should add the magnitude of that vector or subtract it
     def get_added_velocity_coefficient(self, dir):
         assert self.in_same_axis(dir)
-        if self._dir_str == dir._dir_str:
+        if self._ids == dir._ids:
             return 1
         return -1
 
@@ -208,12 +376,15 @@ class Vector:
 
 
 # An object that has a weight and takes up space (specifically has a location and
-# momentum for now)
+# momentum for now). The momentum of every body part in a fight lives in
+# physics.PhysicsStore, this only describes a single part
 # forces: List of vectors
 class PhysicsAttr:
-    def __init__(self, mass: float = 10, forces: list = []):
+    def __init__(self, mass: float = 10, forces: list = None):
         self._mass = mass
-        self._forces = forces
+        # every object gets its own list, a shared default would let one body part
+        # push all the others
+        self._forces = [] if forces is None else forces
 
     def apply_force(self, impact, direction: Direction):
         velocity = impact / self._mass
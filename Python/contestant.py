@@ -2,11 +2,11 @@
 This file describes a contestant in a match
 """
 
-import bpy
 import sys
 import os
 
-dir = os.path.dirname(bpy.data.filepath)
+# dir = os.path.dirname(bpy.data.filepath)
+dir = os.path.dirname(__file__)
 if not dir in sys.path:
     sys.path.append(dir)
 else:
@@ -14,7 +14,6 @@ else:
     sys.path.append(dir)
 
 import importlib
-import numpy as np
 from enum import Enum
 from common import (
     BodyPart,
@@ -22,18 +21,30 @@ from common import (
     ConcreteBodyPart,
     Vec3,
     Location,
+    Transform,
     global_to_local,
     local_to_global,
     HeadVulnerability,
 )
 from action_list import Reaction, Attack, Combo
 from action import AttackImpl, _ActionInterface, ComboImpl
-from logger import logger, logg
+from action_table import ACTION_TABLE, ATTACK, REACTION, action_id
+from knowledge import KnowledgeBank, ReachIndex
+from combo_generator import attack_reach
+from reaction_window import ReactionWindow
+from random_streams import RandomStream, REACTION_STREAM, CHOICE_STREAM
+from logger import logger, get_logger
+import tick_profiler
 import common
 
-importlib.reload(common)
+# pick up edits between runs of a long lived Blender session. Outside Blender reloading
+# would only leave objects of stale classes around (which can't be pickled)
+if "bpy" in sys.modules:
+    importlib.reload(common)
 
 
+log = get_logger("contestant")
+
 body_weight_impact_contribution = 0.1
 
 
@@ -51,6 +62,8 @@ class ConcreteAction(_ActionInterface):
             action.name,
         )
         self.template = action
+        # id of the template in action_table.ACTION_TABLE
+        self.id = action_id(action)
         self.strike_locations = locations
         # range should be calculated based on stated action range and contestant body parts
         self.max_range = max_range
@@ -91,6 +104,7 @@ class Contestant:
         name,
         reaction_time=MAX_REACTION_TIME,
         learn_rate=None,
+        learn_rate_decay=0.0,
         caution=None,
         ambiguity=None,
         perception=None,
@@ -112,10 +126,17 @@ class Contestant:
         # name
         self.name = name
         # how many time steps need to pass before reaction is possible
+        if reaction_time > Contestant.MAX_REACTION_TIME:
+            raise ValueError(
+                f"Reaction time {reaction_time} is over {Contestant.MAX_REACTION_TIME}"
+            )
         self._reaction_time = reaction_time
         self._min_reaction_time = int(0.5 * reaction_time)
         # Learn rate (param): How quick probabilites are updated
         self._learn_rate = learn_rate
+        # Learn rate decay (param): How fast the learn rate drops as the knowledge
+        # bank fills up, learn_rate / (1 + learn_rate_decay * updates)
+        self._learn_rate_decay = learn_rate_decay
         # Caution (param): How much weight my knowledge bank emptiness has in my
         # aggressiveness.
         self._caution = caution
@@ -166,8 +187,8 @@ class Contestant:
         # team affiliation of this contestant
         self._team_affiliation = team_affiliation
         self.location = Vec3([self.id * 2, 0, 0])
-        # transformation matrix of the contestant in world space
-        self.transformation_matrix = None
+        # transformation matrix of the contestant in world space, and its inverse
+        self.transform = Transform()
 
         # private vars:
         # Map from body to
@@ -196,23 +217,35 @@ class Contestant:
         else:
             self.set_body_locations(body_locations)
 
+        # random streams (see random_streams.py), keyed again by the match seed when
+        # the contestant enters an environment
+        self.seed_streams(0)
+        # when set to a list every uniform used is appended to it (see fight_trace.py)
+        self.recorded_draws = None
+
         # action we are currently executing
         self._current_actions = []
         # actions to be taken on completion of current action
         self._next_actions = []
         self._combo_victim = None
-        # stack containing every action from what we last reacted to to what is
-        # currently happening
-        self._reaction_window = []
-        # every attack we know. map every attack to the range of the correspondeing body part
-        self._known_attacks = {
-            Attack["JAB_HEAD"]: self._range[BodyPart.HAND_L],
-            Combo["STEP_JAB_HEAD"]: 1.5 * self._range[BodyPart.HAND_L],
-        }
-        # sort known_attacks dict by value
-        self._known_attacks = dict(
-            sorted(self._known_attacks.items(), key=lambda item: item[1])
+        # every environment state from what we last reacted to to what is currently
+        # happening, stamped with the tick it was perceived on. The window is never
+        # longer than reaction_time + 1 before reactions are consumed
+        self._reaction_window = ReactionWindow(Contestant.MAX_REACTION_TIME + 1)
+        # number of updates so far
+        self._tick = 0
+        # every attack we know, sorted by how far it reaches with our limbs
+        self._reach_index = ReachIndex()
+        # knowledge bank. Holds the known attacks in the same order, weighted by how
+        # often they landed
+        self._knowledge = KnowledgeBank(
+            learn_rate=learn_rate, learn_rate_decay=learn_rate_decay
         )
+        # known attack from the action_table ids of its parts, to tell which attack
+        # landed a hit
+        self._attack_by_parts = {}
+        for attack in (Attack["JAB_HEAD"], Combo["STEP_JAB_HEAD"]):
+            self.learn_attack(attack)
         # map each attack to reaction and probability of selecting that action. Every time
         # that reaction is successfull it becomes slightly more likely
         # % weight on left and right feet (weight distr)
@@ -229,6 +262,37 @@ class Contestant:
         # that action is still happening, start reacting. if that action stops, we can
         # decide what to do from there
 
+    # add <attack> to the known attacks, keeping them sorted by reach
+    def learn_attack(self, attack, reach=None):
+        if attack in self._reach_index:
+            return
+        if reach is None:
+            reach = attack_reach(attack, self._range)
+        position = self._reach_index.insert(attack, action_id(attack), reach)
+        self._knowledge.learn_attack(attack, position)
+        self._attack_by_parts.setdefault(
+            frozenset(ACTION_TABLE.component_ids(action_id(attack))), attack
+        )
+
+    # change the reach of a limb (e.g. after an injury) and move every known attack
+    # using it to its new place in the reach order
+    def set_limb_range(self, body_part, reach):
+        if body_part not in self._range:
+            raise ValueError(f"Body part {body_part} has no range")
+        self._range[body_part] = reach
+        for attack in list(self._reach_index.attacks):
+            if not ACTION_TABLE.involves_part(action_id(attack), body_part):
+                continue
+            position = self._reach_index.set_reach(
+                attack, attack_reach(attack, self._range)
+            )
+            self._knowledge.move_attack(attack, position)
+
+    # learn every combo of a combo_generator.ComboLibrary, or its first <limit> ones
+    def learn_combos(self, library, limit=None):
+        for combo in library.combos()[:limit]:
+            self.learn_attack(combo)
+
     def set_body_locations(self, skeleton_info):
         body_locations, transformation_matrix = skeleton_info
         assert len(body_locations) == 8, "Body must have 8 ik_targets"
@@ -243,25 +307,36 @@ class Contestant:
             "shoulder_r": body_locations[7],
         }
         self.location = self._body_locations["head"]
-        self.transformation_matrix = transformation_matrix
+        self.transform.set(transformation_matrix)
+
+    @property
+    def transformation_matrix(self):
+        return self.transform.matrix
 
     # list of info packets
     def update(self, environment_state: list):
-        # logger.debug(f'{self.name} update:')
-        logger.debug(f"-----------------{self.name}---------------")
+        log.debug("-----------------%s---------------", self.name)
         current_actions = []
-        self._reaction_window.append(environment_state)
+        self._reaction_window.push(self._tick, environment_state)
+        self._tick += 1
 
         # Decide the best course of action in the current state
-        logger.debug(f"{len(self._reaction_window)} stored reactions")
+        log.debug("%d stored reactions", len(self._reaction_window))
 
         # Get the number of reactions to consume this update, decide what moves to make
         def react_to_environment():
             reactions_consumed_this_update = self._get_num_reactions_this_step()
             chosen_actions = []
+            # react to the states in the order they were perceived
             for _ in range(reactions_consumed_this_update):
-                cur_state = self._reaction_window.pop()
+                cur_state = self._reaction_window.pop_oldest()
+                self._learn(cur_state)
+                profiler = tick_profiler.active
+                if profiler:
+                    profiler.start(tick_profiler.CHOOSE_ACTIONS, self.id)
                 chosen_actions = self.choose_actions(cur_state)
+                if profiler:
+                    profiler.stop()
             if chosen_actions and len(chosen_actions) > 0:
                 current_actions.extend(chosen_actions)
             else:
@@ -269,7 +344,7 @@ class Contestant:
 
         # choose what moves to make next
         react_to_environment()
-        logger.debug(f"Chosen actions: {current_actions}")
+        log.debug("Chosen actions: %s", current_actions)
         # return new state
         self._current_actions = current_actions
         return ContestantState(self, self._current_actions)
@@ -301,18 +376,36 @@ class Contestant:
         win_len = len(self._reaction_window)
         if win_len < self._min_reaction_time:
             return 0
+        # fell behind: catch up to the state perceived reaction_time ago
         if win_len > self._reaction_time:
-            reactions_to_consume = self._reaction_time - win_len
+            reactions_to_consume = win_len - self._reaction_time
 
         # <min_reaction_time>[x, x, x, _, _, _, _]<max_reaction_time>
         # pick a position in the spots we are allowed to play with within imx and max
         # reaction times. if it's occupied reactions to consume is 0. if it's not
         # reactions to consume is 2
-        coin_flip = np.random.randint(0, 3)
+        coin_flip = int(self._draw_uniform(REACTION_STREAM) * 3)
         if self.name == "Jack":
-            logger.debug(f"coin_flip: {coin_flip}")
+            log.debug("coin_flip: %d", coin_flip)
         reactions_to_consume += coin_flip
-        return reactions_to_consume
+        return min(reactions_to_consume, win_len)
+
+    # Give the contestant fresh random streams for a match with seed <match_seed>. Each
+    # kind of decision draws from its own stream, so a contestant's decisions only
+    # depend on the match seed and its id, which lets lockstep.py reproduce them for
+    # thousands of matches at once
+    def seed_streams(self, match_seed):
+        self._streams = {
+            stream: RandomStream(match_seed, self.id, stream)
+            for stream in (REACTION_STREAM, CHOICE_STREAM)
+        }
+
+    # next uniform random number in [0, 1) of <stream>
+    def _draw_uniform(self, stream):
+        uniform = self._streams[stream].uniform()
+        if self.recorded_draws is not None:
+            self.recorded_draws.append(uniform)
+        return uniform
 
     def _calculate_body_mass(self):
         sum = 0
@@ -320,21 +413,16 @@ class Contestant:
             sum += phys_attr._mass
         return sum
 
-    # TODO: calculate impact based on the striking part and current velocity
-    def _get_action_impact(self, action: AttackImpl):
-        involved_body_parts = action.target_body_parts
+    # how hard <action> hits: the momentum of the body parts striking with it, taken
+    # from <physics> (a physics.PhysicsStore), plus a share of the body weight it shifts
+    def _get_action_impact(self, action: AttackImpl, physics):
         weight_moved = abs(
             action.init_weight_distribution[0] - action.final_weight_distribution[0]
         ) + abs(
             action.init_weight_distribution[1] - action.final_weight_distribution[1]
         )
-        total_impact = 0
-        for body_part in involved_body_parts:
-            total_impact += (
-                self.body[body_part]._mass
-                * self.body[body_part]._forces[action.id].get_kinematics()[1]
-            )
-
+        rows = physics.rows(self.id, action.target_body_locations.keys())
+        total_impact = physics.impact(rows)
         total_impact += weight_moved * self.body_mass * body_weight_impact_contribution
         return total_impact
 
@@ -345,38 +433,37 @@ class Contestant:
             return None
 
     # limit/modify where we want to hit by range of contestant
-    def _get_strike_locations(self, action, victim):
+    # victim_body_locations: the victim's body locations as we perceive them
+    def _get_strike_locations(self, action, victim_body_locations):
         result = []
 
         # limit target by range from body_part_loc: shoulder_loc + range * direction(i.e. target - shoulder_loc)
         def limit_target_to_body_part_range(target, body_part):
             body_part_loc = self._body_part_to_ik_location(body_part)
-            target = (
-                body_part_loc
-                + (target - body_part_loc).normalize() * self._range[body_part]
-            )
-            return target
+            return Vec3.towards(body_part_loc, target, self._range[body_part])
 
         # select target location in world space based on body part
         def loc_to_victim_world_pos(loc, victim, target):
             if loc == Location.CHIN:
-                logger.debug(
-                    f"Contestant: {self._body_locations['head']} is attacking head of {victim._body_locations['head']}"
+                log.debug(
+                    "Contestant: %s is attacking head of %s",
+                    self._body_locations["head"],
+                    victim["head"],
                 )
-                target = Vec3(victim._body_locations["head"])
+                target = Vec3(victim["head"])
             elif loc == Location.FOOT_L_OUTSIDE:
-                logger.debug(
-                    f"Contestant: {self._body_locations['foot_l']} is attacking foot of {victim._body_locations['foot_r']}"
+                log.debug(
+                    "Contestant: %s is attacking foot of %s",
+                    self._body_locations["foot_l"],
+                    victim["foot_r"],
                 )
                 # Convert victim leg location to local space, add x axis offset and
                 # convert back to world space
                 victim_leg_local_location = global_to_local(
-                    victim._body_locations["foot_r"], self.transformation_matrix
+                    victim["foot_r"], self.transform
                 )
                 victim_leg_local_location[0] += Location.FOOT_OUTSIDE_OFFSET
-                target = local_to_global(
-                    victim_leg_local_location, self.transformation_matrix
-                )
+                target = local_to_global(victim_leg_local_location, self.transform)
             return target
 
         # calculate optimal position for this body part in this action
@@ -386,7 +473,7 @@ class Contestant:
         for body_part, loc in action.target_body_locations.items():
             target = Vec3()
             # select target location in world space based on body part
-            target = loc_to_victim_world_pos(loc, victim, target)
+            target = loc_to_victim_world_pos(loc, victim_body_locations, target)
             target = calculate_optimal_position(target, body_part)
             target = limit_target_to_body_part_range(target, body_part)
 
@@ -401,23 +488,24 @@ class Contestant:
             if not victim:
                 victim = self._select_victim(env_state)
             if not victim:
-                logg("No victim found")
+                log.debug("No victim found")
                 return None
 
+            victim_body_locations = _perceived_body_locations(victim)
             # if attack is a combo execute everything in the combo
             if not isinstance(action_template, ComboImpl):
-                strike_locations = self._get_strike_locations(action_template, victim)
+                strike_locations = self._get_strike_locations(
+                    action_template, victim_body_locations
+                )
                 return [ConcreteAction(action_template, strike_locations)]
             else:
                 combo = action_template
                 combo_actions = []
                 for template in combo.actions:
                     strike_locations = self._get_strike_locations(
-                        template, victim.contestant
-                    )
-                    combo_actions.append(
-                        ConcreteAction(template, strike_locations, dist_to_victim)
+                        template, victim_body_locations
                     )
+                    combo_actions.append(ConcreteAction(template, strike_locations))
                 return combo_actions
             raise NotImplementedError("It should not be possible to reach this point")
         # choose action (multiple can be chosen if they have distinct body parts)
@@ -449,57 +537,79 @@ class Contestant:
         # if we are attacking and nothing has changed keep at it
         victim = self._select_victim(env_state)
         if not victim:
-            logg("No victim found")
+            log.debug("No victim found")
             return None
 
         # get range of longest attack
-        max_range = self._known_attacks.values()[-1]
+        max_range = self._reach_index.max_reach()
 
-        # get all victim body parts that are exposed
-        exposed_vulnerabilites = victim.contestant.get_exposed_vulnerabilites()
-        dist_to_victim = (
-            self._body_locations["head"] - exposed_vulnerabilites[0]
-        ).magnitude()
+        # get all victim body parts that are exposed, where we saw them
+        exposed_vulnerabilites = victim.contestant._get_exposed_vulnerabilites(
+            victim.body_locations
+        )
+        dist_to_victim = Vec3.distance(
+            self._body_locations["head"], exposed_vulnerabilites[0]
+        )
         if dist_to_victim > max_range:
-            logg("Victim is out of range")
+            log.debug("Victim is out of range")
             return None
 
-        # possible attacks to choose from are all attacks that can reach the victim
-        possible_attacks = [
-            attack
-            for attack, range in self._known_attacks.items()
-            if range >= dist_to_victim
-        ]
-        assert len(possible_attacks) > 0, "No possible attacks found while in range"
+        # possible attacks to choose from are all attacks that can reach the victim.
+        # Attacks are sorted by range so they start at the first that reaches
+        first_possible = self._reach_index.first_reaching(dist_to_victim)
+        assert first_possible < len(self._reach_index), "No attack reaches victim"
 
-        # randomly select an attack
-        concrete_attack = possible_attacks[np.random.randint(0, len(possible_attacks))]
+        # select an attack, weighted by how well it worked so far
+        concrete_attack = self._knowledge.sample_attack(
+            self._draw_uniform(CHOICE_STREAM), first_possible
+        )
         # if attack is a combo execute everything in the combo
-        if not isinstance(concrete_attack.template, ComboImpl):
+        if not isinstance(concrete_attack, ComboImpl):
             strike_locations = self._get_strike_locations(
-                concrete_attack, victim.contestant
+                concrete_attack, victim.body_locations
             )
-            return [
-                ConcreteAction(
-                    concrete_attack.template, strike_locations, dist_to_victim
-                )
-            ]
+            return [ConcreteAction(concrete_attack, strike_locations, dist_to_victim)]
 
         # if attack is a combo, execute each action in the combo
         # TODO: store the body parts involved in each action in the combo
         # if the body part is already involved in an executing action, skip it
         # also if a connected body part is involved in an executing action, skip it
-        combo = concrete_attack.template
+        combo = concrete_attack
         combo_actions = []
         for action in combo.actions:
-            strike_locations = self._get_strike_locations(action, victim.contestant)
+            strike_locations = self._get_strike_locations(action, victim.body_locations)
             combo_actions.append(
                 ConcreteAction(action, strike_locations, dist_to_victim)
             )
         return combo_actions
 
-    def _get_exposed_vulnerabilites(self):
-        return [self._body_locations["head"]]
+    # update the knowledge bank with what we perceived in <env_state>: which of our
+    # attacks landed, what landed on us and how opponents reacted to our attacks
+    def _learn(self, env_state):
+        if not self._knowledge.learns or not env_state:
+            return
+        own_action_ids = env_state[self.id].action_ids
+        own_attack_ids = [i for i in own_action_ids if ACTION_TABLE.kind[i] == ATTACK]
+        attack = self._attack_by_parts.get(frozenset(own_action_ids))
+        for packet in env_state.values():
+            for hit in packet._hits:
+                if hit.contestant_id == self.id and attack is not None:
+                    self._knowledge.reinforce_attack(attack)
+                elif packet.contestant.id == self.id:
+                    self._knowledge.observe_threat(hit.action_id)
+            if packet.contestant.id == self.id:
+                continue
+            for reaction_id in packet.action_ids_seen_by(self.id):
+                if ACTION_TABLE.kind[reaction_id] != REACTION:
+                    continue
+                for attack_id in own_attack_ids:
+                    self._knowledge.observe_reaction(attack_id, reaction_id)
+
+    # body_locations: where this contestant's body is seen, defaults to where it is
+    def _get_exposed_vulnerabilites(self, body_locations=None):
+        if body_locations is None:
+            body_locations = self._body_locations
+        return [body_locations["head"]]
 
     def _select_victim(self, env_state):
         if len(env_state) < 2:
@@ -520,6 +630,14 @@ class Contestant:
         pass
 
 
+# Body locations of a victim as perceived through an environment info packet, or as
+# they are right now when handed a contestant
+def _perceived_body_locations(victim):
+    if isinstance(victim, Contestant):
+        return victim._body_locations
+    return victim.body_locations
+
+
 class EnvPacketDummy:
     def __init__(self, contestant):
         self.contestant = contestant
@@ -0,0 +1,461 @@
+import os, sys
+
+dir = os.path.dirname(__file__)
+if not dir in sys.path:
+    sys.path.append(dir)
+import numpy as np
+import contestant
+from contestant import ContestantState
+from action_table import ACTION_TABLE, ATTACK
+from common import BodyPart, ConcreteBodyPart, Hit, Vec3
+from collision import swept_spheres_vs_boxes
+from broadphase import SweepAndPrune, sphere_aabb, box_aabb
+from perception import perceive_actions
+from physics import PhysicsStore
+from random_streams import RandomStream, PERCEPTION_STREAM
+from logger import get_logger
+import tick_profiler
+import importlib
+
+# pick up edits between runs of a long lived Blender session. Outside Blender reloading
+# would only leave objects of stale classes around (which can't be pickled)
+if "bpy" in sys.modules:
+    importlib.reload(contestant)
+
+log = get_logger("environment")
+
+
+# Information about a contestant in a step. Works on a 'per-contestant' basis
+class EnvInfoPacket:
+    def __init__(
+        self,
+        contestant,
+        action_tags=None,
+        hits=None,
+        body_locations=None,
+        transformation_matrix=None,
+        action_ids=None,
+        perceived_action_ids=None,
+    ):
+        self.contestant = contestant
+        self._action_tags = action_tags if action_tags is not None else []
+        self._hits = hits if hits is not None else []
+        # extra info needed to choose an action added to info packet here
+        # stuff like positions, momentums, etc
+        # where the contestant's body was when the packet was frozen
+        self.body_locations = body_locations
+        self.transformation_matrix = transformation_matrix
+        # action_table ids of the actions the contestant was executing
+        self.action_ids = action_ids if action_ids is not None else []
+        # observer id -> action ids that observer mistook the actions for. Observers
+        # missing from it saw action_ids
+        self.perceived_action_ids = (
+            perceived_action_ids if perceived_action_ids is not None else {}
+        )
+
+    # action ids of the actions as the contestant <observer_id> perceived them
+    def action_ids_seen_by(self, observer_id):
+        return self.perceived_action_ids.get(observer_id, self.action_ids)
+
+    # copy of this packet as the contestant is right now, carrying <hits> (the hits the
+    # contestant took this tick). Contestants keep packets around in their reaction
+    # window, so what they react to can't change afterwards
+    def freeze(self, hits):
+        return EnvInfoPacket(
+            self.contestant,
+            list(self._action_tags),
+            list(hits),
+            {
+                name: location.copy()
+                for name, location in self.contestant._body_locations.items()
+            },
+            np.array(self.contestant.transformation_matrix),
+            [action.id for action in self.contestant._current_actions],
+        )
+
+
+# radius of the bounding sphere around each body part that can land a strike
+STRIKE_RADII = {
+    BodyPart.HAND_L: 0.06,
+    BodyPart.HAND_R: 0.06,
+    BodyPart.FOOT_L: 0.08,
+    BodyPart.FOOT_R: 0.08,
+}
+# half extents of the hit box around each body part that can be struck, in the
+# contestant's own space
+HIT_BOX_HALF_EXTENTS = {
+    BodyPart.HEAD: (0.1, 0.1, 0.12),
+    BodyPart.TORSO: (0.18, 0.12, 0.3),
+}
+
+
+# Pose engines are imported on demand so the headless backend never needs bpy.
+# "blender": drive the rig in a running Blender instance
+# "headless": pure numpy kinematics, for batch runs on machines without Blender
+def _load_pose_engine(pose_backend):
+    if pose_backend == "blender":
+        import blender.pose_engine
+
+        importlib.reload(blender.pose_engine)
+        return blender.pose_engine.PoseEngine
+    elif pose_backend == "headless":
+        from headless.pose_engine import PoseEngine
+
+        return PoseEngine
+    raise ValueError(f"Invalid pose backend: {pose_backend}")
+
+
+# takes in contestant states as input to update()
+# gives out info packets as as output to info()
+class Environment:
+    def __init__(
+        self,
+        contestant_team_map,
+        sim_frame_rate=10,
+        anim_frame_rate=24,
+        pose_backend="blender",
+        seed=None,
+    ):
+        self.contestant_team_map = contestant_team_map
+        self._sim_frame_rate = sim_frame_rate
+        self._anim_frame_rate = anim_frame_rate
+        self._game_over = False
+        # striking limbs touching a hit box at the end of their last update. A limb
+        # that starts a tick touching a box only strikes it again once it has left.
+        # contestant id -> {(action table id, striking part, victim id, body part)}
+        self._contacts = {}
+        # set by recorders that read the hits with take_hits(). Hits are only kept
+        # for them while it's set
+        self.collect_hits = False
+        # every hit landed since the last call to take_hits()
+        self._new_hits = []
+        # victim id -> hits it took since the last call to current_state()
+        self._tick_hits = {}
+        # match seed every random stream of the fight is keyed by. Drawn from the
+        # global generator when not given, so np.random.seed still fixes a fight
+        if seed is None:
+            seed = np.random.randint(2**32, dtype=np.int64)
+        self.seed = int(seed)
+
+        # Make space for the info packet of each contestant
+        self._info_packets = {}
+        self.clear_info_packets()
+
+        contestants = list(contestant_team_map)
+        # contestant id -> stream that draws which actions the contestant misperceives
+        self._perception_streams = {}
+        for contestant in contestants:
+            contestant.seed_streams(self.seed)
+            self._perception_streams[contestant.id] = RandomStream(
+                self.seed, contestant.id, PERCEPTION_STREAM
+            )
+        # instantiate engine to handle skeleton posing
+        PoseEngine = _load_pose_engine(pose_backend)
+        self._pose_engine = PoseEngine(contestants, sim_frame_rate, anim_frame_rate)
+
+        # momentum of every body part, stepped once per tick
+        self._physics = PhysicsStore(1.0 / sim_frame_rate)
+        # contestant id -> physics rows of its body parts, in PHYSICS_PARTS order
+        self._physics_rows = {}
+
+        # Give each contestant an Ik skeleton and a PhysAnim skeleton
+        for contestant in contestants:
+            body_locations = self._pose_engine.get_contestant_ik_target_locations(
+                contestant
+            )
+            contestant.set_body_locations(body_locations)
+            self._physics_rows[contestant.id] = self._physics.add_body(
+                contestant.id, _part_masses(contestant), _part_locations(contestant)
+            )
+
+        # register every striking limb and hit box with the broadphase
+        self._broadphase = SweepAndPrune()
+        # contestant id -> {body part: broadphase handle}
+        self._strike_proxies = {}
+        self._hit_box_proxies = {}
+        for contestant in contestants:
+            self._add_proxies(contestant)
+
+    def update(self, contestant_state: ContestantState):
+        contestant = contestant_state.contestant
+        actions = []
+        action_tags = []
+        strike_attempts = {}
+
+        # store action tags
+        contestant_info_packet = self._info_packets[contestant.id]
+        for action in contestant._current_actions:
+            # store tags to be passed to other contestants
+            action_tags.extend(action.tags)
+            # store actions to be passed to pose engine
+            actions.append(action)
+            # store mapping between who is being hit and with what bodypart
+            if ACTION_TABLE.kind[action.id] == ATTACK:
+                for body_part in action.target_body_locations:
+                    strike_attempts[body_part] = action
+        contestant_info_packet._action_tags = action_tags
+
+        # hand over the hits this contestant took since its last update
+        hits = contestant_info_packet._hits
+        contestant_info_packet._hits = []
+        # where the striking limbs start this tick, hits are swept from here
+        sweep_starts = _strike_locations(contestant)
+        # update the contestants skeletons
+        profiler = tick_profiler.active
+        if profiler:
+            profiler.start(tick_profiler.POSE_ENGINE_UPDATE, contestant.id)
+        self._pose_engine.update(contestant, actions, hits)
+        if profiler:
+            profiler.stop()
+        # give contestant their new body info
+        body_locations = self._pose_engine.get_contestant_ik_target_locations(
+            contestant
+        )
+        contestant.set_body_locations(body_locations)
+        self._update_proxies(contestant, sweep_starts)
+        self._physics.drive(
+            self._physics_rows[contestant.id], _part_locations(contestant)
+        )
+
+        # use skeletons to check if hits occurred
+        if profiler:
+            profiler.start(tick_profiler.HIT_DETECTION, contestant.id)
+        landed = self._calculate_hits(contestant, strike_attempts, sweep_starts)
+        if profiler:
+            profiler.stop()
+        for hit in landed:
+            victim_id = hit.affected_body_part.contestant_id
+            self._info_packets[victim_id]._hits.append(hit)
+            self._tick_hits.setdefault(victim_id, []).append(hit)
+            if self.collect_hits:
+                self._new_hits.append(hit)
+
+    # Exact test of every striking body part of <attacker> against the opponent hit
+    # boxes the broadphase says are close to it, in one batched pass. Limbs are swept
+    # from where they were at the start of the tick, so they can't pass through a hit
+    # box between two ticks. Hit boxes are tested where they are now.
+    # strike_attempts: striking body part -> action it is executing
+    # sweep_starts: striking body part -> (3,) location at the start of the tick
+    # A strike lands when the limb enters a hit box during the tick, or when it
+    # starts the tick touching one it wasn't touching before and moves towards it
+    def _calculate_hits(self, attacker, strike_attempts, sweep_starts):
+        previous_contacts = self._contacts.get(attacker.id, set())
+        # the contacts of the limbs striking now are found again below
+        attempts = {(action.id, part) for part, action in strike_attempts.items()}
+        contacts = {key for key in previous_contacts if key[:2] not in attempts}
+        self._contacts[attacker.id] = contacts
+
+        # candidate (striker, target) pairs from the broadphase. It only pairs limbs
+        # with hit boxes of opposing teams
+        strikers = []
+        targets = {}
+        candidate_pairs = []
+        for part in strike_attempts:
+            striker_handle = self._strike_proxies[attacker.id][part]
+            for target_handle in self._broadphase.candidates(striker_handle):
+                target_index = targets.setdefault(target_handle, len(targets))
+                candidate_pairs.append((len(strikers), target_index))
+            strikers.append(part)
+        if not candidate_pairs:
+            return []
+
+        starts = np.array([sweep_starts[part] for part in strikers])
+        ends = Vec3.stack(
+            [attacker._body_part_to_ik_location(part) for part in strikers]
+        )
+        sphere_radii = np.array([STRIKE_RADII[part] for part in strikers])
+        target_owners = [self._broadphase.owner(handle) for handle in targets]
+        box_centers, box_rotations, box_half_extents = _pack_hit_boxes(target_owners)
+
+        hit_matrix, times_of_impact = swept_spheres_vs_boxes(
+            starts[:, np.newaxis],
+            ends[:, np.newaxis],
+            sphere_radii[:, np.newaxis],
+            box_centers[np.newaxis],
+            box_rotations[np.newaxis],
+            box_half_extents[np.newaxis],
+        )
+        # touching at the end of the tick, and moving towards the box
+        touching_at_end, _ = swept_spheres_vs_boxes(
+            ends[:, np.newaxis],
+            ends[:, np.newaxis],
+            sphere_radii[:, np.newaxis],
+            box_centers[np.newaxis],
+            box_rotations[np.newaxis],
+            box_half_extents[np.newaxis],
+        )
+        approaching = (
+            np.sum(
+                (ends - starts)[:, np.newaxis]
+                * (box_centers[np.newaxis] - starts[:, np.newaxis]),
+                axis=-1,
+            )
+            > 0
+        )
+        hits = []
+        # resolve hits in the order they happened during the tick
+        candidate_pairs.sort(key=lambda pair: times_of_impact[pair])
+        for striker_index, target_index in candidate_pairs:
+            if not hit_matrix[striker_index, target_index]:
+                continue
+            part = strikers[striker_index]
+            action = strike_attempts[part]
+            victim, body_part = target_owners[target_index]
+            contact = (action.id, part, victim.id, body_part)
+            if touching_at_end[striker_index, target_index]:
+                contacts.add(contact)
+            time_of_impact = times_of_impact[striker_index, target_index]
+            if time_of_impact == 0 and (
+                contact in previous_contacts
+                or not approaching[striker_index, target_index]
+            ):
+                continue
+            impact = attacker._get_action_impact(action, self._physics)
+            # the striking part passes its momentum on to the part it hit
+            striker_row = self._physics.rows(attacker.id, [strikers[striker_index]])
+            victim_row = self._physics.rows(victim.id, [body_part])
+            self._physics.apply_impulse(victim_row, self._physics.momentum(striker_row))
+            hits.append(
+                Hit(
+                    ConcreteBodyPart(victim.id, body_part),
+                    impact,
+                    attacker.id,
+                    action.name,
+                    action.id,
+                    float(time_of_impact),
+                )
+            )
+        if hits:
+            log.debug("Hits: %s", hits)
+        return hits
+
+    def _add_proxies(self, contestant):
+        team = self.contestant_team_map[contestant]
+        self._strike_proxies[contestant.id] = {
+            part: self._broadphase.add_proxy(
+                (contestant, part), team, SweepAndPrune.STRIKER, *aabb
+            )
+            for part, aabb in _strike_aabbs(contestant)
+        }
+        self._hit_box_proxies[contestant.id] = {
+            part: self._broadphase.add_proxy(
+                (contestant, part), team, SweepAndPrune.TARGET, *aabb
+            )
+            for part, aabb in _hit_box_aabbs(contestant)
+        }
+
+    # incrementally move a contestant's proxies to its current body locations. Given
+    # <sweep_starts>, striker proxies cover the whole move from there
+    def _update_proxies(self, contestant, sweep_starts=None):
+        for part, aabb in _strike_aabbs(contestant, sweep_starts):
+            self._broadphase.update_proxy(
+                self._strike_proxies[contestant.id][part], *aabb
+            )
+        for part, aabb in _hit_box_aabbs(contestant):
+            self._broadphase.update_proxy(
+                self._hit_box_proxies[contestant.id][part], *aabb
+            )
+
+    # Given all the contestant skeletons display on screen
+    def draw(self):
+        return
+
+    def extract_ik_targets_from_skeleton(self, skeleton):
+        return skeleton.get_ik_targets()
+
+    # frozen copy of every info packet, as perceived at the end of this tick. Called
+    # once per tick, each packet carries the hits its contestant took during the tick
+    # and how every other contestant perceived its actions
+    def current_state(self):
+        self._pose_engine.pose()
+        self._physics.step()
+        tick_hits, self._tick_hits = self._tick_hits, {}
+        state = {
+            contestant_id: packet.freeze(tick_hits.get(contestant_id, []))
+            for contestant_id, packet in self._info_packets.items()
+        }
+        perceive_actions(state, self._perception_streams)
+        return state
+
+    # hits landed since the last call, in the order they landed
+    def take_hits(self):
+        hits = self._new_hits
+        self._new_hits = []
+        return hits
+
+    def clear_info_packets(self):
+        for contestant in self.contestant_team_map:
+            self._info_packets[contestant.id] = EnvInfoPacket(contestant)
+
+    def simulation_is_over(self):
+        return self._game_over
+
+
+# Pack hit boxes into arrays for the batched narrow phase.
+# targets: list of (contestant, body part)
+# Returns the box centers, rotation matrices and half extents
+def _pack_hit_boxes(targets):
+    centers = []
+    rotations = []
+    half_extents = []
+    for contestant, body_part in targets:
+        centers.append(contestant._body_part_to_ik_location(body_part).data)
+        rotations.append(np.asarray(contestant.transformation_matrix)[:3, :3])
+        half_extents.append(HIT_BOX_HALF_EXTENTS[body_part])
+    return (
+        np.array(centers, dtype=np.float64).reshape(-1, 3),
+        np.array(rotations, dtype=np.float64).reshape(-1, 3, 3),
+        np.array(half_extents, dtype=np.float64).reshape(-1, 3),
+    )
+
+
+# body parts of every contestant in the physics store
+PHYSICS_PARTS = [
+    BodyPart.HEAD,
+    BodyPart.TORSO,
+    BodyPart.HAND_L,
+    BodyPart.HAND_R,
+    BodyPart.FOOT_L,
+    BodyPart.FOOT_R,
+]
+
+
+# body part -> mass of every part of a contestant, in PHYSICS_PARTS order
+def _part_masses(contestant):
+    masses = {part.body_part: attr._mass for part, attr in contestant.body.items()}
+    return {part: masses[part] for part in PHYSICS_PARTS}
+
+
+# (len(PHYSICS_PARTS), 3) locations of the body parts of a contestant
+def _part_locations(contestant):
+    return np.array(
+        [contestant._body_part_to_ik_location(part).data for part in PHYSICS_PARTS]
+    )
+
+
+# striking body part -> (3,) location of every striking limb of a contestant
+def _strike_locations(contestant):
+    return {
+        part: contestant._body_part_to_ik_location(part).data.copy()
+        for part in STRIKE_RADII
+    }
+
+
+# (body part, bounding box) of every striking limb of a contestant, around the sphere
+# swept from <sweep_starts> (striking body part -> location) if given
+def _strike_aabbs(contestant, sweep_starts=None):
+    for part, radius in STRIKE_RADII.items():
+        center = contestant._body_part_to_ik_location(part).data
+        low, high = sphere_aabb(center, radius)
+        if sweep_starts is not None:
+            start_low, start_high = sphere_aabb(sweep_starts[part], radius)
+            low, high = np.minimum(low, start_low), np.maximum(high, start_high)
+        yield part, (low, high)
+
+
+# (body part, bounding box) of every hit box of a contestant
+def _hit_box_aabbs(contestant):
+    rotation = np.asarray(contestant.transformation_matrix)[:3, :3]
+    for part, half_extents in HIT_BOX_HALF_EXTENTS.items():
+        center = contestant._body_part_to_ik_location(part).data
+        yield part, box_aabb(center, rotation, np.array(half_extents))
@@ -0,0 +1,323 @@
+"""
+Columnar on-disk record of a fight. A trace is a directory with a meta.json and one raw
+little endian file per column, so any column can be opened with numpy.memmap and any
+range of ticks sliced without reading the rest of the file.
+
+Fixed width columns hold one row per tick:
+    body_locations  float64 (ticks, contestants, 8, 3)  ik targets, in
+                    set_body_locations order
+    transforms      float64 (ticks, contestants, 4, 4)  transformation matrices
+    active_actions  int32   (ticks, contestants, MAX_ACTIVE_ACTIONS)  action_table
+                    ids, -1 padded. meta["actions"] holds the name of every id
+    hits_end        int64   (ticks,)  number of hits recorded up to the end of each tick
+    draws_end       int64   (ticks,)  same for random draws
+Variable length columns hold every event in tick order and are sliced with *_end:
+    hits            (tick, attacker, victim, body_part, action) int32 records. attacker
+                    and victim are contestant slots, body_part a BodyPart
+    draws           (tick, contestant, value) records of every uniform a contestant used
+
+With a snapshot interval N the writer also pickles the full state of the fight
+(contestants with their reaction windows, knowledge and random streams, the environment
+and pose engine) every N ticks into snapshots.bin. snapshot_index holds
+one (tick, offset, size) record per snapshot, so the snapshot before any tick is found
+with a division and seeking only re-simulates at most N - 1 ticks.
+
+Record a fight with fight(..., recorder=TraceWriter(path)) and read it back with
+FightTrace(path). Snapshots need the headless pose backend.
+"""
+
+import sys
+import os
+
+dir = os.path.dirname(__file__)
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import json
+import pickle
+import numpy as np
+from action_table import ACTION_TABLE
+from sim_clock import FixedTimestepClock
+
+TRACE_VERSION = 3
+# most actions a contestant can be executing at once (e.g. every part of a combo)
+MAX_ACTIVE_ACTIONS = 4
+
+HIT_DTYPE = np.dtype(
+    [
+        ("tick", "<i4"),
+        ("attacker", "<i4"),
+        ("victim", "<i4"),
+        ("body_part", "<i4"),
+        ("action", "<i4"),
+    ]
+)
+DRAW_DTYPE = np.dtype([("tick", "<i4"), ("contestant", "<i4"), ("value", "<f8")])
+SNAPSHOT_INDEX_DTYPE = np.dtype([("tick", "<i8"), ("offset", "<i8"), ("size", "<i8")])
+
+
+# dtype and per tick shape of every fixed width column, for <contestants> contestants
+def _tick_columns(contestants):
+    return {
+        "body_locations": (np.dtype("<f8"), (contestants, 8, 3)),
+        "transforms": (np.dtype("<f8"), (contestants, 4, 4)),
+        "active_actions": (np.dtype("<i4"), (contestants, MAX_ACTIVE_ACTIONS)),
+        "hits_end": (np.dtype("<i8"), ()),
+        "draws_end": (np.dtype("<i8"), ()),
+    }
+
+
+_EVENT_COLUMNS = {"hits": HIT_DTYPE, "draws": DRAW_DTYPE}
+
+
+# Everything needed to carry on a fight after <tick> ticks. main.resume() continues it
+class Snapshot:
+    def __init__(self, tick, total_ticks, contestants, env, env_state):
+        self.tick = tick
+        self.total_ticks = total_ticks
+        self.contestants = contestants
+        self.env = env
+        # state the contestants react to on the next tick
+        self.env_state = env_state
+
+    @classmethod
+    def capture(cls, tick, total_ticks, contestants, env, env_state):
+        return cls(tick, total_ticks, contestants, env, env_state)
+
+    def to_bytes(self):
+        return pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def from_bytes(data):
+        snapshot = pickle.loads(data)
+        # draws and hits were being collected by the writer that took the snapshot
+        for contestant in snapshot.contestants:
+            contestant.recorded_draws = None
+        snapshot.env.collect_hits = False
+        return snapshot
+
+
+# Recorder for fight(). Appends one row per tick to every column file and, if
+# snapshot_interval is set, a snapshot every snapshot_interval ticks
+class TraceWriter:
+    def __init__(self, path, snapshot_interval=None):
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.ticks = 0
+        self._total_ticks = 0
+        self._snapshot_offset = 0
+        self._files = {}
+        self._contestants = []
+        self._env = None
+        self._slots = {}
+        self._hit_count = 0
+        self._draw_count = 0
+        self._meta = {}
+
+    # called by fight() once the environment is set up
+    def begin(self, contestants, env, delta, time_limit):
+        os.makedirs(self.path, exist_ok=True)
+        self._total_ticks = FixedTimestepClock.total_ticks(delta, time_limit)
+        self._contestants = list(contestants)
+        self._slots = {
+            contestant.id: slot for slot, contestant in enumerate(contestants)
+        }
+        self._columns = _tick_columns(len(self._contestants))
+        names = list(self._columns) + list(_EVENT_COLUMNS)
+        if self.snapshot_interval:
+            names += ["snapshots", "snapshot_index"]
+        for name in names:
+            self._files[name] = open(os.path.join(self.path, f"{name}.bin"), "wb")
+        for contestant in self._contestants:
+            contestant.recorded_draws = []
+        env.collect_hits = True
+        self._env = env
+        self._meta = {
+            "version": TRACE_VERSION,
+            "delta": delta,
+            "time_limit": time_limit,
+            "total_ticks": self._total_ticks,
+            "snapshot_interval": self.snapshot_interval,
+            "contestants": [
+                {"id": contestant.id, "name": contestant.name}
+                for contestant in self._contestants
+            ],
+        }
+        self._write_meta()
+        if self.snapshot_interval:
+            self._write_snapshot(env, [])
+
+    # called by fight() at the end of every tick with the state the contestants will
+    # react to next tick
+    def record(self, env, env_state):
+        C = len(self._contestants)
+        body_locations = np.empty((C, 8, 3))
+        transforms = np.empty((C, 4, 4))
+        active_actions = np.full((C, MAX_ACTIVE_ACTIONS), -1, dtype=np.int32)
+        draws = []
+        for slot, contestant in enumerate(self._contestants):
+            for row, location in enumerate(contestant._body_locations.values()):
+                body_locations[slot, row] = location.data
+            transforms[slot] = contestant.transformation_matrix
+            actions = contestant._current_actions[:MAX_ACTIVE_ACTIONS]
+            for index, action in enumerate(actions):
+                active_actions[slot, index] = action.id
+            draws.extend(
+                (self.ticks, slot, value) for value in contestant.recorded_draws
+            )
+            contestant.recorded_draws.clear()
+
+        hits = [
+            (
+                self.ticks,
+                self._slots[hit.contestant_id],
+                self._slots[hit.affected_body_part.contestant_id],
+                hit.affected_body_part.body_part,
+                hit.action_id,
+            )
+            for hit in env.take_hits()
+        ]
+        self._hit_count += len(hits)
+        self._draw_count += len(draws)
+
+        files = self._files
+        files["body_locations"].write(body_locations.tobytes())
+        files["transforms"].write(transforms.tobytes())
+        files["active_actions"].write(active_actions.tobytes())
+        files["hits_end"].write(np.int64(self._hit_count).tobytes())
+        files["draws_end"].write(np.int64(self._draw_count).tobytes())
+        files["hits"].write(np.array(hits, dtype=HIT_DTYPE).tobytes())
+        files["draws"].write(np.array(draws, dtype=DRAW_DTYPE).tobytes())
+        self.ticks += 1
+        if self.snapshot_interval and self.ticks % self.snapshot_interval == 0:
+            self._write_snapshot(env, env_state)
+        # keep the action names readable even if the writer is never closed
+        if len(ACTION_TABLE) != len(self._meta["actions"]):
+            self._write_meta()
+
+    # called by fight() when the fight ends, even if it ended with an exception
+    def close(self):
+        for file in self._files.values():
+            file.close()
+        self._files = {}
+        for contestant in self._contestants:
+            contestant.recorded_draws = None
+        self._env.collect_hits = False
+        self._write_meta()
+
+    def _write_snapshot(self, env, env_state):
+        data = Snapshot.capture(
+            self.ticks, self._total_ticks, self._contestants, env, env_state
+        ).to_bytes()
+        self._files["snapshots"].write(data)
+        index = np.array(
+            [(self.ticks, self._snapshot_offset, len(data))], dtype=SNAPSHOT_INDEX_DTYPE
+        )
+        self._files["snapshot_index"].write(index.tobytes())
+        self._snapshot_offset += len(data)
+
+    def _write_meta(self):
+        self._meta["ticks"] = self.ticks
+        self._meta["actions"] = list(ACTION_TABLE.names)
+        with open(os.path.join(self.path, "meta.json"), "w") as meta_file:
+            json.dump(self._meta, meta_file, indent=4)
+
+
+# Read only view of a recorded trace. Columns are memory mapped, nothing is loaded
+# until it is sliced
+class FightTrace:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as meta_file:
+            self.meta = json.load(meta_file)
+        if self.meta["version"] != TRACE_VERSION:
+            raise ValueError(f"Unsupported trace version: {self.meta['version']}")
+        self.contestants = self.meta["contestants"]
+        self.actions = self.meta["actions"]
+        self.delta = self.meta["delta"]
+
+        self._columns = {}
+        columns = _tick_columns(len(self.contestants))
+        # a trace whose writer never closed still has every complete tick on disk
+        self.ticks = min(
+            self._row_count(name, dtype, shape)
+            for name, (dtype, shape) in columns.items()
+        )
+        for name, (dtype, shape) in columns.items():
+            self._columns[name] = self._open(name, dtype, (self.ticks,) + shape)
+        event_columns = dict(_EVENT_COLUMNS)
+        self.snapshot_interval = self.meta["snapshot_interval"]
+        if self.snapshot_interval:
+            event_columns["snapshot_index"] = SNAPSHOT_INDEX_DTYPE
+        for name, dtype in event_columns.items():
+            self._columns[name] = self._open(
+                name, dtype, (self._row_count(name, dtype, ()),)
+            )
+
+    def __len__(self):
+        return self.ticks
+
+    @property
+    def body_locations(self):
+        return self._columns["body_locations"]
+
+    @property
+    def transforms(self):
+        return self._columns["transforms"]
+
+    @property
+    def active_actions(self):
+        return self._columns["active_actions"]
+
+    # hits that landed in ticks [start, stop)
+    def hits(self, start=0, stop=None):
+        return self._events("hits", start, stop)
+
+    # random draws made in ticks [start, stop)
+    def draws(self, start=0, stop=None):
+        return self._events("draws", start, stop)
+
+    # latest snapshot taken at or before <tick>
+    def snapshot(self, tick):
+        index = self._columns.get("snapshot_index")
+        if index is None or len(index) == 0:
+            raise ValueError(f"Trace {self.path} has no snapshots")
+        # snapshots are taken at every multiple of the interval, starting at tick 0
+        position = min(tick // self.snapshot_interval, len(index) - 1)
+        record = index[position]
+        # a snapshot is only complete once its index record was written
+        with open(os.path.join(self.path, "snapshots.bin"), "rb") as snapshot_file:
+            snapshot_file.seek(int(record["offset"]))
+            return Snapshot.from_bytes(snapshot_file.read(int(record["size"])))
+
+    # state of the fight after exactly <tick> ticks, re-simulated from the snapshot
+    # before it
+    def seek(self, tick):
+        from main import resume
+
+        if not 0 <= tick <= self.meta["total_ticks"]:
+            raise ValueError(f"Tick {tick} is outside the fight")
+        return resume(self.snapshot(tick), tick)
+
+    def action_name(self, action_id):
+        return self.actions[action_id] if action_id >= 0 else None
+
+    def _events(self, name, start, stop):
+        start, stop, _ = slice(start, stop).indices(self.ticks)
+        if stop <= start:
+            return self._columns[name][:0]
+        ends = self._columns[f"{name}_end"]
+        first = ends[start - 1] if start > 0 else 0
+        return self._columns[name][first : ends[stop - 1]]
+
+    def _row_count(self, name, dtype, shape):
+        row_size = dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+        return os.path.getsize(os.path.join(self.path, f"{name}.bin")) // row_size
+
+    def _open(self, name, dtype, shape):
+        # numpy can't map an empty file
+        if shape[0] == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(
+            os.path.join(self.path, f"{name}.bin"), dtype=dtype, mode="r", shape=shape
+        )
@@ -0,0 +1,183 @@
+"""
+Pure NumPy stand-in for blender/pose_engine.py. Exposes the same PoseEngine contract
+(update() and get_contestant_ik_target_locations()) without needing a running
+Blender, so fights can be simulated on plain workers.
+"""
+
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+from logger import get_logger
+from common import BodyPart, Vec3
+from paths import PATH_DURATION, PathSet
+from ik import pose_limbs, limb_reach, SHOULDER_ROWS
+
+log = get_logger("pose_engine")
+
+
+# Rest pose of the rig template in armature space (the rig faces -y). Rows follow the
+# order Contestant.set_body_locations expects.
+REST_POSE = np.array(
+    [
+        [0.0, 0.0, 1.65],  # head
+        [0.0, 0.0, 1.1],  # torso
+        [0.2, -0.3, 1.45],  # hand_l
+        [-0.2, -0.25, 1.45],  # hand_r
+        [0.15, -0.15, 0.05],  # foot_l
+        [-0.15, 0.15, 0.05],  # foot_r
+        [0.2, 0.0, 1.45],  # shoulder_l
+        [-0.2, 0.0, 1.45],  # shoulder_r
+    ]
+)
+
+# row of each body part in the ik target array
+BODY_PART_ROW = {
+    BodyPart.HEAD: 0,
+    BodyPart.TORSO: 1,
+    BodyPart.HAND_L: 2,
+    BodyPart.HAND_R: 3,
+    BodyPart.FOOT_L: 4,
+    BodyPart.FOOT_R: 5,
+}
+
+
+TORSO_ROW = BODY_PART_ROW[BodyPart.TORSO]
+
+
+# Kinematic skeleton of a single contestant. Holds the world matrix of the armature and
+# the world location of every ik target.
+class IKSkeleton:
+    def __init__(self, contestant, rest_pose=REST_POSE, delta=0.1):
+        self.contestant = contestant
+        # progress made along a path every simulation step
+        self.path_step = delta / PATH_DURATION
+        self.matrix_world = self._instantiate_matrix_world()
+        self.locations = self._to_world(rest_pose)
+        # the path every ik target row is following, a straight line from where the
+        # target was when its action started to the strike location. Mirrors the
+        # paths of the blender engine
+        self.paths = PathSet(len(self.locations))
+        self.path_active = np.zeros(len(self.locations), dtype=bool)
+        self.path_progress = np.zeros(len(self.locations))
+        # actions that are being performed
+        self.current_actions = set()
+        # shoulders relative to the torso before it turns
+        self.shoulder_offsets = (
+            self.locations[SHOULDER_ROWS] - self.locations[TORSO_ROW]
+        )
+
+    # same placement the blender engine gives a freshly duplicated rig
+    def _instantiate_matrix_world(self):
+        # -1 or 1 based on even or odd id
+        rotation_coefficient = (self.contestant.id % 2) * 2 - 1
+        angle = rotation_coefficient * np.pi / 2.0
+        cos_z, sin_z = np.cos(angle), np.sin(angle)
+        matrix_world = np.identity(4)
+        matrix_world[:3, :3] = [[cos_z, -sin_z, 0], [sin_z, cos_z, 0], [0, 0, 1]]
+        matrix_world[:3, 3] = [2 + self.contestant.id * 1.0, 0, 0]
+        return matrix_world
+
+    def _to_world(self, local_points):
+        return local_points @ self.matrix_world[:3, :3].T + self.matrix_world[:3, 3]
+
+    # this function takes an action and breaks it into one path per body part that
+    # will take it to its strike location
+    def _generate_action_paths(self, action):
+        log.debug("Generating paths for action: %s", action.name)
+        for part, strike_location in zip(
+            action.target_body_locations.keys(), action.strike_locations
+        ):
+            row = BODY_PART_ROW[part]
+            self.paths.set(row, [self.locations[row], strike_location.data])
+            self.path_active[row] = True
+            self.path_progress[row] = 0.0
+
+    # register new actions. A body part can only follow one path at a time so a new
+    # action replaces whatever path that part was following
+    def perform(self, action):
+        if not action:
+            return
+
+        log.debug("Performing action: %s", action.name)
+        if action not in self.current_actions:
+            self.current_actions.add(action)
+            self._generate_action_paths(action)
+
+    # move every body part one step along its path. Returns whether any moved
+    def step(self):
+        moving = self.path_active & (self.path_progress < 1.0)
+        if not moving.any():
+            return False
+        rows = np.flatnonzero(moving)
+        progress = np.minimum(self.path_progress[rows] + self.path_step, 1.0)
+        self.path_progress[rows] = progress
+        self.locations[rows] = self.paths.evaluate(progress, rows)
+        return True
+
+    # ik targets with the shoulders where they are before the torso turns
+    def untwisted_locations(self):
+        locations = self.locations.copy()
+        locations[SHOULDER_ROWS] = locations[TORSO_ROW] + self.shoulder_offsets
+        return locations
+
+    def get_ik_target_locations(self):
+        return Vec3.from_array(self.locations.copy()), self.matrix_world
+
+
+# This class mirrors blender.pose_engine.PoseEngine without touching bpy
+class PoseEngine:
+    def __init__(self, contestants: list = [], sim_frame_rate=10, anim_frame_rate=24):
+        self.contestants = contestants
+        self.sim_frame_rate = sim_frame_rate
+        self.anim_frame_rate = anim_frame_rate
+
+        # limbs of every contestant (ik.LimbPose) as of the last pose(), and whether
+        # an ik target moved since
+        self.limbs = None
+        self._moved = True
+
+        self._skeleton_map = {}
+        for contestant in contestants:
+            ik_armature = IKSkeleton(contestant, delta=1.0 / sim_frame_rate)
+            self._skeleton_map[contestant] = [ik_armature, None]
+            contestant.set_body_locations(ik_armature.get_ik_target_locations())
+
+    def get_contestant_ik_target_locations(self, contestant):
+        return self._skeleton_map[contestant][0].get_ik_target_locations()
+
+    def update(self, contestant, actions, hits=[]):
+        ik_skeleton, phys_skeleton = self._skeleton_map[contestant]
+        for action in actions:
+            ik_skeleton.perform(action)
+        # forget actions the contestant is no longer executing
+        ik_skeleton.current_actions.intersection_update(actions)
+        self._moved |= ik_skeleton.step()
+        return ik_skeleton, phys_skeleton
+
+    # solve the limbs of every contestant together and turn the shoulders with the
+    # torso towards hands out of reach. Called once per tick, after every contestant
+    # moved. The twist is solved from the untwisted shoulders, so it doesn't build up
+    def pose(self):
+        if not self._moved:
+            return
+        self._moved = False
+        self.limbs = self.solve_limbs()
+        shoulders = self.limbs.roots[:, : len(SHOULDER_ROWS)]
+        for contestant, contestant_shoulders in zip(self.contestants, shoulders):
+            ik_skeleton = self._skeleton_map[contestant][0]
+            ik_skeleton.locations[SHOULDER_ROWS] = contestant_shoulders
+            contestant.set_body_locations(ik_skeleton.get_ik_target_locations())
+
+    # joints of the arms and legs of every contestant, solved together (see ik.py)
+    def solve_limbs(self):
+        skeletons = [self._skeleton_map[c][0] for c in self.contestants]
+        return pose_limbs(
+            np.array([skeleton.untwisted_locations() for skeleton in skeletons]),
+            np.array([skeleton.matrix_world for skeleton in skeletons]),
+            limb_reach(self.contestants),
+        )
@@ -0,0 +1,180 @@
+"""
+Analytic two-bone ik for the arms and legs of every contestant at once, without
+Blender's ik constraints.
+
+solve_two_bone places the middle joint (elbow or knee) and the end (hand or foot) of N
+limbs from (N, 3) roots, targets and pole directions and (N,) bone lengths with the law
+of cosines. A target further than the limb can reach is clamped to the reach, and what
+is left over is returned per limb. pose_limbs uses it to turn the torso (arms) and hips
+(legs) towards out of reach targets: the leftover reach of every limb becomes a twist
+about the vertical axis of the body it hangs from, the roots are turned by it and the
+limbs solved again. Every step works on all the limbs of every contestant together,
+so posing a scene costs the same number of array operations for 2 or 50 fighters.
+The headless PoseEngine poses every contestant once per tick and moves their shoulders
+with the torso twist.
+"""
+
+import sys
+import os
+
+dir = os.path.dirname(__file__)
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+from common import BodyPart
+
+# order of the limbs of a contestant in every (C, 4, ...) array
+LIMBS = [BodyPart.HAND_L, BodyPart.HAND_R, BodyPart.FOOT_L, BodyPart.FOOT_R]
+# body location row (see Contestant.set_body_locations) of the end of each limb
+LIMB_END_ROWS = np.array([2, 3, 4, 5])
+# body location row of the shoulders, the roots of the arms
+SHOULDER_ROWS = np.array([6, 7])
+# hips relative to the torso in armature space (the rig faces -y)
+HIP_OFFSETS = np.array([[0.1, 0.0, -0.1], [-0.1, 0.0, -0.1]])
+# directions elbows and knees bend towards, in armature space: elbows down and back,
+# knees forward
+POLES = np.array(
+    [[0.0, 0.5, -1.0], [0.0, 0.5, -1.0], [0.0, -1.0, 0.0], [0.0, -1.0, 0.0]]
+)
+# fraction of a limb's reach taken by its upper bone
+UPPER_FRACTION = 0.5
+# most the torso or hips turn to reach a target, in radians
+MAX_TWIST = np.pi / 4
+# targets closer to the root than this are pushed out to it, so limbs never fold flat
+MIN_EXTENSION = 1e-6
+
+
+# (N, 3) unit vectors orthogonal to (N, 3) unit vectors <directions>, as close to
+# <poles> as possible. Poles parallel to their direction fall back to any orthogonal
+def _bend_directions(directions, poles):
+    bend = poles - (poles * directions).sum(axis=1, keepdims=True) * directions
+    norm = np.sqrt((bend * bend).sum(axis=1, keepdims=True))
+    parallel = norm[:, 0] <= 1e-9
+    if parallel.any():
+        x_axis, y_axis = np.array([[1.0, 0.0, 0.0]]), np.array([[0.0, 1.0, 0.0]])
+        axis = np.where(np.abs(directions[parallel, :1]) < 0.9, x_axis, y_axis)
+        bend[parallel] = np.cross(directions[parallel], axis)
+        norm[parallel] = np.linalg.norm(bend[parallel], axis=1, keepdims=True)
+    return bend / norm
+
+
+# Two-bone ik for N limbs.
+# roots, targets, poles: (N, 3) shoulder or hip, target of the hand or foot, and the
+# direction the middle joint bends towards
+# upper, lower: (N,) bone lengths
+# reach: optional (N,) reach of each limb, at most upper + lower
+# Returns the (N, 3) middle joints, the (N, 3) ends and the (N, 3) leftover: how far
+# each end is short of its target
+def solve_two_bone(roots, targets, upper, lower, poles, reach=None):
+    roots = np.asarray(roots, dtype=np.float64)
+    targets = np.asarray(targets, dtype=np.float64)
+    upper = np.asarray(upper, dtype=np.float64)
+    lower = np.asarray(lower, dtype=np.float64)
+    max_reach = upper + lower
+    if reach is not None:
+        max_reach = np.minimum(max_reach, reach)
+    min_reach = np.maximum(np.abs(upper - lower), MIN_EXTENSION)
+
+    offset = targets - roots
+    distance = np.sqrt((offset * offset).sum(axis=1))
+    safe = np.where(distance > 0, distance, 1.0)
+    directions = np.where(
+        distance[:, None] > 0, offset / safe[:, None], np.array([0.0, 0.0, -1.0])
+    )
+    extension = np.clip(distance, min_reach, np.maximum(max_reach, min_reach))
+    ends = roots + directions * extension[:, None]
+
+    # law of cosines: how far along the limb the middle joint sits and how far it is
+    # bent out
+    along = (upper**2 - lower**2 + extension**2) / (2 * extension)
+    out = np.sqrt(np.maximum(upper**2 - along**2, 0.0))
+    bend = _bend_directions(directions, np.asarray(poles, dtype=np.float64))
+    middles = roots + directions * along[:, None] + bend * out[:, None]
+    return middles, ends, targets - ends
+
+
+# Twist of each of G bodies about the vertical axis through its <centers> (G, 3) that
+# brings N limb <roots> hanging from <groups> (N,) towards their <leftover> reach
+def spill_twist(centers, roots, leftover, groups, max_twist=MAX_TWIST):
+    lever = roots - centers[groups]
+    lever[:, 2] = 0.0
+    radius = np.linalg.norm(lever, axis=1)
+    # direction a root moves in when its body turns counter clockwise
+    tangent = np.stack([-lever[:, 1], lever[:, 0], np.zeros(len(lever))], axis=1)
+    safe = np.where(radius > 0, radius, 1.0)
+    pull = np.sum(leftover * tangent, axis=1) / safe
+    twist = np.where(radius > 0, np.arctan2(pull, safe), 0.0)
+    total = np.bincount(groups, weights=twist, minlength=len(centers))
+    return np.clip(total, -max_twist, max_twist)
+
+
+# <points> (N, 3) turned by <angles> (N,) about the vertical axes through <centers>
+def _turn(points, centers, angles):
+    cos, sin = np.cos(angles), np.sin(angles)
+    x, y = points[:, 0] - centers[:, 0], points[:, 1] - centers[:, 1]
+    turned = points.copy()
+    turned[:, 0] = centers[:, 0] + cos * x - sin * y
+    turned[:, 1] = centers[:, 1] + sin * x + cos * y
+    return turned
+
+
+# Solved limbs of C contestants. Every array is (C, 4, ...) in LIMBS order except the
+# twists, which are (C, 2): torso then hips
+class LimbPose:
+    def __init__(self, roots, middles, ends, leftover, twists):
+        self.roots = roots
+        self.middles = middles
+        self.ends = ends
+        self.leftover = leftover
+        self.twists = twists
+
+
+# Pose the limbs of C contestants.
+# body_locations: (C, 8, 3) ik targets, in set_body_locations order
+# matrices: (C, 4, 4) world matrices of the rigs
+# reach: (C, 4) reach of every limb (Contestant._range)
+def pose_limbs(body_locations, matrices, reach, max_twist=MAX_TWIST):
+    body_locations = np.asarray(body_locations, dtype=np.float64)
+    matrices = np.asarray(matrices, dtype=np.float64)
+    reach = np.asarray(reach, dtype=np.float64)
+    C = len(body_locations)
+    rotations = matrices[:, :3, :3]
+
+    torsos = body_locations[:, 1]
+    hips = torsos[:, None] + np.einsum("cij,hj->chi", rotations, HIP_OFFSETS)
+    roots = np.concatenate([body_locations[:, SHOULDER_ROWS], hips], axis=1)
+    targets = body_locations[:, LIMB_END_ROWS]
+    poles = np.einsum("cij,lj->cli", rotations, POLES)
+    upper = reach * UPPER_FRACTION
+    lower = reach - upper
+
+    flat = (C * len(LIMBS), 3)
+    roots, targets, poles = (array.reshape(flat) for array in (roots, targets, poles))
+    upper, lower = upper.ravel(), lower.ravel()
+    # arms hang from the torso (group 2c), legs from the hips (group 2c + 1)
+    groups = (np.arange(C)[:, None] * 2 + np.array([0, 0, 1, 1])).ravel()
+    centers = np.repeat(torsos, 2, axis=0)
+
+    _, _, leftover = solve_two_bone(roots, targets, upper, lower, poles)
+    twists = spill_twist(centers, roots, leftover, groups, max_twist)
+    limb_twists = twists[groups]
+    roots = _turn(roots, centers[groups], limb_twists)
+    poles = _turn(poles, np.zeros_like(poles), limb_twists)
+    middles, ends, leftover = solve_two_bone(roots, targets, upper, lower, poles)
+
+    shape = (C, len(LIMBS), 3)
+    return LimbPose(
+        roots.reshape(shape),
+        middles.reshape(shape),
+        ends.reshape(shape),
+        leftover.reshape(shape),
+        twists.reshape(C, 2),
+    )
+
+
+# (C, 4) limb reach of <contestants>, in LIMBS order
+def limb_reach(contestants):
+    return np.array(
+        [[contestant._range[limb] for limb in LIMBS] for contestant in contestants]
+    )
@@ -0,0 +1,313 @@
+"""
+Knowledge bank of a contestant (see "Sim logic.txt"). Every distribution sits on a
+Fenwick tree so weighted sampling and weight updates cost O(log n), which keeps
+decisions flat as a repertoire grows into the hundreds of actions.
+"""
+
+import numpy as np
+
+# a distribution is renormalized once its lazy scale gets this small
+_MIN_SCALE = 1e-150
+
+
+# Binary indexed tree over a list of weights. Prefix sums, point updates and finding
+# the index under a cumulative weight all take O(log n)
+class FenwickTree:
+    def __init__(self, weights=()):
+        self._weights = []
+        # 1-indexed partial sums
+        self._tree = [0.0]
+        self.rebuild(weights)
+
+    def __len__(self):
+        return len(self._weights)
+
+    # replace every weight at once in O(n)
+    def rebuild(self, weights):
+        self._weights = [float(weight) for weight in weights]
+        self._tree = [0.0] + self._weights
+        for i in range(1, len(self._tree)):
+            parent = i + (i & -i)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+
+    def append(self, weight):
+        self._weights.append(float(weight))
+        i = len(self._weights)
+        # node i covers (i - lowbit(i), i]
+        covered = self.prefix_sum(i - 1) - self.prefix_sum(i - (i & -i))
+        self._tree.append(weight + covered)
+
+    def get(self, index):
+        return self._weights[index]
+
+    def add(self, index, delta):
+        self._weights[index] += delta
+        i = index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def set(self, index, weight):
+        self.add(index, weight - self._weights[index])
+
+    # sum of the weights in [0, end)
+    def prefix_sum(self, end):
+        total = 0.0
+        while end > 0:
+            total += self._tree[end]
+            end -= end & -end
+        return total
+
+    def total(self):
+        return self.prefix_sum(len(self._weights))
+
+    # smallest index whose prefix sum including itself is over <target>. Clamped to
+    # the last index when <target> is past the total (floating point round off)
+    def find(self, target):
+        position = 0
+        step = 1 << (len(self._tree).bit_length() - 1)
+        while step:
+            next_position = position + step
+            if next_position < len(self._tree) and self._tree[next_position] <= target:
+                position = next_position
+                target -= self._tree[next_position]
+            step >>= 1
+        return min(position, len(self._weights) - 1)
+
+
+# Weighted distribution over hashable keys, kept in insertion order
+class WeightedDistribution:
+    def __init__(self, keys=(), weight=1.0):
+        self._keys = list(keys)
+        self._index = {key: i for i, key in enumerate(self._keys)}
+        # weights are stored divided by _scale so decay() is O(1)
+        self._scale = 1.0
+        self._tree = FenwickTree([weight] * len(self._keys))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    @property
+    def keys(self):
+        return list(self._keys)
+
+    def add(self, key, weight=1.0):
+        if key in self._index:
+            raise ValueError(f"{key} is already in the distribution")
+        self._index[key] = len(self._keys)
+        self._keys.append(key)
+        self._tree.append(weight / self._scale)
+
+    # insert <key> at <position>, keeping the order of the other keys. O(n)
+    def insert(self, position, key, weight=1.0):
+        if key in self._index:
+            raise ValueError(f"{key} is already in the distribution")
+        weights = [self._tree.get(i) for i in range(len(self._keys))]
+        weights.insert(position, weight / self._scale)
+        self._keys.insert(position, key)
+        self._index = {key: i for i, key in enumerate(self._keys)}
+        self._tree.rebuild(weights)
+
+    # move <key> to <position>, keeping its weight and the order of the other keys. O(n)
+    def move(self, key, position):
+        weight = self.weight(key)
+        weights = [self._tree.get(i) for i in range(len(self._keys))]
+        del weights[self._index[key]]
+        self._keys.remove(key)
+        weights.insert(position, weight / self._scale)
+        self._keys.insert(position, key)
+        self._index = {key: i for i, key in enumerate(self._keys)}
+        self._tree.rebuild(weights)
+
+    def position(self, key):
+        return self._index[key]
+
+    def weight(self, key):
+        return self._tree.get(self._index[key]) * self._scale
+
+    def set_weight(self, key, weight):
+        self._tree.set(self._index[key], weight / self._scale)
+
+    def reinforce(self, key, amount):
+        self._tree.add(self._index[key], amount / self._scale)
+
+    def total(self, start=0):
+        return (self._tree.total() - self._tree.prefix_sum(start)) * self._scale
+
+    def probability(self, key, start=0):
+        return self.weight(key) / self.total(start)
+
+    # multiply every weight by <factor> in O(1)
+    def decay(self, factor):
+        self._scale *= factor
+        if self._scale < _MIN_SCALE:
+            weights = [self._tree.get(i) * self._scale for i in range(len(self._keys))]
+            self._scale = 1.0
+            self._tree.rebuild(weights)
+
+    # key drawn with probability proportional to its weight, among the keys from
+    # position <start> on. <uniform> is a uniform number in [0, 1)
+    def sample(self, uniform, start=0):
+        if start >= len(self._keys):
+            raise IndexError("Nothing to sample from")
+        offset = self._tree.prefix_sum(start)
+        target = offset + uniform * (self._tree.total() - offset)
+        return self._keys[max(self._tree.find(target), start)]
+
+
+# Known attacks sorted by reach, as parallel arrays of reaches and action_table ids.
+# Finding the attacks that reach a distance is a bisection and returns views of the
+# arrays. Attacks with the same reach keep the order they were inserted in
+class ReachIndex:
+    def __init__(self):
+        self.attacks = []
+        self._reaches = np.empty(8)
+        self._ids = np.empty(8, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.attacks)
+
+    def __contains__(self, attack):
+        return attack in self.attacks
+
+    @property
+    def reaches(self):
+        return self._reaches[: len(self.attacks)]
+
+    @property
+    def ids(self):
+        return self._ids[: len(self.attacks)]
+
+    # (attack, reach) pairs, shortest reach first
+    def items(self):
+        return zip(self.attacks, self.reaches.tolist())
+
+    def max_reach(self):
+        return self._reaches[len(self.attacks) - 1] if self.attacks else -np.inf
+
+    # position of the first attack whose reach isn't under <distance>. Every attack
+    # from there on reaches
+    def first_reaching(self, distance):
+        return int(np.searchsorted(self.reaches, distance, side="left"))
+
+    # (reaches, ids) of every attack that reaches <distance>
+    def reaching(self, distance):
+        start = self.first_reaching(distance)
+        return self.reaches[start:], self.ids[start:]
+
+    def position(self, attack):
+        return self.attacks.index(attack)
+
+    def reach(self, attack):
+        return float(self._reaches[self.position(attack)])
+
+    # add <attack> after every attack with the same or a shorter reach. Returns its
+    # position
+    def insert(self, attack, attack_id, reach):
+        count = len(self.attacks)
+        if count == len(self._reaches):
+            self._reaches = np.resize(self._reaches, 2 * count)
+            self._ids = np.resize(self._ids, 2 * count)
+        position = int(np.searchsorted(self.reaches, reach, side="right"))
+        self._reaches[position + 1 : count + 1] = self._reaches[position:count]
+        self._ids[position + 1 : count + 1] = self._ids[position:count]
+        self._reaches[position] = reach
+        self._ids[position] = attack_id
+        self.attacks.insert(position, attack)
+        return position
+
+    def remove(self, attack):
+        position = self.position(attack)
+        count = len(self.attacks)
+        self._reaches[position : count - 1] = self._reaches[position + 1 : count]
+        self._ids[position : count - 1] = self._ids[position + 1 : count]
+        del self.attacks[position]
+        return position
+
+    # change the reach of <attack>. Returns its new position
+    def set_reach(self, attack, reach):
+        attack_id = self._ids[self.position(attack)]
+        self.remove(attack)
+        return self.insert(attack, attack_id, reach)
+
+
+# What a contestant learned during a fight:
+# - attacks: its own attacks in order of reach, weighted by how often they landed
+# - threats: opponent actions that landed on it
+# - reactions: for each of its attacks, what opponents did while it was executing
+# Reinforcements are scaled by the learn rate, which decays as the bank fills up:
+# learn_rate / (1 + learn_rate_decay * updates)
+class KnowledgeBank:
+    def __init__(self, attacks=(), learn_rate=None, learn_rate_decay=0.0):
+        self.attacks = WeightedDistribution(attacks)
+        self.threats = WeightedDistribution()
+        self._reactions = {}
+        self._learn_rate = learn_rate
+        self._learn_rate_decay = learn_rate_decay
+        self.updates = 0
+
+    # whether anything is learnt at all
+    @property
+    def learns(self):
+        return bool(self._learn_rate)
+
+    def learn_rate(self):
+        if not self._learn_rate:
+            return 0.0
+        return self._learn_rate / (1.0 + self._learn_rate_decay * self.updates)
+
+    def learn_attack(self, attack, position=None, weight=1.0):
+        if position is None:
+            self.attacks.add(attack, weight)
+        else:
+            self.attacks.insert(position, attack, weight)
+
+    def move_attack(self, attack, position):
+        self.attacks.move(attack, position)
+
+    # pick one of the attacks from position <start> on
+    def sample_attack(self, uniform, start=0):
+        return self.attacks.sample(uniform, start)
+
+    # one of our attacks landed
+    def reinforce_attack(self, attack):
+        self._reinforce(self.attacks, attack)
+
+    # an opponent action landed on us
+    def observe_threat(self, action):
+        self._reinforce(self.threats, action)
+
+    # the opponent did <reaction> while we were executing <attack>
+    def observe_reaction(self, attack, reaction):
+        self._reinforce(self.reactions(attack), reaction)
+
+    def reactions(self, attack):
+        if attack not in self._reactions:
+            self._reactions[attack] = WeightedDistribution()
+        return self._reactions[attack]
+
+    def sample_reaction(self, attack, uniform):
+        reactions = self._reactions.get(attack)
+        if not reactions:
+            return None
+        return reactions.sample(uniform)
+
+    # forget a fraction of everything learnt so far
+    def forget(self, factor):
+        self.attacks.decay(factor)
+        self.threats.decay(factor)
+        for reactions in self._reactions.values():
+            reactions.decay(factor)
+
+    def _reinforce(self, distribution, key):
+        amount = self.learn_rate()
+        if not amount:
+            return
+        if key not in distribution:
+            distribution.add(key, 0.0)
+        distribution.reinforce(key, amount)
+        self.updates += 1
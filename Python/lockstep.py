@@ -0,0 +1,568 @@
+"""
+Lockstep engine. Advances K independent headless matches at once, holding the state of
+every match as (K, ...) numpy arrays so a tick costs a handful of array operations
+instead of K passes through Contestant.update and Environment.update.
+
+It reproduces the scalar fight() loop with the headless pose engine: the same seed
+gives the same decisions, body locations and hits. Contestants draw their randomness
+from counter-based streams keyed by the match seed and their id (see
+random_streams.py), so here every stream of every match is read in blocks from where
+the scalar contestant would be in it.
+
+Run `python lockstep.py --check 200` to compare it against fight() for 200 seeds.
+"""
+
+import sys
+import os
+
+dir = os.path.dirname(__file__)
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import argparse
+import time
+import numpy as np
+from action_table import ACTION_TABLE, ATTACK, action_id
+from collision import swept_spheres_vs_boxes
+from common import BodyPart, Location
+from contestant import Contestant
+from environment import STRIKE_RADII, HIT_BOX_HALF_EXTENTS
+from headless.pose_engine import BODY_PART_ROW, TORSO_ROW, IKSkeleton
+from ik import pose_limbs, SHOULDER_ROWS
+from paths import PATH_DURATION
+from random_streams import BLOCK_SIZE, REACTION_STREAM, CHOICE_STREAM
+from random_streams import stream_key, uniforms_at
+from sim_clock import FixedTimestepClock
+
+# body parts that have a reach (Contestant._range)
+RANGE_PARTS = [BodyPart.HAND_L, BodyPart.HAND_R, BodyPart.FOOT_L, BodyPart.FOOT_R]
+STRIKER_PARTS = list(STRIKE_RADII)
+TARGET_PARTS = list(HIT_BOX_HALF_EXTENTS)
+HEAD_ROW = BODY_PART_ROW[BodyPart.HEAD]
+FOOT_R_ROW = BODY_PART_ROW[BodyPart.FOOT_R]
+
+# how a strike location is picked for each targeted Location. Anything else targets
+# the world origin, same as Contestant._get_strike_locations
+_TARGET_ORIGIN = 0
+_TARGET_VICTIM_HEAD = 1
+_TARGET_VICTIM_FOOT_OUTSIDE = 2
+
+
+# Final state of every match in a lockstep run
+class LockstepResult:
+    def __init__(self, winners, hits, body_locations, ticks):
+        # name of the winner of each match, (K,)
+        self.winners = winners
+        # hits landed by each contestant, (K, C)
+        self.hits = hits
+        # ik target locations of each contestant, (K, C, 8, 3)
+        self.body_locations = body_locations
+        # ticks simulated in each match, (K,)
+        self.ticks = ticks
+
+
+class LockstepEngine:
+    # matchups: K lists of Contestant keyword arguments (same format as batch.py)
+    # seeds: seed of each match, as passed to fight()
+    # time_limit: seconds of fight, either one value or one per match
+    def __init__(self, matchups, seeds, delta=0.1, time_limit=1):
+        self.K = len(matchups)
+        self.C = len(matchups[0])
+        assert all(len(matchup) == self.C for matchup in matchups)
+        assert len(seeds) == self.K, "Need one seed per match"
+        assert self.C >= 2, "Need at least two contestants per match"
+        K, C = self.K, self.C
+
+        self.seeds = [int(seed) for seed in seeds]
+        time_limits = np.broadcast_to(np.asarray(time_limit, dtype=np.float64), (K,))
+        self.n_ticks = np.array(
+            [FixedTimestepClock.total_ticks(delta, limit) for limit in time_limits]
+        )
+        self.tick = 0
+        # same step the headless pose engine takes at a sim frame rate of 1 / delta
+        self.path_step = 1.0 / (1.0 / delta) / PATH_DURATION
+
+        contestants = [
+            [
+                Contestant(**{**params, "id": contestant_id})
+                for contestant_id, params in enumerate(matchup, start=1)
+            ]
+            for matchup in matchups
+        ]
+        self.names = np.array([[c.name for c in row] for row in contestants])
+        self.contestant_ids = np.array([[c.id for c in row] for row in contestants])
+        if any(c._knowledge.learns for row in contestants for c in row):
+            raise NotImplementedError("Contestants that learn can't run in lockstep")
+        self._compile_attacks(contestants)
+
+        # Skeletons start at the same place for the same contestant id
+        skeletons = {}
+        self.locations = np.empty((K, C, 8, 3))
+        self.matrices = np.empty((K, C, 4, 4))
+        self.shoulder_offsets = np.empty((K, C, len(SHOULDER_ROWS), 3))
+        for k, row in enumerate(contestants):
+            for c, contestant in enumerate(row):
+                if contestant.id not in skeletons:
+                    skeletons[contestant.id] = IKSkeleton(contestant)
+                skeleton = skeletons[contestant.id]
+                self.locations[k, c] = skeleton.locations
+                self.matrices[k, c] = skeleton.matrix_world
+                self.shoulder_offsets[k, c] = skeleton.shoulder_offsets
+        self.inverse_matrices = np.linalg.inv(self.matrices)
+
+        # reaction window: its length, and whether the empty state perceived on the
+        # first tick is still the oldest one
+        self.reaction_time = np.array(
+            [[c._reaction_time for c in row] for row in contestants]
+        )
+        self.min_reaction_time = np.array(
+            [[c._min_reaction_time for c in row] for row in contestants]
+        )
+        self.window_length = np.zeros((K, C), dtype=np.int64)
+        self.empty_state_in_window = np.ones((K, C), dtype=bool)
+        # where the victim was in every state on each reaction window, a ring like
+        # the scalar ReactionWindow. Contestants choose and aim from these perceived
+        # locations, not from where the victim is now
+        self.window_capacity = Contestant.MAX_REACTION_TIME + 1
+        self.window_start = np.zeros((K, C), dtype=np.int64)
+        self.perceived = np.zeros((K, C, self.window_capacity, 8, 3))
+        # locations at the end of the last tick, the state perceived next tick
+        self._last_state = self.locations.copy()
+
+        # a block of every random stream of every contestant, and where each stream
+        # and block is at
+        streams = len((REACTION_STREAM, CHOICE_STREAM))
+        self._blocks = np.empty((K, C, streams, BLOCK_SIZE))
+        self._block_start = np.zeros((K, C, streams), dtype=np.int64)
+        self._block_end = np.zeros((K, C, streams), dtype=np.int64)
+        self._position = np.zeros((K, C, streams), dtype=np.int64)
+
+        # option each contestant is executing, -1 for none
+        self.current_option = np.full((K, C), -1, dtype=np.int64)
+        # one path per ik target row
+        self.path_active = np.zeros((K, C, 8), dtype=bool)
+        self.path_progress = np.zeros((K, C, 8))
+        self.path_init = np.zeros((K, C, 8, 3))
+        self.path_final = np.zeros((K, C, 8, 3))
+
+        # hits
+        self._n_targets = (C - 1) * len(TARGET_PARTS)
+        # striking limbs touching each hit box at the end of their last update, per
+        # (component action, striker) key, like Environment._contacts
+        self.contacts = np.zeros(
+            (K, C, self._n_contact_keys, self._n_targets), dtype=bool
+        )
+        self.hits = np.zeros((K, C), dtype=np.int64)
+
+    # Flatten every attack the contestants know into strike entries, one per
+    # (component action, body part), using the compiled action table, and the per
+    # contestant reach tables
+    def _compile_attacks(self, contestants):
+        K, C = self.K, self.C
+        self.options = []
+        for row in contestants:
+            for contestant in row:
+                for attack in contestant._reach_index.attacks:
+                    if attack not in self.options:
+                        self.options.append(attack)
+        option_index = {attack: o for o, attack in enumerate(self.options)}
+
+        # known attacks sorted by reach, padded at the front so every contestant has
+        # the same count. The attacks that reach a distance are then always a suffix
+        A = len(self.options)
+        self.sorted_options = np.full((K, C, A), -1, dtype=np.int64)
+        self.sorted_reach = np.full((K, C, A), -np.inf)
+        self.ranges = np.empty((K, C, len(RANGE_PARTS)))
+        for k, row in enumerate(contestants):
+            for c, contestant in enumerate(row):
+                known = list(contestant._reach_index.items())
+                for i, (attack, reach) in enumerate(known):
+                    self.sorted_options[k, c, A - len(known) + i] = option_index[attack]
+                    self.sorted_reach[k, c, A - len(known) + i] = reach
+                self.ranges[k, c] = [contestant._range[part] for part in RANGE_PARTS]
+
+        option_of, row_of, range_of, target_of = [], [], [], []
+        # attack entries: (entry, contact key, striker index). A body part only
+        # strikes for the last attack in the option using it. Contacts are keyed by
+        # the component's action table id and the striker
+        self.attack_entries = []
+        contact_keys = {}
+        table = ACTION_TABLE
+        option_ids = [action_id(option) for option in self.options]
+        for o, option_id in enumerate(option_ids):
+            strikers = {}
+            for component_index, component in enumerate(table.component_ids(option_id)):
+                for part in np.nonzero(table.target_locations[component] >= 0)[0]:
+                    if part not in RANGE_PARTS:
+                        raise NotImplementedError(f"No reach for body part {part}")
+                    loc = table.target_locations[component, part]
+                    entry = len(option_of)
+                    option_of.append(o)
+                    row_of.append(BODY_PART_ROW[part])
+                    range_of.append(RANGE_PARTS.index(part))
+                    if loc == Location.CHIN:
+                        target_of.append(_TARGET_VICTIM_HEAD)
+                    elif loc == Location.FOOT_L_OUTSIDE:
+                        target_of.append(_TARGET_VICTIM_FOOT_OUTSIDE)
+                    else:
+                        target_of.append(_TARGET_ORIGIN)
+                    if table.kind[component] == ATTACK and part in STRIKE_RADII:
+                        strikers[part] = (entry, component)
+            for part, (entry, component) in strikers.items():
+                key = contact_keys.setdefault((component, part), len(contact_keys))
+                self.attack_entries.append((entry, key, STRIKER_PARTS.index(part)))
+        self._n_contact_keys = len(contact_keys)
+        self.entry_option = np.array(option_of, dtype=np.int64)
+        self.entry_row = np.array(row_of, dtype=np.int64)
+        self.entry_range = np.array(range_of, dtype=np.int64)
+        self.entry_target = np.array(target_of, dtype=np.int64)
+
+    def run(self):
+        while self.step():
+            pass
+        return self.result()
+
+    # advance every unfinished match by one tick. Returns False once all are done
+    def step(self):
+        active = self.tick < self.n_ticks
+        if not np.any(active):
+            return False
+        for c in range(self.C):
+            self._update_contestant(c, active)
+        self._pose_shoulders(active)
+        self._last_state = self.locations.copy()
+        self.tick += 1
+        return True
+
+    def result(self):
+        return LockstepResult(
+            self.names[:, 0],
+            self.hits.copy(),
+            self.locations.copy(),
+            np.minimum(self.tick, self.n_ticks),
+        )
+
+    # victim of contestant slot c: the first other contestant, like _select_victim
+    def _victim(self, c):
+        return 1 if c == 0 else 0
+
+    def _update_contestant(self, c, active):
+        v = self._victim(c)
+        slot = np.s_[:, c]
+        K, W = self.K, self.window_capacity
+        matches = np.arange(K)
+
+        # perceive: the state at the end of the last tick is pushed on the reaction
+        # window
+        pushing = np.nonzero(active)[0]
+        newest = (self.window_start[slot] + self.window_length[slot]) % W
+        self.perceived[pushing, c, newest[pushing]] = self._last_state[pushing, v]
+        self.window_length[slot] += active
+        length = self.window_length[slot].copy()
+
+        # how many reactions to consume. Same rule as _get_num_reactions_this_step
+        can_react = active & (length >= self.min_reaction_time[slot])
+        coin = np.zeros(K, dtype=np.int64)
+        if np.any(can_react):
+            coin[can_react] = (
+                self._draw(c, REACTION_STREAM, can_react, 1)[:, 0] * 3
+            ).astype(np.int64)
+        behind = np.where(
+            length > self.reaction_time[slot], length - self.reaction_time[slot], 0
+        )
+        n_reactions = np.where(can_react, np.clip(behind + coin, 0, length), 0)
+
+        # reactions are popped oldest first, (K, W) over the popped states. The
+        # empty state from the first tick is the oldest while it's on the window
+        order = np.arange(W)
+        rows = (self.window_start[slot][:, np.newaxis] + order) % W
+        popped = order < n_reactions[:, np.newaxis]
+        empty = (order == 0) & self.empty_state_in_window[slot][:, np.newaxis]
+        self.window_start[slot] = (self.window_start[slot] + n_reactions) % W
+        self.window_length[slot] -= n_reactions
+        self.empty_state_in_window[slot] &= n_reactions == 0
+
+        # choose_actions: every non empty state popped draws an attack if the victim
+        # was in range in it. Only the last state popped decides what is chosen
+        victim_heads = self.perceived[matches[:, np.newaxis], c, rows, HEAD_ROW]
+        distances = np.linalg.norm(
+            self.locations[:, c, HEAD_ROW][:, np.newaxis] - victim_heads, axis=-1
+        )
+        reach = self.sorted_reach[slot]
+        draws_attack = popped & ~empty & (distances <= reach[:, -1:])
+        n_draws = np.sum(draws_attack, axis=-1)
+        last = np.maximum(n_reactions - 1, 0)
+        chooses = (n_reactions > 0) & draws_attack[matches, last]
+        distance = distances[matches, last]
+        drawing = n_draws > 0
+        uniform = np.zeros(K)
+        if np.any(drawing):
+            draws = self._draw(c, CHOICE_STREAM, drawing, n_draws[drawing])
+            uniform[drawing] = draws[np.arange(len(draws)), n_draws[drawing] - 1]
+        n_possible = np.sum(reach >= distance[:, np.newaxis], axis=-1)
+        A = reach.shape[-1]
+        choice = A - n_possible + (uniform * n_possible).astype(np.int64)
+        choice = np.clip(choice, 0, A - 1)
+        chosen_option = self.sorted_options[slot][matches, choice]
+
+        if np.any(chooses):
+            victim = self.perceived[matches, c, rows[matches, last]]
+            targets = self._strike_targets(c, victim)
+            self._start_paths(c, chooses, chosen_option, targets)
+            self.current_option[chooses, c] = chosen_option[chooses]
+
+        # pose engine: move every body part one step along its path. Strikes are
+        # swept from where the limbs were before it
+        striker_rows = [BODY_PART_ROW[part] for part in STRIKER_PARTS]
+        sweep_starts = self.locations[:, c, striker_rows]
+        moving = self.path_active[slot] & (self.path_progress[slot] < 1.0)
+        moving &= active[:, np.newaxis]
+        progress = np.minimum(self.path_progress[slot] + self.path_step, 1.0)
+        self.path_progress[slot] = np.where(moving, progress, self.path_progress[slot])
+        position = self.path_init[slot] + self.path_progress[slot][..., np.newaxis] * (
+            self.path_final[slot] - self.path_init[slot]
+        )
+        self.locations[slot] = np.where(
+            moving[..., np.newaxis], position, self.locations[slot]
+        )
+
+        self._calculate_hits(c, active, sweep_starts)
+
+    # turn the shoulders of every contestant with its torso, like PoseEngine.pose
+    def _pose_shoulders(self, active):
+        K, C = self.K, self.C
+        untwisted = self.locations.copy()
+        untwisted[:, :, SHOULDER_ROWS] = (
+            untwisted[:, :, TORSO_ROW, np.newaxis] + self.shoulder_offsets
+        )
+        limbs = pose_limbs(
+            untwisted.reshape(K * C, 8, 3),
+            self.matrices.reshape(K * C, 4, 4),
+            self.ranges.reshape(K * C, -1),
+        )
+        shoulders = limbs.roots[:, : len(SHOULDER_ROWS)].reshape(K, C, -1, 3)
+        self.locations[:, :, SHOULDER_ROWS] = np.where(
+            active[:, np.newaxis, np.newaxis, np.newaxis],
+            shoulders,
+            self.locations[:, :, SHOULDER_ROWS],
+        )
+
+    # strike location of every entry for contestant slot c attacking a victim it
+    # perceived at <victim_locations> (K, 8, 3), (K, E, 3)
+    def _strike_targets(self, c, victim_locations):
+        K = self.K
+        targets = np.zeros((K, len(self.entry_option), 3))
+        victim_head = victim_locations[:, HEAD_ROW]
+        # victim's right foot in the attacker's space, pushed outwards and back
+        matrix, inverse = self.matrices[:, c], self.inverse_matrices[:, c]
+        victim_foot = victim_locations[:, FOOT_R_ROW]
+        local_foot = (
+            np.einsum("kij,kj->ki", inverse[:, :3, :3], victim_foot) + inverse[:, :3, 3]
+        )
+        local_foot[:, 0] += Location.FOOT_OUTSIDE_OFFSET
+        outside_foot = (
+            np.einsum("kij,kj->ki", matrix[:, :3, :3], local_foot) + matrix[:, :3, 3]
+        )
+        targets[:, self.entry_target == _TARGET_VICTIM_HEAD] = victim_head[
+            :, np.newaxis
+        ]
+        targets[:, self.entry_target == _TARGET_VICTIM_FOOT_OUTSIDE] = outside_foot[
+            :, np.newaxis
+        ]
+
+        # limit each target by the reach of the body part going there
+        body_part_locations = self.locations[:, c][:, self.entry_row]
+        offsets = targets - body_part_locations
+        norms = np.sqrt(np.sum(offsets * offsets, axis=-1, keepdims=True))
+        directions = np.divide(
+            offsets, norms, out=np.zeros_like(offsets), where=norms != 0
+        )
+        reach = self.ranges[:, c][:, self.entry_range]
+        return body_part_locations + directions * reach[..., np.newaxis]
+
+    # body parts of the chosen option start a new path from where they are now
+    def _start_paths(self, c, chooses, chosen_option, targets):
+        for entry, (option, row) in enumerate(zip(self.entry_option, self.entry_row)):
+            mask = chooses & (chosen_option == option)
+            if not np.any(mask):
+                continue
+            self.path_init[mask, c, row] = self.locations[mask, c, row]
+            self.path_final[mask, c, row] = targets[mask, entry]
+            self.path_progress[mask, c, row] = 0.0
+            self.path_active[mask, c, row] = True
+
+    # every striking body part of slot c, swept from <sweep_starts> (K, strikers, 3),
+    # against the hit boxes of every other contestant. Same rule as
+    # Environment._calculate_hits: a strike lands when the limb enters a box, or starts
+    # touching one it wasn't touching before and moves towards it
+    def _calculate_hits(self, c, active, sweep_starts):
+        others = [o for o in range(self.C) if o != c]
+        rows = [BODY_PART_ROW[part] for part in TARGET_PARTS]
+        box_centers = self.locations[:, others][:, :, rows].reshape(self.K, -1, 3)
+        box_rotations = np.repeat(
+            self.matrices[:, others, :3, :3], len(TARGET_PARTS), axis=1
+        )
+        half_extents = np.tile(
+            np.array([HIT_BOX_HALF_EXTENTS[part] for part in TARGET_PARTS]),
+            (len(others), 1),
+        )
+        striker_rows = [BODY_PART_ROW[part] for part in STRIKER_PARTS]
+        sphere_centers = self.locations[:, c, striker_rows]
+        radii = np.array([STRIKE_RADII[part] for part in STRIKER_PARTS])
+
+        # (K, strikers, boxes)
+        touching, times_of_impact = swept_spheres_vs_boxes(
+            sweep_starts[:, :, np.newaxis],
+            sphere_centers[:, :, np.newaxis],
+            radii[:, np.newaxis],
+            box_centers[:, np.newaxis],
+            box_rotations[:, np.newaxis],
+            half_extents,
+        )
+        touching_at_end, _ = swept_spheres_vs_boxes(
+            sphere_centers[:, :, np.newaxis],
+            sphere_centers[:, :, np.newaxis],
+            radii[:, np.newaxis],
+            box_centers[:, np.newaxis],
+            box_rotations[:, np.newaxis],
+            half_extents,
+        )
+        approaching = (
+            np.sum(
+                (sphere_centers - sweep_starts)[:, :, np.newaxis]
+                * (box_centers[:, np.newaxis] - sweep_starts[:, :, np.newaxis]),
+                axis=-1,
+            )
+            > 0
+        )
+
+        option = self.current_option[:, c]
+        for entry, key, striker in self.attack_entries:
+            attempting = active & (option == self.entry_option[entry])
+            in_contact = self.contacts[:, c, key]
+            lands = touching[:, striker] & (
+                (times_of_impact[:, striker] > 0)
+                | (~in_contact & approaching[:, striker])
+            )
+            lands &= attempting[:, np.newaxis]
+            self.hits[:, c] += np.sum(lands, axis=-1)
+            self.contacts[:, c, key] = np.where(
+                attempting[:, np.newaxis], touching_at_end[:, striker], in_contact
+            )
+
+    # next n uniform numbers of <stream> of contestant slot c, for every match in
+    # <mask>, (mask.sum(), max(n)). Blocks are refilled straight from the position the
+    # stream is at when they run out
+    def _draw(self, c, stream, mask, n):
+        ks = np.nonzero(mask)[0]
+        n = np.broadcast_to(np.asarray(n, dtype=np.int64), ks.shape)
+        position = self._position[ks, c, stream]
+        for k in ks[position + n > self._block_end[ks, c, stream]]:
+            self._refill(k, c, stream)
+        index = position - self._block_start[ks, c, stream]
+        max_n = int(n.max()) if len(n) else 0
+        columns = np.minimum(index[:, np.newaxis] + np.arange(max_n), BLOCK_SIZE - 1)
+        self._position[ks, c, stream] += n
+        return self._blocks[ks[:, np.newaxis], c, stream, columns]
+
+    def _refill(self, k, c, stream):
+        position = self._position[k, c, stream]
+        key = stream_key(self.seeds[k], self.contestant_ids[k, c], stream)
+        self._blocks[k, c, stream] = uniforms_at(key, position, BLOCK_SIZE)
+        self._block_start[k, c, stream] = position
+        self._block_end[k, c, stream] = position + BLOCK_SIZE
+
+
+# Run the same matches through the scalar fight() loop. Returns a LockstepResult so the
+# two engines can be compared
+def run_scalar(matchups, seeds, delta=0.1, time_limit=1):
+    import environment
+    from main import fight
+
+    K, C = len(matchups), len(matchups[0])
+    hits = np.zeros((K, C), dtype=np.int64)
+    locations = np.empty((K, C, 8, 3))
+    winners = []
+    ticks = np.zeros(K, dtype=np.int64)
+    calculate_hits = environment.Environment._calculate_hits
+
+    for k, (matchup, seed) in enumerate(zip(matchups, seeds)):
+        contestants = [
+            Contestant(**{**params, "id": contestant_id})
+            for contestant_id, params in enumerate(matchup, start=1)
+        ]
+        slot = {contestant.id: c for c, contestant in enumerate(contestants)}
+
+        # count hits as the environment calculates them
+        def counting_calculate_hits(env, attacker, strike_attempts, sweep_starts):
+            landed = calculate_hits(env, attacker, strike_attempts, sweep_starts)
+            hits[k, slot[attacker.id]] += len(landed)
+            ticks[k] += attacker is contestants[0]
+            return landed
+
+        environment.Environment._calculate_hits = counting_calculate_hits
+        try:
+            winners.append(fight(contestants, delta, time_limit, "headless", seed=seed))
+        finally:
+            environment.Environment._calculate_hits = calculate_hits
+        for c, contestant in enumerate(contestants):
+            locations[k, c] = [
+                location.data for location in contestant._body_locations.values()
+            ]
+    return LockstepResult(np.array(winners), hits, locations, ticks)
+
+
+# indices of the matches whose winner, hits or body locations differ between two
+# LockstepResults
+def mismatched_matches(result, expected):
+    return np.nonzero(
+        (result.winners != expected.winners)
+        | np.any(result.hits != expected.hits, axis=-1)
+        | ~np.all(
+            np.isclose(result.body_locations, expected.body_locations),
+            axis=(1, 2, 3),
+        )
+    )[0].tolist()
+
+
+def main(argv=None):
+    from logger import set_debug_level
+
+    parser = argparse.ArgumentParser(description="Run matches in lockstep.")
+    parser.add_argument("--matches", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0, help="batch seed")
+    parser.add_argument("--time-limit", type=float, default=5)
+    parser.add_argument(
+        "--check", type=int, default=0, help="compare this many matches with fight()"
+    )
+    args = parser.parse_args(argv)
+    set_debug_level("warning")
+
+    from batch import match_seed
+
+    count = args.check or args.matches
+    rng = np.random.default_rng(args.seed)
+    matchups = [
+        [
+            {"name": "Jack", "reaction_time": int(rng.integers(4, 12))},
+            {"name": "Jill", "reaction_time": int(rng.integers(4, 12))},
+        ]
+        for _ in range(count)
+    ]
+    seeds = [match_seed(args.seed, index) for index in range(count)]
+
+    start = time.perf_counter()
+    result = LockstepEngine(matchups, seeds, time_limit=args.time_limit).run()
+    elapsed = time.perf_counter() - start
+    print(f"lockstep: {count} matches in {elapsed:.3f}s")
+
+    if args.check:
+        start = time.perf_counter()
+        expected = run_scalar(matchups, seeds, time_limit=args.time_limit)
+        elapsed = time.perf_counter() - start
+        print(f"scalar:   {count} matches in {elapsed:.3f}s")
+        print(f"mismatched matches: {mismatched_matches(result, expected)}")
+
+
+if __name__ == "__main__":
+    main()
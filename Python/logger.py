@@ -1,35 +1,234 @@
+"""
+Logging for the sim. Subsystems log through an EventLogger from get_logger(subsystem):
+
+    log = get_logger("contestant")
+    log.debug("%s chose %s", contestant.name, actions, tick=tick)
+
+- every subsystem has its own level (set_level). A call under it returns after one
+  comparison, before anything is formatted
+- the message is only formatted with its arguments once the event is written, so hot
+  paths pass arguments instead of building f-strings. Arguments are formatted later
+  and shouldn't be mutated after the call
+- keyword arguments are structured fields, kept apart from the message
+By default events go to the console through the standard library logger. After
+start_sink(path) they go to a JSONL file instead: events are pushed on a bounded
+queue and a background thread formats and writes them, so logging never blocks the
+sim. When the queue is full events are dropped and counted.
+"""
+
+import atexit
+import collections
+import json
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
-console_handler = logging.StreamHandler()
-# Create a formatter for the log messages
-formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+# Blender sessions re-import modules between runs. Reuse the console handler added by
+# an earlier import instead of stacking another one, which would print everything twice
+console_handler = next(
+    (handler for handler in logger.handlers if getattr(handler, "sim_console", False)),
+    None,
+)
+if console_handler is None:
+    console_handler = logging.StreamHandler()
+    console_handler.sim_console = True
+    # Create a formatter for the log messages
+    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
 
-# Set the formatter for the console handler
-console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
+    # Set the formatter for the console handler
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
 
 logg = logger.debug
 
+LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "critical": logging.CRITICAL,
+}
+# most events waiting to be written before new ones are dropped
+DEFAULT_QUEUE_SIZE = 1 << 16
 
-def set_debug_level(lvl):
-    if lvl == "debug":
-        lvl = logging.DEBUG
-    elif lvl == "info":
-        lvl = logging.INFO
-    elif lvl == "warning":
-        lvl = logging.WARNING
-    elif lvl == "error":
-        lvl = logging.ERROR
-    elif lvl == "critical":
-        lvl = logging.CRITICAL
+# level of subsystems that weren't given their own
+_default_level = logging.DEBUG
+# subsystem -> level set with set_level
+_levels = {}
+# subsystem -> EventLogger
+_event_loggers = {}
+# JsonlSink events are written to, None to write them to the console
+_sink = None
+
+
+class EventLogger:
+    __slots__ = ("subsystem", "level", "_console")
+
+    def __init__(self, subsystem, level):
+        self.subsystem = subsystem
+        self.level = level
+        # child of the module logger, so its level decides what reaches the console
+        self._console = logger.getChild(subsystem)
+
+    def enabled_for(self, level):
+        return level >= self.level
+
+    def debug(self, message, *args, **fields):
+        if self.level <= logging.DEBUG:
+            self._emit(logging.DEBUG, message, args, fields)
+
+    def info(self, message, *args, **fields):
+        if self.level <= logging.INFO:
+            self._emit(logging.INFO, message, args, fields)
+
+    def warning(self, message, *args, **fields):
+        if self.level <= logging.WARNING:
+            self._emit(logging.WARNING, message, args, fields)
+
+    def error(self, message, *args, **fields):
+        if self.level <= logging.ERROR:
+            self._emit(logging.ERROR, message, args, fields)
+
+    def _emit(self, level, message, args, fields):
+        sink = _sink
+        if sink is not None:
+            sink.put((time.time(), self.subsystem, level, message, args, fields))
+        elif fields:
+            self._console.log(level, "%s %s", _Deferred(message, args), fields)
+        else:
+            self._console.log(level, message, *args)
+
+
+def get_logger(subsystem):
+    if subsystem not in _event_loggers:
+        _event_loggers[subsystem] = EventLogger(
+            subsystem, _levels.get(subsystem, _default_level)
+        )
+    return _event_loggers[subsystem]
+
+
+# Set the level of <subsystem>, or the level of every subsystem without its own when
+# no subsystem is given. <level> is a name from LEVELS or a logging level
+def set_level(level, subsystem=None):
+    global _default_level
+    if isinstance(level, str):
+        level = LEVELS[level]
+    if subsystem is None:
+        _default_level = level
+        logger.setLevel(level)
     else:
+        _levels[subsystem] = level
+        logger.getChild(subsystem).setLevel(level)
+    for name, event_logger in _event_loggers.items():
+        event_logger.level = _levels.get(name, _default_level)
+
+
+# message formatted with its arguments only when it's turned into a string
+class _Deferred:
+    __slots__ = ("message", "args")
+
+    def __init__(self, message, args):
+        self.message = message
+        self.args = args
+
+    def __str__(self):
+        return self.message % self.args if self.args else self.message
+
+
+# Writes events to a JSON lines file from a background thread. One object per line:
+# {"time", "subsystem", "level", "message", "fields"}
+class JsonlSink:
+    def __init__(self, path, queue_size=DEFAULT_QUEUE_SIZE, flush_interval=0.1):
+        self.path = path
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+        # events dropped because the queue was full
+        self.dropped = 0
+        # appending and popping a deque are atomic, so the sim never waits on a lock
+        self._queue = collections.deque()
+        self._closed = threading.Event()
+        self._file = open(path, "a")
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def put(self, event):
+        if len(self._queue) >= self.queue_size:
+            self.dropped += 1
+            return
+        self._queue.append(event)
+
+    # write everything queued and stop the writer thread
+    def close(self):
+        self._closed.set()
+        self._thread.join()
+        self._file.close()
+
+    def _drain(self):
+        while True:
+            closed = self._closed.wait(self.flush_interval)
+            lines = []
+            while self._queue:
+                lines.append(_event_json(self._queue.popleft()))
+            if lines:
+                self._file.write("\n".join(lines) + "\n")
+                self._file.flush()
+            if closed:
+                return
+
+
+def _event_json(event):
+    created, subsystem, level, message, args, fields = event
+    try:
+        text = message % args if args else message
+    except (TypeError, ValueError) as error:
+        text = f"{message} {args!r} (formatting failed: {error})"
+    return json.dumps(
+        {
+            "time": created,
+            "subsystem": subsystem,
+            "level": logging.getLevelName(level),
+            "message": text,
+            "fields": fields,
+        },
+        default=str,
+    )
+
+
+# send events to a JSONL file at <path> instead of the console
+def start_sink(path, queue_size=DEFAULT_QUEUE_SIZE):
+    global _sink
+    stop_sink()
+    _sink = JsonlSink(path, queue_size)
+    return _sink
+
+
+# JsonlSink events are written to right now, None when they go to the console
+def current_sink():
+    return _sink
+
+
+# write out everything still queued and go back to logging to the console
+def stop_sink():
+    global _sink
+    sink, _sink = _sink, None
+    if sink is not None:
+        sink.close()
+        if sink.dropped:
+            logger.warning(f"Dropped {sink.dropped} log events, the queue was full")
+
+
+atexit.register(stop_sink)
+
+
+def set_debug_level(lvl):
+    if lvl not in LEVELS:
         logg(f"Invalid debug level: {lvl}")
         return
+    lvl = LEVELS[lvl]
 
-    logger.setLevel(lvl)
-    console_handler.setLevel(lvl)
+    set_level(lvl)
     logg(f"Set debug level to {lvl}")
 
 
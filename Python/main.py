@@ -14,16 +14,35 @@ import importlib
 from utils import string_to_32bit_int
 from contestant import Contestant
 from environment import Environment as Environment
+from fight_trace import Snapshot
+from sim_clock import FixedTimestepClock
+import tick_profiler
 import contestant, environment
 from logger import logger
 
-SIMULATION_FRAME_RATE = 10
 ANIMATION_FRAME_RATE = 24
 
 
 # Main simulation loop. at each time step all contestants are updated and useful info
 # is transmitted via a shared EnvironmentState info packet.
-def fight(contestants, delta=0.1, time_limit=1):
+# pose_backend: "blender" to pose the rigs in a running Blender, "headless" for pure
+# numpy kinematics (no Blender needed)
+# recorder: optional fight_trace.TraceWriter that records every tick to disk
+# animation: optional sim_clock.InterpolatedOutput that samples the fight at its own
+# frame rate. The simulation always steps by <delta>, whatever the animation rate
+# profiler: optional tick_profiler.TickProfiler that times every stage of every tick
+# seed: match seed the random streams of every contestant are keyed by (see
+# random_streams.py). Drawn from the global generator when not given
+def fight(
+    contestants,
+    delta=0.1,
+    time_limit=1,
+    pose_backend="blender",
+    recorder=None,
+    seed=None,
+    profiler=None,
+    animation=None,
+):
     DELTA = delta
     TIME_LIMIT = time_limit
 
@@ -33,25 +52,83 @@ def fight(contestants, delta=0.1, time_limit=1):
         team_map[contestant] = contestant.id
     env = Environment(
         team_map,
-        sim_frame_rate=SIMULATION_FRAME_RATE,
-        anim_frame_rate=ANIMATION_FRAME_RATE,
+        sim_frame_rate=1.0 / DELTA,
+        anim_frame_rate=animation.frame_rate if animation else ANIMATION_FRAME_RATE,
+        pose_backend=pose_backend,
+        seed=seed,
     )
     env_state = []
-    # Update every contestant at each time step
-    for i in np.arange(0, TIME_LIMIT, DELTA):
+    ticks = range(FixedTimestepClock.total_ticks(DELTA, TIME_LIMIT))
+    recorders = [output for output in (recorder, animation) if output]
+    for output in recorders:
+        output.begin(contestants, env, DELTA, TIME_LIMIT)
+    if profiler:
+        profiler.begin(contestants, len(ticks))
+        tick_profiler.active = profiler
+    try:
+        _run_ticks(contestants, env, env_state, ticks, recorders)
+    finally:
+        for output in recorders:
+            output.close()
+        if profiler:
+            tick_profiler.active = None
+            profiler.end()
+
+    return contestants[0].name
+
+
+# Continue a fight from a fight_trace.Snapshot up to tick <stop_tick> (default: the end
+# of the fight). Returns a snapshot of the fight at that point
+def resume(snapshot, stop_tick=None):
+    if stop_tick is None:
+        stop_tick = snapshot.total_ticks
+    ticks = range(snapshot.tick, stop_tick)
+    contestants, env = snapshot.contestants, snapshot.env
+    env_state = _run_ticks(contestants, env, snapshot.env_state, ticks)
+    return Snapshot.capture(
+        stop_tick, snapshot.total_ticks, contestants, env, env_state
+    )
+
+
+# Update every contestant at each time step. Returns the environment state the
+# contestants react to on the next tick
+def _run_ticks(contestants, env, env_state, ticks, recorders=()):
+    profiler = tick_profiler.active
+    for tick in ticks:
+        if profiler:
+            profiler.start_tick(tick)
         for contestant in contestants:
-            env.update(contestant.update(env_state))
+            if profiler:
+                profiler.start(tick_profiler.CONTESTANT_UPDATE, contestant.id)
+            contestant_state = contestant.update(env_state)
+            if profiler:
+                profiler.stop()
+                profiler.start(tick_profiler.ENVIRONMENT_UPDATE, contestant.id)
+            env.update(contestant_state)
+            if profiler:
+                profiler.stop()
 
         # set current environment state to last environment state
+        if profiler:
+            profiler.start(tick_profiler.CURRENT_STATE)
         env_state = env.current_state()
+        if profiler:
+            profiler.stop()
 
         # draw to screen
         env.draw()
+        for recorder in recorders:
+            if profiler:
+                profiler.start(tick_profiler.RECORDER)
+            recorder.record(env, env_state)
+            if profiler:
+                profiler.stop()
+        if profiler:
+            profiler.stop()
 
         if env.simulation_is_over():
             break
-
-    return contestants[0].name
+    return env_state
 
 
 # Quick tasks:
@@ -75,7 +152,7 @@ def main():
     # Before we start, we need to reload the Contestant module to reset the global variables
     os.system("cls")
     importlib.reload(contestant)
-    importlib.reload(Environment)
+    importlib.reload(environment)
 
     logger.info("Program start")
     hash_str = "Hello world!"
@@ -91,4 +168,5 @@ def main():
     logger.info(f"{winner} won!")
 
 
-main()
+if __name__ == "__main__":
+    main()
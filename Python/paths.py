@@ -0,0 +1,175 @@
+"""
+Analytic paths for ik targets: straight lines and quadratic or cubic Bezier curves,
+stored as rows of numpy arrays instead of Blender curve objects.
+
+Every path is kept as a cubic (lower degrees are raised exactly), so paths of every
+degree are evaluated together. A Bezier curve's parameter doesn't move at a constant
+speed, so each curved path gets a table of the fraction of its length covered at
+ARC_LENGTH_SAMPLES evenly spaced parameters. Progress along a path is a fraction of its
+length and is turned into a curve parameter by interpolating that table. Straight
+paths move at a constant speed already and are evaluated as a plain lerp.
+
+    paths = PathSet()
+    jab = paths.append([hand, target])                   # straight
+    hook = paths.append([hand, outside, target])         # quadratic
+    positions = paths.evaluate(np.array([0.5, 0.25]))    # (2, 3), one call
+"""
+
+import sys
+import os
+
+dir = os.path.dirname(__file__)
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+
+# seconds an ik target takes to follow a path from start to end
+PATH_DURATION = 1.0
+
+# parameters sampled to build the arc length table of a curved path
+ARC_LENGTH_SAMPLES = 32
+
+
+# (4, 3) cubic Bezier control points of a path through 2 (straight), 3 (quadratic) or
+# 4 (cubic) <control_points>
+def to_cubic(control_points):
+    points = np.asarray(control_points, dtype=np.float64)
+    if points.shape == (2, 3):
+        start, end = points
+        third = (end - start) / 3
+        return np.array([start, start + third, end - third, end])
+    if points.shape == (3, 3):
+        start, middle, end = points
+        return np.array(
+            [start, start + 2 * (middle - start) / 3, end + 2 * (middle - end) / 3, end]
+        )
+    if points.shape == (4, 3):
+        return points.copy()
+    raise ValueError(f"A path needs 2 to 4 control points, got {points.shape}")
+
+
+# points (..., 3) of cubic Bezier curves with (..., 4, 3) <control> at parameters <t>
+def bezier(control, t):
+    t = np.asarray(t, dtype=np.float64)[..., None]
+    s = 1 - t
+    return (
+        s * s * s * control[..., 0, :]
+        + 3 * s * s * t * control[..., 1, :]
+        + 3 * s * t * t * control[..., 2, :]
+        + t * t * t * control[..., 3, :]
+    )
+
+
+# fraction of the length of (..., 4, 3) curves covered at each of samples + 1 evenly
+# spaced parameters, and their lengths
+def arc_length_table(control, samples=ARC_LENGTH_SAMPLES):
+    control = np.asarray(control, dtype=np.float64)
+    t = np.linspace(0.0, 1.0, samples + 1)
+    points = bezier(control[..., None, :, :], t)
+    chords = np.linalg.norm(np.diff(points, axis=-2), axis=-1)
+    cumulative = np.concatenate(
+        [np.zeros(chords.shape[:-1] + (1,)), np.cumsum(chords, axis=-1)], axis=-1
+    )
+    lengths = cumulative[..., -1]
+    safe = np.where(lengths > 0, lengths, 1.0)[..., None]
+    # a curve of zero length is a point, spread its table like a straight line
+    table = np.where(lengths[..., None] > 0, cumulative / safe, t)
+    return table, lengths
+
+
+# Growable set of paths evaluated together. Indices returned by append stay valid, set()
+# replaces the path at an index
+class PathSet:
+    def __init__(self, capacity=0, samples=ARC_LENGTH_SAMPLES):
+        self.samples = samples
+        self._size = 0
+        self._control = np.zeros((capacity, 4, 3))
+        self._straight = np.ones(capacity, dtype=bool)
+        self._tables = np.tile(np.linspace(0.0, 1.0, samples + 1), (capacity, 1))
+        self._lengths = np.zeros(capacity)
+
+    def __len__(self):
+        return self._size
+
+    # (N, 4, 3) cubic control points of every path
+    @property
+    def control(self):
+        return self._control[: self._size]
+
+    # (N,) length of every path
+    @property
+    def lengths(self):
+        return self._lengths[: self._size]
+
+    # add a path through 2 to 4 <control_points>. Returns its index
+    def append(self, control_points):
+        if self._size == len(self._control):
+            self._grow(max(2 * self._size, 8))
+        self._size += 1
+        self.set(self._size - 1, control_points)
+        return self._size - 1
+
+    # make the path at <index> go through <control_points>. Indices under the capacity
+    # a PathSet was created with are valid from the start
+    def set(self, index, control_points):
+        points = np.asarray(control_points, dtype=np.float64)
+        control = to_cubic(points)
+        self._size = max(self._size, index + 1)
+        self._control[index] = control
+        self._straight[index] = len(points) == 2
+        if self._straight[index]:
+            self._tables[index] = np.linspace(0.0, 1.0, self.samples + 1)
+            self._lengths[index] = np.linalg.norm(points[1] - points[0])
+        else:
+            self._tables[index], self._lengths[index] = arc_length_table(
+                control, self.samples
+            )
+
+    # curve parameters of the paths at <indices> (all of them by default) at fractions
+    # <progress> of their lengths
+    def parameters(self, progress, indices=None):
+        indices = self._indices(indices)
+        progress = np.clip(np.asarray(progress, dtype=np.float64), 0.0, 1.0)
+        tables = self._tables[indices]
+        # table segment each progress falls in
+        segment = (tables[:, 1:-1] < progress[:, None]).sum(axis=1)
+        rows = np.arange(len(indices))
+        low, high = tables[rows, segment], tables[rows, segment + 1]
+        span = high - low
+        fraction = np.divide(
+            progress - low, span, out=np.zeros_like(span), where=span > 0
+        )
+        t = (segment + np.clip(fraction, 0.0, 1.0)) / self.samples
+        return np.where(self._straight[indices], progress, t)
+
+    # (N, 3) positions of the paths at <indices> (all of them by default) at fractions
+    # <progress> (N,) of their lengths. Progress is clipped to [0, 1], paths end at
+    # their last control point
+    def evaluate(self, progress, indices=None):
+        indices = self._indices(indices)
+        progress = np.clip(np.asarray(progress, dtype=np.float64), 0.0, 1.0)
+        control = self._control[indices]
+        start, end = control[:, 0], control[:, 3]
+        straight = self._straight[indices]
+        positions = start + progress[:, None] * (end - start)
+        if not straight.all():
+            curved = ~straight
+            positions[curved] = bezier(
+                control[curved],
+                self.parameters(progress[curved], indices[curved]),
+            )
+        return positions
+
+    def _indices(self, indices):
+        if indices is None:
+            return np.arange(self._size)
+        return np.asarray(indices, dtype=np.int64)
+
+    def _grow(self, capacity):
+        extra = capacity - len(self._control)
+        self._control = np.concatenate([self._control, np.zeros((extra, 4, 3))])
+        self._straight = np.concatenate([self._straight, np.ones(extra, dtype=bool)])
+        linear = np.linspace(0.0, 1.0, self.samples + 1)
+        self._tables = np.concatenate([self._tables, np.tile(linear, (extra, 1))])
+        self._lengths = np.concatenate([self._lengths, np.zeros(extra)])
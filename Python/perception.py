@@ -0,0 +1,151 @@
+"""
+How contestants misperceive each other's actions (see "Sim logic.txt"). Every pair of
+compiled actions gets a similarity from the tags, body parts and target locations they
+share. An action is mistaken for one of its most similar actions with a probability
+set by the attacker's ambiguity and the observer's perception:
+    noise = ambiguity * (1 - perception)
+and when it is mistaken, each similar action is picked proportionally to its
+similarity.
+
+Only the MAX_CONFUSIONS most similar actions of every action are kept, so misperceiving
+an observed action costs O(MAX_CONFUSIONS) no matter how large the catalog is. Every
+action observed in a tick, by every observer, is resolved with a single vectorized
+sample.
+"""
+
+import sys
+import os
+
+dir = os.path.dirname(__file__)
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+from action_table import ACTION_TABLE, popcount
+
+# most actions a single action can be mistaken for
+MAX_CONFUSIONS = 8
+
+
+# Jaccard similarity of every pair of bitsets in <bits>
+def _bit_similarity(bits):
+    shared = popcount(bits[:, None] & bits[None, :]).astype(np.float64)
+    either = popcount(bits[:, None] | bits[None, :]).astype(np.float64)
+    return np.divide(shared, either, out=np.zeros_like(shared), where=either > 0)
+
+
+# (A, A) similarity in [0, 1] of every pair of actions of <table>: the mean of how
+# alike their tags and body parts are and how many of their targets are the same
+def similarity_matrix(table=ACTION_TABLE):
+    tags = _bit_similarity(table.tag_bits)
+    parts = _bit_similarity(table.body_part_mask)
+    locations = table.target_locations
+    used = locations >= 0
+    same_target = (
+        (locations[:, None, :] == locations[None, :, :]) & used[:, None, :]
+    ).sum(axis=2)
+    either = (used[:, None, :] | used[None, :, :]).sum(axis=2)
+    targets = np.divide(
+        same_target, either, out=np.zeros(same_target.shape), where=either > 0
+    )
+    return (tags + parts + targets) / 3
+
+
+# Sparse ambiguity map over the ids of an action table. Rebuilt when actions are
+# compiled into the table after it was built
+class AmbiguityMap:
+    def __init__(self, table=ACTION_TABLE, max_confusions=MAX_CONFUSIONS):
+        self._table = table
+        self._max_confusions = max_confusions
+        self._size = -1
+        self._update()
+
+    # (A, k) ids of the actions every action can be mistaken for, -1 padded, and the
+    # (A, k) probability of each mistake once an action is mistaken
+    def confusions(self):
+        self._update()
+        return self._confusion_ids, self._confusion_probabilities
+
+    # similarity of actions <a> and <b>
+    def similarity(self, a, b):
+        self._update()
+        return float(self._similarity[a, b])
+
+    # Action each observation is perceived as.
+    # action_ids: (N,) observed action ids
+    # noise: (N,) chance of mistaking each one for a similar action
+    # uniforms: (N,) uniform numbers in [0, 1)
+    def misperceive(self, action_ids, noise, uniforms):
+        ids, probabilities = self.confusions()
+        action_ids = np.asarray(action_ids, dtype=np.int64)
+        if not len(action_ids):
+            return action_ids
+        noise = np.clip(np.asarray(noise, dtype=np.float64), 0.0, 1.0)
+        # actions that can't be mistaken for anything are always perceived right
+        mistakable = ids[action_ids, 0] >= 0
+        cumulative = np.cumsum(probabilities[action_ids], axis=1) * noise[:, None]
+        # uniforms under the noise pick a mistake, the rest keep the action
+        choice = (np.asarray(uniforms)[:, None] >= cumulative).sum(axis=1)
+        mistaken = mistakable & (choice < ids.shape[1])
+        choice = np.minimum(choice, ids.shape[1] - 1)
+        return np.where(mistaken, ids[action_ids, choice], action_ids)
+
+    def _update(self):
+        if self._size == len(self._table):
+            return
+        self._size = len(self._table)
+        self._similarity = similarity_matrix(self._table)
+        # an action isn't a mistake for itself
+        similarity = self._similarity.copy()
+        np.fill_diagonal(similarity, 0.0)
+        k = min(self._max_confusions, max(self._size - 1, 1))
+        # the k most similar actions of every action, most similar first
+        ids = np.argsort(-similarity, axis=1, kind="stable")[:, :k]
+        weights = np.take_along_axis(similarity, ids, axis=1)
+        totals = weights.sum(axis=1, keepdims=True)
+        self._confusion_ids = np.where(weights > 0, ids, -1).astype(np.int64)
+        self._confusion_probabilities = np.divide(
+            weights, totals, out=np.zeros_like(weights), where=totals > 0
+        )
+
+
+ACTION_AMBIGUITY = AmbiguityMap()
+
+
+# chance that <observer> mistakes an action of <actor>. Contestants without an
+# ambiguity are never misperceived and contestants without a perception see perfectly
+def perception_noise(observer, actor):
+    ambiguity = actor._ambiguity or 0.0
+    perception = 1.0 if observer._perception is None else observer._perception
+    return ambiguity * (1.0 - perception)
+
+
+# Misperceive every action in <env_state> (contestant id -> frozen EnvInfoPacket) for
+# every contestant observing it, in one vectorized sample. <streams> maps every
+# observer id to the random_streams.RandomStream it draws from. Each packet's
+# perceived_action_ids gets what every observer saw
+def perceive_actions(env_state, streams, ambiguity_map=ACTION_AMBIGUITY):
+    observed = []
+    noise = []
+    owners = []
+    for observer_id, observer_packet in env_state.items():
+        observer = observer_packet.contestant
+        for actor_id, packet in env_state.items():
+            if actor_id == observer_id or not packet.action_ids:
+                continue
+            pair_noise = perception_noise(observer, packet.contestant)
+            if pair_noise <= 0:
+                continue
+            observed.extend(packet.action_ids)
+            noise.extend([pair_noise] * len(packet.action_ids))
+            owners.append((packet, observer_id, len(packet.action_ids)))
+    if not observed:
+        return
+    uniforms = np.concatenate(
+        [streams[observer_id].uniforms(count) for _, observer_id, count in owners]
+    )
+    perceived = ambiguity_map.misperceive(observed, noise, uniforms).tolist()
+    start = 0
+    for packet, observer_id, count in owners:
+        packet.perceived_action_ids[observer_id] = perceived[start : start + count]
+        start += count
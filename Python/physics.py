@@ -0,0 +1,113 @@
+"""
+Rigid body state of every body part of every contestant, in contiguous arrays:
+    mass      float64 (P,)
+    position  float64 (P, 3)
+    velocity  float64 (P, 3)
+    impulse   float64 (P, 3)  accumulated since the last step
+    force     float64 (P, 3)  constant forces, e.g. gravity
+Row r is one (contestant id, body part). Body parts are moved by the pose engine, so
+every tick drive() gives the store where the parts of a contestant were posed. Their
+velocity becomes the one that takes them there in one step, which is what momentum and
+impact are computed from. Hits add impulses on top. step() then integrates every part
+at once with semi-implicit Euler: velocities first, positions from the new velocities.
+"""
+
+import sys
+import os
+
+dir = os.path.dirname(__file__)
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+
+
+class PhysicsStore:
+    def __init__(self, delta=0.1):
+        self.delta = delta
+        self._size = 0
+        # (contestant id, body part) -> row
+        self._rows = {}
+        self._mass = np.ones(8)
+        self._position = np.zeros((8, 3))
+        self._velocity = np.zeros((8, 3))
+        self._impulse = np.zeros((8, 3))
+        self._force = np.zeros((8, 3))
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def mass(self):
+        return self._mass[: self._size]
+
+    @property
+    def position(self):
+        return self._position[: self._size]
+
+    @property
+    def velocity(self):
+        return self._velocity[: self._size]
+
+    # Add the body parts of a contestant. <masses> maps each body part to its mass and
+    # <positions> is a (parts, 3) array of where they are, in the same order. Returns
+    # their rows
+    def add_body(self, contestant_id, masses, positions):
+        parts = list(masses)
+        start = self._size
+        self._reserve(start + len(parts))
+        end = start + len(parts)
+        self._mass[start:end] = [masses[part] for part in parts]
+        self._position[start:end] = np.asarray(positions, dtype=np.float64)
+        self._velocity[start:end] = 0.0
+        self._impulse[start:end] = 0.0
+        self._force[start:end] = 0.0
+        for row, part in enumerate(parts, start=start):
+            self._rows[(contestant_id, part)] = row
+        self._size = end
+        return np.arange(start, end)
+
+    # rows of the <body_parts> of the contestant with id <contestant_id>
+    def rows(self, contestant_id, body_parts):
+        return np.array(
+            [self._rows[(contestant_id, part)] for part in body_parts], dtype=np.int64
+        )
+
+    # the pose engine moved the parts at <rows> to <positions> (N, 3) this step
+    def drive(self, rows, positions):
+        positions = np.asarray(positions, dtype=np.float64)
+        self._velocity[rows] = (positions - self._position[rows]) / self.delta
+
+    # add (N, 3) <impulses> to the parts at <rows>. Rows may repeat
+    def apply_impulse(self, rows, impulses):
+        np.add.at(self._impulse, rows, impulses)
+
+    # constant (N, 3) <forces> on the parts at <rows> from now on
+    def set_force(self, rows, forces):
+        self._force[rows] = forces
+
+    # advance every body part one step
+    def step(self):
+        size = self._size
+        mass = self._mass[:size, None]
+        velocity = self._velocity[:size]
+        velocity += (self._force[:size] * self.delta + self._impulse[:size]) / mass
+        self._position[:size] += velocity * self.delta
+        self._impulse[:size] = 0.0
+
+    # (N, 3) momentum of the parts at <rows>
+    def momentum(self, rows):
+        return self._mass[rows, None] * self._velocity[rows]
+
+    # magnitude of the summed momentum of the parts at <rows>, how hard they hit
+    # together
+    def impact(self, rows):
+        return float(np.linalg.norm(self.momentum(rows).sum(axis=0)))
+
+    def _reserve(self, capacity):
+        if capacity <= len(self._mass):
+            return
+        capacity = max(capacity, 2 * len(self._mass))
+        self._mass = np.resize(self._mass, capacity)
+        for name in ("_position", "_velocity", "_impulse", "_force"):
+            setattr(self, name, np.resize(getattr(self, name), (capacity, 3)))
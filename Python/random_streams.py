@@ -0,0 +1,90 @@
+"""
+Counter-based random streams. Every contestant draws each kind of randomness (reaction
+jitter, action choice, perception) from its own Philox stream, keyed by
+(match seed, contestant id, stream). Nothing is shared between streams, so adding a
+contestant or updating contestants in another order doesn't change anybody else's
+draws, and matches can run in parallel without sharing a generator.
+
+Philox computes the numbers of any position of a stream straight from the key and a
+counter, so a stream is nothing but its key and how many numbers were used. Numbers
+are drawn in vectorized blocks of BLOCK_SIZE, and uniforms_at() jumps to any position,
+which lets lockstep.py draw exactly what each scalar contestant would without
+replaying anything.
+
+    stream = RandomStream(match_seed, contestant.id, CHOICE_STREAM)
+    stream.uniform()          # next number in [0, 1)
+    stream.uniforms(3)        # next 3 numbers
+"""
+
+import sys
+import os
+
+dir = os.path.dirname(__file__)
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+
+# streams of every contestant
+REACTION_STREAM = 0
+CHOICE_STREAM = 1
+PERCEPTION_STREAM = 2
+
+# numbers drawn at a time
+BLOCK_SIZE = 256
+# 64 bit words Philox makes per counter step. random() uses one per number
+_WORDS_PER_STEP = 4
+
+
+# (2,) uint64 Philox key of <stream> of contestant <contestant_id> in a match
+def stream_key(match_seed, contestant_id, stream):
+    return np.array(
+        [int(match_seed) & 0xFFFFFFFFFFFFFFFF, (int(contestant_id) << 32) | stream],
+        dtype=np.uint64,
+    )
+
+
+# numbers [start, start + n) of the stream with Philox <key>
+def uniforms_at(key, start, n):
+    start = int(start)
+    bit_generator = np.random.Philox(key=key)
+    bit_generator.advance(start // _WORDS_PER_STEP)
+    skip = start % _WORDS_PER_STEP
+    return np.random.Generator(bit_generator).random(skip + n)[skip:]
+
+
+# Uniform numbers in [0, 1) of one stream, in order
+class RandomStream:
+    def __init__(self, match_seed, contestant_id, stream, block_size=BLOCK_SIZE):
+        self.key = stream_key(match_seed, contestant_id, stream)
+        self.block_size = block_size
+        # numbers used so far
+        self.position = 0
+        self._block = np.empty(0)
+        self._block_start = 0
+
+    # next number
+    def uniform(self):
+        index = self.position - self._block_start
+        if not 0 <= index < len(self._block):
+            self._fill(self.position)
+            index = 0
+        self.position += 1
+        return self._block[index]
+
+    # (n,) next numbers
+    def uniforms(self, n):
+        index = self.position - self._block_start
+        if index < 0 or index + n > len(self._block):
+            self._fill(self.position, n)
+            index = 0
+        self.position += n
+        return self._block[index : index + n].copy()
+
+    # carry on from number <position> of the stream
+    def seek(self, position):
+        self.position = position
+
+    def _fill(self, start, n=0):
+        self._block = uniforms_at(self.key, start, max(n, self.block_size))
+        self._block_start = start
@@ -0,0 +1,74 @@
+"""
+Fixed capacity FIFO of the environment states a contestant perceived but hasn't reacted
+to yet. Every state is stamped with the tick it was perceived on.
+"""
+
+import numpy as np
+
+
+# Ring buffer of (tick, state). States are pushed once per tick and consumed oldest
+# first, so the ticks held are always consecutive and any of them can be read in O(1).
+# Once full, pushing drops the oldest state.
+class ReactionWindow:
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError(f"Invalid reaction window capacity: {capacity}")
+        self.capacity = capacity
+        self._states = [None] * capacity
+        self._ticks = np.full(capacity, -1, dtype=np.int64)
+        # slot of the oldest state
+        self._start = 0
+        self._length = 0
+        # states pushed out by newer ones before they were consumed
+        self.dropped = 0
+
+    def __len__(self):
+        return self._length
+
+    def push(self, tick, state):
+        if self._length and tick != self.newest_tick() + 1:
+            raise ValueError(f"Tick {tick} doesn't follow tick {self.newest_tick()}")
+        if self._length == self.capacity:
+            self.pop_oldest()
+            self.dropped += 1
+        slot = (self._start + self._length) % self.capacity
+        self._states[slot] = state
+        self._ticks[slot] = tick
+        self._length += 1
+
+    # remove and return the oldest state
+    def pop_oldest(self):
+        if not self._length:
+            raise IndexError("pop from empty reaction window")
+        state = self._states[self._start]
+        self._states[self._start] = None
+        self._start = (self._start + 1) % self.capacity
+        self._length -= 1
+        return state
+
+    # state pushed <age> pushes ago, 0 being the newest
+    def newest(self, age=0):
+        if not 0 <= age < self._length:
+            raise IndexError(f"No state {age} pushes ago")
+        return self._states[(self._start + self._length - 1 - age) % self.capacity]
+
+    def newest_tick(self):
+        return int(self._ticks[(self._start + self._length - 1) % self.capacity])
+
+    def oldest_tick(self):
+        return int(self._ticks[self._start])
+
+    # state perceived on <tick>, None if it was already consumed or never pushed
+    def at_tick(self, tick):
+        if not self._length:
+            return None
+        offset = tick - self.oldest_tick()
+        if not 0 <= offset < self._length:
+            return None
+        return self._states[(self._start + offset) % self.capacity]
+
+    # state perceived <ticks> ticks before the newest one
+    def ticks_ago(self, ticks):
+        if not self._length:
+            return None
+        return self.at_tick(self.newest_tick() - ticks)
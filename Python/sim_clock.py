@@ -0,0 +1,236 @@
+"""
+Fixed timestep simulation clock and the output stage that turns simulation ticks into
+animation frames.
+
+The AI, the pose engine and hit detection always step by the same delta (0.1s by
+default), whatever rate the fight is rendered at. Animation frames are sampled
+afterwards: each frame's body locations are linearly interpolated between the two
+ticks around it, and its transforms are interpolated with a lerp for the translation
+and a slerp for the rotation. Rendering at 24 or 60 fps then costs one interpolation
+per frame instead of a full simulation step.
+
+Tick k of a fight (0 based) leaves the contestants where they are at time
+(k + 1) * delta. The state before the first tick is at time 0.
+"""
+
+import sys
+import os
+
+dir = os.path.dirname(__file__)
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+
+
+# Steps a simulation by a fixed delta. Offline fights just call step(). Real time
+# callers feed it the wall time that passed with advance(), run as many steps as it
+# returns and render at alpha() of the way to the next step
+class FixedTimestepClock:
+    def __init__(self, delta):
+        if delta <= 0:
+            raise ValueError(f"Invalid time step: {delta}")
+        self.delta = delta
+        self.tick = 0
+        # wall time not simulated yet
+        self._accumulator = 0.0
+
+    # number of ticks in a fight of <time_limit> seconds
+    @staticmethod
+    def total_ticks(delta, time_limit):
+        return len(np.arange(0, time_limit, delta))
+
+    @property
+    def time(self):
+        return self.tick * self.delta
+
+    def step(self):
+        self.tick += 1
+
+    # add <elapsed> seconds of wall time. Returns how many steps are due
+    def advance(self, elapsed):
+        self._accumulator += elapsed
+        steps = int(self._accumulator // self.delta)
+        self._accumulator -= steps * self.delta
+        return steps
+
+    # how far the wall time is between the last step and the next one, in [0, 1)
+    def alpha(self):
+        return self._accumulator / self.delta
+
+
+# 3x3 rotation matrices (..., 3, 3) to unit quaternions (..., 4) as (w, x, y, z)
+def matrix_to_quaternion(matrices):
+    m = np.asarray(matrices, dtype=np.float64)
+    trace = m[..., 0, 0] + m[..., 1, 1] + m[..., 2, 2]
+    # each component from the diagonal, then the signs from the off diagonal terms
+    w = np.sqrt(np.maximum(1 + trace, 0)) / 2
+    x = np.sqrt(np.maximum(1 + m[..., 0, 0] - m[..., 1, 1] - m[..., 2, 2], 0)) / 2
+    y = np.sqrt(np.maximum(1 - m[..., 0, 0] + m[..., 1, 1] - m[..., 2, 2], 0)) / 2
+    z = np.sqrt(np.maximum(1 - m[..., 0, 0] - m[..., 1, 1] + m[..., 2, 2], 0)) / 2
+    x = np.copysign(x, m[..., 2, 1] - m[..., 1, 2])
+    y = np.copysign(y, m[..., 0, 2] - m[..., 2, 0])
+    z = np.copysign(z, m[..., 1, 0] - m[..., 0, 1])
+    quaternions = np.stack([w, x, y, z], axis=-1)
+    return quaternions / np.linalg.norm(quaternions, axis=-1, keepdims=True)
+
+
+def quaternion_to_matrix(quaternions):
+    w, x, y, z = np.moveaxis(np.asarray(quaternions, dtype=np.float64), -1, 0)
+    rows = [
+        [1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)],
+        [2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)],
+        [2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)],
+    ]
+    return np.stack([np.stack(row, axis=-1) for row in rows], axis=-2)
+
+
+# spherical interpolation between quaternions <a> and <b> (..., 4) at <t> (...)
+def slerp(a, b, t):
+    t = np.asarray(t, dtype=np.float64)[..., None]
+    dot = np.sum(a * b, axis=-1, keepdims=True)
+    # take the short way round
+    b = np.where(dot < 0, -b, b)
+    dot = np.abs(dot)
+    angle = np.arccos(np.clip(dot, -1.0, 1.0))
+    sin_angle = np.sin(angle)
+    # nearly parallel quaternions fall back to a normalized lerp
+    close = sin_angle < 1e-6
+    safe_sin = np.where(close, 1.0, sin_angle)
+    weight_a = np.where(close, 1 - t, np.sin((1 - t) * angle) / safe_sin)
+    weight_b = np.where(close, t, np.sin(t * angle) / safe_sin)
+    result = weight_a * a + weight_b * b
+    return result / np.linalg.norm(result, axis=-1, keepdims=True)
+
+
+# Transformation matrices (..., 4, 4) at <t> (...) of the way from <a> to <b>
+def interpolate_transforms(a, b, t):
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)
+    shape = np.broadcast_shapes(a.shape, b.shape)
+    result = np.zeros(shape)
+    result[..., 3, 3] = 1.0
+    rotation = slerp(
+        matrix_to_quaternion(a[..., :3, :3]), matrix_to_quaternion(b[..., :3, :3]), t
+    )
+    result[..., :3, :3] = quaternion_to_matrix(rotation)
+    translation = b[..., :3, 3] - a[..., :3, 3]
+    result[..., :3, 3] = a[..., :3, 3] + t[..., None] * translation
+    return result
+
+
+# Sample states recorded at <times> (T,) at <frame_times> (F,). <body_locations> is
+# (T, ...) and <transforms> (T, ..., 4, 4). Frames outside the recorded times are
+# clamped to the first or last state. Returns (F, ...) body locations and transforms
+def resample(times, body_locations, transforms, frame_times):
+    times = np.asarray(times, dtype=np.float64)
+    frame_times = np.asarray(frame_times, dtype=np.float64)
+    if len(times) == 1:
+        before = after = np.zeros(len(frame_times), dtype=np.int64)
+        t = np.zeros(len(frame_times))
+    else:
+        after = np.searchsorted(times, frame_times, side="right")
+        after = np.clip(after, 1, len(times) - 1)
+        before = after - 1
+        t = (frame_times - times[before]) / (times[after] - times[before])
+        t = np.clip(t, 0.0, 1.0)
+    body_locations = np.asarray(body_locations)
+    transforms = np.asarray(transforms)
+    location_t = t.reshape(t.shape + (1,) * (body_locations.ndim - 1))
+    locations = body_locations[before] + location_t * (
+        body_locations[after] - body_locations[before]
+    )
+    transform_t = t.reshape(t.shape + (1,) * (transforms.ndim - 3))
+    transform_t = np.broadcast_to(transform_t, transforms[before].shape[:-2])
+    frames = interpolate_transforms(transforms[before], transforms[after], transform_t)
+    return locations, frames
+
+
+# times of every frame of a <frame_rate> fps animation from <start> to <end> seconds
+def frame_times(frame_rate, start, end):
+    first = int(np.ceil(start * frame_rate - 1e-9))
+    last = int(np.floor(end * frame_rate + 1e-9))
+    return np.arange(first, last + 1) / frame_rate
+
+
+# Interpolated animation of a fight recorded with fight_trace.TraceWriter, at
+# <frame_rate> fps. Returns (frame times, body locations, transforms)
+def resample_trace(trace, frame_rate):
+    times = (np.arange(trace.ticks) + 1) * trace.delta
+    if not len(times):
+        raise ValueError(f"Trace {trace.path} has no ticks")
+    output_times = frame_times(frame_rate, times[0], times[-1])
+    locations, transforms = resample(
+        times, trace.body_locations, trace.transforms, output_times
+    )
+    return output_times, locations, transforms
+
+
+# Recorder for fight() that samples the fight as an animation at <frame_rate> fps while
+# it runs. After the fight, contestant_names holds the name of every contestant slot,
+# times the time of every frame, body_locations the (frames, contestants, 8, 3) ik
+# targets and transforms the (frames, contestants, 4, 4) transformation matrices
+class InterpolatedOutput:
+    def __init__(self, frame_rate=24):
+        self.frame_rate = frame_rate
+        self.contestant_names = []
+        self.times = np.empty(0)
+        self.body_locations = np.empty((0, 0, 8, 3))
+        self.transforms = np.empty((0, 0, 4, 4))
+        self._contestants = []
+        self._clock = None
+        self._previous = None
+        self._frames = []
+
+    def begin(self, contestants, env, delta, time_limit):
+        self._contestants = list(contestants)
+        self.contestant_names = [contestant.name for contestant in contestants]
+        self._clock = FixedTimestepClock(delta)
+        self._frames = []
+        self._previous = (0.0,) + self._state()
+        self._add_frames(0.0, self._previous)
+
+    def record(self, env, env_state):
+        start = self._previous[0]
+        self._clock.step()
+        current = (self._clock.time,) + self._state()
+        self._add_frames(start, self._previous, current)
+        self._previous = current
+
+    def close(self):
+        if not self._frames:
+            return
+        times, locations, transforms = zip(*self._frames)
+        self.times = np.concatenate(times)
+        self.body_locations = np.concatenate(locations)
+        self.transforms = np.concatenate(transforms)
+
+    # (body locations, transforms) of every contestant right now
+    def _state(self):
+        locations = np.array(
+            [
+                [location.data for location in contestant._body_locations.values()]
+                for contestant in self._contestants
+            ]
+        )
+        transforms = np.array(
+            [contestant.transformation_matrix for contestant in self._contestants]
+        )
+        return locations, transforms
+
+    # frames in (start, current time], or just the frame at 0 for the first state
+    def _add_frames(self, start, previous, current=None):
+        if current is None:
+            self._frames.append((np.zeros(1), previous[1][None], previous[2][None]))
+            return
+        times = frame_times(self.frame_rate, start, current[0])
+        times = times[times > start]
+        if not len(times):
+            return
+        locations, transforms = resample(
+            [previous[0], current[0]],
+            np.stack([previous[1], current[1]]),
+            np.stack([previous[2], current[2]]),
+            times,
+        )
+        self._frames.append((times, locations, transforms))
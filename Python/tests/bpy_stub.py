@@ -0,0 +1,158 @@
+"""
+Stand-in for the parts of Blender's bpy module blender/bake.py uses. Every call into
+it is counted in Bpy.calls, so tests can check how many API calls a bake takes
+without running Blender.
+
+    bpy = Bpy(bone_names)
+    bake_fight(names, times, body_locations, transforms, bpy=bpy)
+    bpy.calls                   # API calls made
+"""
+
+import numpy as np
+
+
+class Bpy:
+    def __init__(self, bone_names, rig_template_name="rig_template"):
+        self.calls = 0
+        self.data = _Data(self)
+        self.context = _Context(self)
+        self.data.objects.items[rig_template_name] = _Object(self, bone_names)
+
+    def call(self):
+        self.calls += 1
+
+
+class _Data:
+    def __init__(self, bpy):
+        self.objects = _Collection(bpy)
+        self.actions = _Collection(bpy)
+
+
+# bpy.data.objects / bpy.data.actions
+class _Collection:
+    def __init__(self, bpy):
+        self.bpy = bpy
+        self.items = {}
+
+    def get(self, name):
+        self.bpy.call()
+        return self.items.get(name)
+
+    def __getitem__(self, name):
+        self.bpy.call()
+        return self.items[name]
+
+    def new(self, name):
+        self.bpy.call()
+        self.items[name] = _Action(self.bpy, name)
+        return self.items[name]
+
+    def remove(self, item):
+        self.bpy.call()
+        del self.items[item.name]
+
+    def link(self, item):
+        self.bpy.call()
+        self.items[item.name] = item
+
+
+class _Context:
+    def __init__(self, bpy):
+        self.scene = _Scene(bpy)
+
+
+class _Scene:
+    def __init__(self, bpy):
+        self.collection = _SceneCollection(bpy)
+        self.render = _Render()
+        self.frame_start = 1
+        self.frame_end = 250
+
+
+class _SceneCollection:
+    def __init__(self, bpy):
+        self.objects = _Collection(bpy)
+
+
+class _Render:
+    def __init__(self):
+        self.fps = 24
+
+
+class _Object:
+    def __init__(self, bpy, bone_names, name=""):
+        self.bpy = bpy
+        self.name = name
+        self.rotation_mode = "QUATERNION"
+        self.data = _Armature(bone_names)
+        self.animation_data = None
+        self._bone_names = bone_names
+
+    def copy(self):
+        self.bpy.call()
+        return _Object(self.bpy, self._bone_names, self.name)
+
+    def animation_data_create(self):
+        self.bpy.call()
+        self.animation_data = _AnimationData()
+        return self.animation_data
+
+
+class _Armature:
+    def __init__(self, bone_names):
+        self.bones = {name: _Bone() for name in bone_names}
+
+
+class _Bone:
+    def __init__(self):
+        self.matrix_local = np.eye(4)
+
+
+class _AnimationData:
+    def __init__(self):
+        self.action = None
+
+
+class _Action:
+    def __init__(self, bpy, name):
+        self.name = name
+        self.fcurves = _FCurves(bpy)
+
+
+class _FCurves:
+    def __init__(self, bpy):
+        self.bpy = bpy
+        self.curves = []
+
+    def new(self, data_path, index=0, action_group=""):
+        self.bpy.call()
+        self.curves.append(_FCurve(self.bpy, data_path, index))
+        return self.curves[-1]
+
+
+class _FCurve:
+    def __init__(self, bpy, data_path, index):
+        self.bpy = bpy
+        self.data_path = data_path
+        self.array_index = index
+        self.keyframe_points = _KeyframePoints(bpy)
+
+    def update(self):
+        self.bpy.call()
+
+
+class _KeyframePoints:
+    def __init__(self, bpy):
+        self.bpy = bpy
+        self.co = np.empty((0, 2), dtype=np.float32)
+
+    def add(self, count):
+        self.bpy.call()
+        self.co = np.zeros((len(self.co) + count, 2), dtype=np.float32)
+
+    def foreach_set(self, attribute, values):
+        self.bpy.call()
+        setattr(self, attribute, np.asarray(values).reshape(-1, 2))
+
+    def __len__(self):
+        return len(self.co)
@@ -0,0 +1,48 @@
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+import pytest
+from bpy_stub import Bpy
+from blender.bake import IK_TARGET_BONES, bake_animation
+from contestant import Contestant
+from main import fight
+from sim_clock import InterpolatedOutput
+
+
+@pytest.fixture
+def bpy():
+    return Bpy(IK_TARGET_BONES.values())
+
+
+def _animation(time_limit, frame_rate=24):
+    contestants = [Contestant("Jack", id=1), Contestant("Jill", id=2)]
+    animation = InterpolatedOutput(frame_rate=frame_rate)
+    fight(contestants, 0.1, time_limit, "headless", seed=0, animation=animation)
+    return animation
+
+
+def test_bake_calls_do_not_grow_with_the_fight(bpy):
+    bake_animation(_animation(2), bpy=bpy)
+    short_fight_calls = bpy.calls
+    long_fight = Bpy(IK_TARGET_BONES.values())
+    bake_animation(_animation(8), bpy=long_fight)
+    assert long_fight.calls == short_fight_calls
+
+
+def test_bake_keys_every_frame(bpy):
+    animation = _animation(2)
+    actions = bake_animation(animation, frame_start=1, bpy=bpy)
+    # location and rotation of the rig, then the location of every ik target
+    channels = 2 + len(IK_TARGET_BONES)
+    for action in actions:
+        assert len(action.fcurves.curves) == channels * 3
+        for fcurve in action.fcurves.curves:
+            assert len(fcurve.keyframe_points) == len(animation.times)
+    frames = actions[0].fcurves.curves[0].keyframe_points.co[:, 0]
+    assert np.allclose(frames, 1 + animation.times * animation.frame_rate)
+    assert bpy.context.scene.render.fps == animation.frame_rate
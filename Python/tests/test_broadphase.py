@@ -0,0 +1,59 @@
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+from broadphase import SweepAndPrune, sphere_aabb
+
+
+# every (striker, target) pair of different teams whose boxes overlap, by testing all
+# pairs
+def _brute_force_pairs(boxes):
+    pairs = set()
+    for striker, (team, kind, low, high) in boxes.items():
+        if kind != SweepAndPrune.STRIKER:
+            continue
+        for target, (other_team, other_kind, other_low, other_high) in boxes.items():
+            if other_kind != SweepAndPrune.TARGET or other_team == team:
+                continue
+            if np.all(low <= other_high) and np.all(other_low <= high):
+                pairs.add((striker, target))
+    return pairs
+
+
+def test_pairs_match_brute_force_while_proxies_move():
+    rng = np.random.default_rng(0)
+    broadphase = SweepAndPrune()
+    boxes = {}
+    for index in range(40):
+        team = index % 3
+        kind = SweepAndPrune.STRIKER if index % 2 else SweepAndPrune.TARGET
+        low, high = sphere_aabb(rng.uniform(-2, 2, 3), rng.uniform(0.1, 0.5))
+        handle = broadphase.add_proxy(index, team, kind, low, high)
+        boxes[handle] = (team, kind, low, high)
+    assert set(broadphase.pairs()) == _brute_force_pairs(boxes)
+
+    for _ in range(50):
+        for handle, (team, kind, low, high) in list(boxes.items()):
+            move = rng.normal(scale=0.2, size=3)
+            broadphase.update_proxy(handle, low + move, high + move)
+            boxes[handle] = (team, kind, low + move, high + move)
+        assert set(broadphase.pairs()) == _brute_force_pairs(boxes)
+
+
+def test_removed_proxies_leave_no_pairs():
+    rng = np.random.default_rng(1)
+    broadphase = SweepAndPrune()
+    boxes = {}
+    for index in range(20):
+        kind = SweepAndPrune.STRIKER if index % 2 else SweepAndPrune.TARGET
+        low, high = sphere_aabb(rng.uniform(-1, 1, 3), 0.5)
+        handle = broadphase.add_proxy(index, index % 2, kind, low, high)
+        boxes[handle] = (index % 2, kind, low, high)
+    for handle in list(boxes)[::3]:
+        broadphase.remove_proxy(handle)
+        del boxes[handle]
+    assert set(broadphase.pairs()) == _brute_force_pairs(boxes)
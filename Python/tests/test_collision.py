@@ -0,0 +1,43 @@
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+from common import Vec3
+from collision import BoundingBox
+
+
+def _box(center, angles, half_extents):
+    return BoundingBox(Vec3(center), Vec3(angles), Vec3(half_extents))
+
+
+def test_identical_boxes_away_from_origin_collide():
+    box_a = _box([10, 0, 0], [0.3, 0.2, 0.1], [1, 1, 1])
+    box_b = _box([10, 0, 0], [0.3, 0.2, 0.1], [1, 1, 1])
+    assert box_a.collision(box_b)
+
+
+def test_rotated_box_uses_its_own_extents():
+    # a long box turned 90 degrees about z reaches along y, not x
+    long_box = _box([0, 0, 0], [0, 0, np.pi / 2], [3, 0.5, 0.5])
+    assert long_box.collision(_box([0, 3, 0], [0, 0, 0], [0.4, 0.4, 0.4]))
+    assert not long_box.collision(_box([3, 0, 0], [0, 0, 0], [0.4, 0.4, 0.4]))
+
+
+def test_edge_axis_separates_boxes():
+    # cubes turned 45 degrees about different axes. No face normal separates them,
+    # only the cross product of an edge of each
+    cube_a = _box([0, 0, 0], [0, 0, np.pi / 4], [1, 1, 1])
+    assert not cube_a.collision(_box([1.5, 1.5, 2], [np.pi / 4, 0, 0], [1, 1, 1]))
+    assert cube_a.collision(_box([1.2, 1.2, 1.6], [np.pi / 4, 0, 0], [1, 1, 1]))
+
+
+def test_box_box_is_symmetric():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        box_a = _box(rng.normal(size=3), rng.uniform(-3, 3, 3), rng.uniform(0.2, 1, 3))
+        box_b = _box(rng.normal(size=3), rng.uniform(-3, 3, 3), rng.uniform(0.2, 1, 3))
+        assert box_a.collision(box_b) == box_b.collision(box_a)
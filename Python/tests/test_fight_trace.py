@@ -0,0 +1,52 @@
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+import pytest
+from contestant import Contestant
+from fight_trace import FightTrace, TraceWriter
+from main import fight
+
+
+def _record(path, snapshot_interval=10, time_limit=6, seed=3):
+    contestants = [
+        Contestant(name="Jack", id=1, reaction_time=5),
+        Contestant(name="Jill", id=2, reaction_time=8),
+    ]
+    recorder = TraceWriter(str(path), snapshot_interval=snapshot_interval)
+    fight(contestants, 0.1, time_limit, "headless", recorder=recorder, seed=seed)
+    return FightTrace(str(path))
+
+
+def _locations(snapshot):
+    return np.array(
+        [
+            [location.data for location in contestant._body_locations.values()]
+            for contestant in snapshot.contestants
+        ]
+    )
+
+
+def test_seek_matches_recorded_ticks(tmp_path):
+    trace = _record(tmp_path)
+    # on, between and after snapshots, and the last tick
+    for tick in (1, 7, 10, 11, 29, len(trace)):
+        snapshot = trace.seek(tick)
+        assert snapshot.tick == tick
+        assert np.allclose(_locations(snapshot), trace.body_locations[tick - 1])
+
+
+def test_seek_needs_snapshots(tmp_path):
+    trace = _record(tmp_path, snapshot_interval=None, time_limit=2)
+    with pytest.raises(ValueError):
+        trace.seek(5)
+
+
+def test_seek_outside_the_fight_raises(tmp_path):
+    trace = _record(tmp_path, time_limit=2)
+    with pytest.raises(ValueError):
+        trace.seek(trace.meta["total_ticks"] + 1)
@@ -0,0 +1,43 @@
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+from contestant import Contestant
+from headless.pose_engine import PoseEngine
+from ik import MAX_TWIST, SHOULDER_ROWS, solve_two_bone
+
+
+def test_two_bone_reaches_targets_in_range():
+    rng = np.random.default_rng(0)
+    roots = rng.normal(size=(20, 3))
+    targets = roots + rng.normal(size=(20, 3)) * 0.3
+    upper, lower = np.full(20, 0.4), np.full(20, 0.4)
+    middles, ends, leftover = solve_two_bone(
+        roots, targets, upper, lower, rng.normal(size=(20, 3))
+    )
+    in_range = np.linalg.norm(targets - roots, axis=1) <= 0.8
+    assert np.allclose(ends[in_range], targets[in_range])
+    assert np.allclose(leftover[in_range], 0)
+    assert np.allclose(np.linalg.norm(middles - roots, axis=1), upper)
+    assert np.allclose(np.linalg.norm(ends - middles, axis=1), lower)
+
+
+def test_hand_out_of_reach_turns_the_shoulders_once():
+    jack = Contestant("Jack", id=1)
+    pose_engine = PoseEngine([jack])
+    skeleton = pose_engine._skeleton_map[jack][0]
+    rest = skeleton.locations[SHOULDER_ROWS].copy()
+    # left hand far out to the side
+    skeleton.locations[2] += skeleton.matrix_world[:3, 0] * 2
+    pose_engine.pose()
+
+    shoulders = skeleton.locations[SHOULDER_ROWS]
+    assert not np.allclose(shoulders, rest)
+    assert 0 < abs(pose_engine.limbs.twists[0, 0]) <= MAX_TWIST
+    assert np.allclose(jack._body_locations["shoulder_l"].data, shoulders[0])
+    # solving again starts from the untwisted shoulders
+    assert np.allclose(pose_engine.solve_limbs().roots[0, :2], shoulders)
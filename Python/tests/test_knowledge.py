@@ -0,0 +1,140 @@
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+import pytest
+from contestant import Contestant
+from combo_generator import attack_reach
+from knowledge import FenwickTree, KnowledgeBank, ReachIndex, WeightedDistribution
+
+
+def test_sampling_frequencies_match_the_weights():
+    weights = [1.0, 2.0, 3.0, 0.0, 4.0]
+    distribution = WeightedDistribution()
+    for key, weight in zip("abcde", weights):
+        distribution.add(key, weight)
+    draws = 20000
+    # evenly spaced uniforms land on each key in proportion to its weight
+    uniforms = (np.arange(draws) + 0.5) / draws
+    counts = {key: 0 for key in "abcde"}
+    for uniform in uniforms:
+        counts[distribution.sample(uniform)] += 1
+    expected = np.array(weights) / sum(weights)
+    assert np.allclose([counts[key] / draws for key in "abcde"], expected, atol=1e-3)
+    # and so do random ones, within sampling noise
+    counts = {key: 0 for key in "abcde"}
+    for uniform in np.random.default_rng(0).random(draws):
+        counts[distribution.sample(uniform)] += 1
+    assert counts["d"] == 0
+    assert np.allclose([counts[key] / draws for key in "abcde"], expected, atol=0.02)
+    # sampling from a position on only draws the keys from there
+    drawn = {distribution.sample(uniform, start=2) for uniform in uniforms[::100]}
+    assert drawn == {"c", "e"}
+
+
+def test_updates_keep_prefix_sums_consistent():
+    rng = np.random.default_rng(1)
+    weights = rng.random(37)
+    tree = FenwickTree(weights)
+    for _ in range(200):
+        index = int(rng.integers(len(weights)))
+        if rng.random() < 0.5:
+            # weights are never negative, find() relies on growing prefix sums
+            delta = rng.uniform(-weights[index], 0.5)
+            tree.add(index, delta)
+            weights[index] += delta
+        else:
+            weight = rng.random()
+            tree.set(index, weight)
+            weights[index] = weight
+        if rng.random() < 0.1:
+            weight = rng.random()
+            tree.append(weight)
+            weights = np.append(weights, weight)
+        sums = np.concatenate([[0.0], np.cumsum(weights)])
+        assert np.allclose([tree.prefix_sum(end) for end in range(len(sums))], sums)
+        assert tree.total() == pytest.approx(sums[-1])
+        target = rng.random() * sums[-1]
+        assert tree.find(target) == np.searchsorted(sums[1:], target, side="right")
+
+
+def test_reinforcements_decay_with_the_learn_rate():
+    learn_rate, decay = 0.5, 0.25
+    bank = KnowledgeBank(["jab", "hook"], learn_rate=learn_rate, learn_rate_decay=decay)
+    expected = {"jab": 1.0, "hook": 1.0}
+    for update, attack in enumerate(["jab", "hook", "jab", "jab", "hook", "jab"]):
+        assert bank.learn_rate() == pytest.approx(learn_rate / (1 + decay * update))
+        expected[attack] += learn_rate / (1 + decay * update)
+        bank.reinforce_attack(attack)
+    assert bank.updates == 6
+    assert bank.attacks.weight("jab") == pytest.approx(expected["jab"])
+    assert bank.attacks.weight("hook") == pytest.approx(expected["hook"])
+    assert bank.attacks.total() == pytest.approx(sum(expected.values()))
+    assert bank.attacks.total(start=1) == pytest.approx(expected["hook"])
+
+
+def test_contestant_passes_the_learn_rate_decay_on():
+    contestant = Contestant("Jack", id=1, learn_rate=0.5, learn_rate_decay=0.25)
+    contestant._knowledge.updates = 4
+    assert contestant._knowledge.learn_rate() == pytest.approx(0.5 / 2)
+
+
+def test_reach_index_matches_a_brute_force_scan():
+    rng = np.random.default_rng(2)
+    index = ReachIndex()
+    # attack -> (reach, id, when it was last inserted)
+    known = {}
+    insertions = 0
+    for inserted in range(300):
+        attack = f"attack{inserted}"
+        # few distinct reaches, so plenty of ties
+        reach = float(rng.integers(1, 12)) / 4
+        index.insert(attack, inserted, reach)
+        known[attack] = (reach, inserted, insertions)
+        insertions += 1
+        if inserted % 7 == 3:
+            dropped = str(rng.choice(index.attacks))
+            index.remove(dropped)
+            del known[dropped]
+        if inserted % 5 == 0:
+            moved = str(rng.choice(index.attacks))
+            reach = float(rng.integers(1, 12)) / 4
+            index.set_reach(moved, reach)
+            known[moved] = (reach, known[moved][1], insertions)
+            insertions += 1
+    # ordered by reach, ties in the order they were inserted
+    order = sorted(known, key=lambda attack: (known[attack][0], known[attack][2]))
+    assert index.attacks == order
+    assert index.reaches.tolist() == [known[attack][0] for attack in order]
+    assert index.ids.tolist() == [known[attack][1] for attack in order]
+    assert index.max_reach() == max(reach for reach, _, _ in known.values())
+    for distance in np.linspace(0, 3.5, 57):
+        reaches, ids = index.reaching(distance)
+        expected = [
+            known[attack][1] for attack in order if known[attack][0] >= distance
+        ]
+        assert ids.tolist() == expected
+        assert np.all(reaches >= distance)
+
+
+def test_contestant_attacks_stay_in_reach_order():
+    contestant = Contestant("Jack", id=1)
+    for reach in (0.2, 1.5, 0.9):
+        for body_part in list(contestant._range):
+            contestant.set_limb_range(body_part, reach)
+            attacks = contestant._reach_index.attacks
+            reaches = [attack_reach(attack, contestant._range) for attack in attacks]
+            assert contestant._reach_index.reaches.tolist() == reaches
+            assert reaches == sorted(reaches)
+            assert contestant._knowledge.attacks.keys == attacks
+            for distance in (0.0, 0.5, 1.0, 2.0):
+                start = contestant._reach_index.first_reaching(distance)
+                assert attacks[start:] == [
+                    attack
+                    for attack, reach in zip(attacks, reaches)
+                    if reach >= distance
+                ]
@@ -0,0 +1,59 @@
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+from action import AttackImpl, Range
+from common import BodyPart, Location
+from contestant import Contestant
+from lockstep import LockstepEngine, mismatched_matches, run_scalar
+
+# kicks with the right foot, which moves a row the victim aims its step at
+KICK_HEAD = AttackImpl(
+    target_body_locations={BodyPart.FOOT_R: Location.CHIN},
+    init_weight_distribution=(50, 50),
+    final_weight_distribution=(50, 50),
+    weight_distribution_necessity=0,
+    likely_vulnerabilites_after_execution=[],
+    range=Range.KICK,
+    tags=[],
+    name="test_kick_head",
+)
+
+
+def _matchups(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        [
+            {"name": "Jack", "reaction_time": int(rng.integers(4, 12))},
+            {"name": "Jill", "reaction_time": int(rng.integers(4, 12))},
+        ]
+        for _ in range(count)
+    ]
+
+
+def _check(matchups, time_limit):
+    seeds = list(range(len(matchups)))
+    result = LockstepEngine(matchups, seeds, time_limit=time_limit).run()
+    expected = run_scalar(matchups, seeds, time_limit=time_limit)
+    assert mismatched_matches(result, expected) == []
+
+
+def test_lockstep_matches_fight():
+    _check(_matchups(8), time_limit=3)
+
+
+def test_lockstep_aims_at_perceived_locations(monkeypatch):
+    # the victim's right foot moves, so where it is now and where the attacker saw it
+    # last differ
+    init = Contestant.__init__
+
+    def init_with_kick(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        self.learn_attack(KICK_HEAD)
+
+    monkeypatch.setattr(Contestant, "__init__", init_with_kick)
+    _check(_matchups(8, seed=1), time_limit=5)
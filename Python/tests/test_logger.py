@@ -0,0 +1,114 @@
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import json
+import logging
+import pytest
+import logger
+import tick_profiler
+from contestant import Contestant
+from logger import JsonlSink, get_logger, set_level, start_sink, stop_sink
+from tick_profiler import TickProfiler
+
+
+# every test gets its own subsystem levels and loggers, and leaves no sink running
+@pytest.fixture(autouse=True)
+def fresh_loggers(monkeypatch):
+    monkeypatch.setattr(logger, "_levels", {})
+    monkeypatch.setattr(logger, "_event_loggers", {})
+    monkeypatch.setattr(logger, "_default_level", logger.LEVELS["debug"])
+    console_level = logger.logger.level
+    yield
+    stop_sink()
+    logger.logger.setLevel(console_level)
+    for subsystem in logger._levels:
+        logger.logger.getChild(subsystem).setLevel(logging.NOTSET)
+
+
+def _read(path):
+    with open(path) as log_file:
+        return [json.loads(line) for line in log_file]
+
+
+def test_sink_writes_everything_queued_on_close(tmp_path):
+    path = tmp_path / "fight.jsonl"
+    # the writer thread wouldn't wake up on its own during the test
+    sink = JsonlSink(str(path), flush_interval=60)
+    for tick in range(1000):
+        sink.put((float(tick), "env", logger.LEVELS["info"], "tick %d", (tick,), {}))
+    sink.close()
+    events = _read(path)
+    assert [event["message"] for event in events] == [
+        f"tick {tick}" for tick in range(1000)
+    ]
+    assert sink.dropped == 0
+
+
+def test_events_go_through_the_sink(tmp_path):
+    path = tmp_path / "fight.jsonl"
+    start_sink(str(path))
+    log = get_logger("contestant")
+    log.info("%s chose %s", "Jack", ["jab"], tick=3)
+    log.debug("no arguments")
+    stop_sink()
+    first, second = _read(path)
+    assert first["subsystem"] == "contestant"
+    assert first["level"] == "INFO"
+    assert first["message"] == "Jack chose ['jab']"
+    assert first["fields"] == {"tick": 3}
+    assert second["message"] == "no arguments"
+
+
+def test_full_queue_drops_events(tmp_path):
+    sink = JsonlSink(str(tmp_path / "fight.jsonl"), queue_size=10, flush_interval=60)
+    for tick in range(25):
+        sink.put((0.0, "env", logger.LEVELS["info"], "tick", (), {}))
+    sink.close()
+    assert sink.dropped == 15
+    assert len(_read(tmp_path / "fight.jsonl")) == 10
+
+
+def test_subsystem_levels_filter_events(tmp_path):
+    path = tmp_path / "fight.jsonl"
+    start_sink(str(path))
+    set_level("warning")
+    set_level("debug", "pose_engine")
+    pose_log, env_log = get_logger("pose_engine"), get_logger("environment")
+    for log in (pose_log, env_log):
+        log.debug("debug")
+        log.info("info")
+        log.warning("warning")
+    # loggers made after the levels were set get them too
+    get_logger("contestant").info("info")
+    get_logger("contestant").error("error")
+    stop_sink()
+    logged = [(event["subsystem"], event["message"]) for event in _read(path)]
+    assert logged == [
+        ("pose_engine", "debug"),
+        ("pose_engine", "info"),
+        ("pose_engine", "warning"),
+        ("environment", "warning"),
+        ("contestant", "error"),
+    ]
+    assert not env_log.enabled_for(logger.LEVELS["info"])
+
+
+def test_profiler_times_queueing_events(tmp_path):
+    sink = start_sink(str(tmp_path / "fight.jsonl"))
+    profiler = TickProfiler()
+    profiler.begin([Contestant("Jack", id=1)], total_ticks=1)
+    profiler.start_tick(0)
+    log = get_logger("environment")
+    for _ in range(5):
+        log.info("queued")
+    profiler.stop()
+    profiler.end()
+    assert profiler.counts[0, tick_profiler.LOGGING].sum() == 5
+    # the sink is back to its own put once the fight is over
+    assert "put" not in vars(sink)
+    stop_sink()
+    assert len(_read(tmp_path / "fight.jsonl")) == 5
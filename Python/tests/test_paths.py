@@ -0,0 +1,17 @@
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+from paths import PathSet
+
+
+def test_progress_outside_the_path_stays_on_its_ends():
+    paths = PathSet()
+    paths.append([[0, 0, 0], [1, 0, 0]])
+    paths.append([[0, 0, 0], [1, 1, 0], [2, 0, 0]])
+    assert np.allclose(paths.evaluate(np.array([1.5, 1.5])), [[1, 0, 0], [2, 0, 0]])
+    assert np.allclose(paths.evaluate(np.array([-0.5, -0.5])), 0)
@@ -0,0 +1,59 @@
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+from action_table import ACTION_TABLE
+from perception import AmbiguityMap, similarity_matrix
+from random_streams import PERCEPTION_STREAM, RandomStream
+
+
+# action <action_id> is perceived as, one observation at a time from the dense
+# similarity matrix, keeping the <max_confusions> most similar actions
+def _misperceive_one(similarity, action_id, noise, uniform, max_confusions):
+    row = similarity[action_id].copy()
+    row[action_id] = 0.0
+    ids = np.argsort(-row, kind="stable")[:max_confusions]
+    weights = row[ids]
+    if weights.sum() <= 0:
+        return action_id
+    cumulative = 0.0
+    for confusion, weight in zip(ids, weights / weights.sum()):
+        cumulative += weight
+        if uniform < cumulative * noise and weight > 0:
+            return int(confusion)
+    return action_id
+
+
+def test_fixed_seed_misperceives_like_a_dense_scan():
+    max_confusions = 2
+    ambiguity_map = AmbiguityMap(ACTION_TABLE, max_confusions=max_confusions)
+    ids, probabilities = ambiguity_map.confusions()
+    # only the most similar actions of every action are kept
+    assert ids.shape == (len(ACTION_TABLE), max_confusions)
+    assert np.allclose(probabilities.sum(axis=1)[ids[:, 0] >= 0], 1.0)
+
+    rng = np.random.default_rng(5)
+    action_ids = rng.integers(len(ACTION_TABLE), size=500)
+    noise = rng.choice([0.0, 0.3, 1.0], size=500)
+    uniforms = RandomStream(11, 1, PERCEPTION_STREAM).uniforms(500)
+    perceived = ambiguity_map.misperceive(action_ids, noise, uniforms)
+
+    similarity = similarity_matrix(ACTION_TABLE)
+    expected = [
+        _misperceive_one(similarity, action_id, n, uniform, max_confusions)
+        for action_id, n, uniform in zip(action_ids, noise, uniforms)
+    ]
+    assert perceived.tolist() == expected
+    # nothing is mistaken without noise, and everything mistakable is at full noise
+    assert np.array_equal(perceived[noise == 0], action_ids[noise == 0])
+    mistakable = (ids[action_ids, 0] >= 0) & (noise == 1)
+    assert np.all(perceived[mistakable] != action_ids[mistakable])
+    # the same seed draws the same mistakes
+    again = RandomStream(11, 1, PERCEPTION_STREAM).uniforms(500)
+    assert np.array_equal(
+        ambiguity_map.misperceive(action_ids, noise, again), perceived
+    )
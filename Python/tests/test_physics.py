@@ -0,0 +1,58 @@
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+from common import BodyPart
+from physics import PhysicsStore
+
+MASSES = {BodyPart.HAND_L: 2.0, BodyPart.HAND_R: 2.0, BodyPart.HEAD: 5.0}
+
+
+def _store(delta=0.1):
+    store = PhysicsStore(delta)
+    positions = np.arange(9, dtype=np.float64).reshape(3, 3)
+    store.add_body(1, MASSES, positions)
+    store.add_body(2, MASSES, positions + 10)
+    return store
+
+
+def test_step_under_a_constant_force():
+    delta = 0.1
+    store = _store(delta)
+    rows = store.rows(1, [BodyPart.HEAD])
+    store.velocity[rows] = [[1.0, 0.0, -2.0]]
+    force = np.array([0.0, 0.0, -49.05])
+    store.set_force(rows, [force])
+    start = store.position[rows].copy()
+    store.step()
+    # semi-implicit Euler: velocity from the force first, position from the new one
+    velocity = np.array([1.0, 0.0, -2.0]) + force / MASSES[BodyPart.HEAD] * delta
+    assert np.allclose(store.velocity[rows], velocity)
+    assert np.allclose(store.position[rows], start + velocity * delta)
+    store.step()
+    second = velocity + force / MASSES[BodyPart.HEAD] * delta
+    assert np.allclose(store.velocity[rows], second)
+    assert np.allclose(store.position[rows], start + (velocity + second) * delta)
+
+
+def test_impulse_only_moves_its_row():
+    store = _store()
+    positions = store.position.copy()
+    velocities = store.velocity.copy()
+    row = store.rows(2, [BodyPart.HAND_R])
+    # rows may repeat, the impulses add up
+    store.apply_impulse(np.repeat(row, 2), [[1.0, 0.0, 0.0], [1.0, 0.5, 0.0]])
+    store.step()
+    others = np.arange(len(store)) != row[0]
+    assert np.array_equal(store.position[others], positions[others])
+    assert np.array_equal(store.velocity[others], velocities[others])
+    velocity = np.array([2.0, 0.5, 0.0]) / MASSES[BodyPart.HAND_R]
+    assert np.allclose(store.velocity[row], velocity)
+    assert np.allclose(store.position[row], positions[row] + velocity * store.delta)
+    # impulses only act on the step they were applied before
+    store.step()
+    assert np.allclose(store.velocity[row], velocity)
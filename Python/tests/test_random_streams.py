@@ -0,0 +1,42 @@
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+from random_streams import CHOICE_STREAM, RandomStream, stream_key, uniforms_at
+
+
+def _sequential(key, n):
+    return np.random.Generator(np.random.Philox(key=key)).random(n)
+
+
+def test_uniforms_at_matches_sequential_draws():
+    key = stream_key(12345, 2, CHOICE_STREAM)
+    expected = _sequential(key, 1100)
+    # positions on and off the 4 number steps of Philox, and across blocks
+    for start in (0, 1, 3, 4, 7, 255, 256, 257, 1000):
+        assert np.array_equal(
+            uniforms_at(key, start, 100), expected[start : start + 100]
+        )
+    assert np.array_equal(uniforms_at(key, np.int64(513), 5), expected[513:518])
+
+
+def test_stream_draws_in_order_across_blocks():
+    stream = RandomStream(7, 1, CHOICE_STREAM, block_size=16)
+    expected = _sequential(stream.key, 200)
+    drawn = [stream.uniform() for _ in range(10)]
+    drawn.extend(stream.uniforms(40))
+    drawn.extend(stream.uniform() for _ in range(50))
+    assert np.array_equal(drawn, expected[:100])
+    stream.seek(150)
+    assert np.array_equal(stream.uniforms(50), expected[150:200])
+
+
+def test_streams_differ_by_contestant_and_kind():
+    keys = [stream_key(0, 1, 0), stream_key(0, 2, 0), stream_key(0, 1, 1)]
+    draws = [uniforms_at(key, 0, 8) for key in keys]
+    assert not np.array_equal(draws[0], draws[1])
+    assert not np.array_equal(draws[0], draws[2])
@@ -0,0 +1,73 @@
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import pytest
+from contestant import Contestant
+from reaction_window import ReactionWindow
+
+
+# Contestant whose reaction draws always return <uniform> and who records the state of
+# every reaction instead of learning from it and choosing actions
+def _contestant(monkeypatch, reaction_time, uniform):
+    contestant = Contestant("Jack", id=1, reaction_time=reaction_time)
+    reacted_to = []
+    monkeypatch.setattr(contestant, "_draw_uniform", lambda stream: uniform)
+    monkeypatch.setattr(contestant, "_learn", lambda state: None)
+
+    def choose_actions(state):
+        reacted_to.append(state)
+        return []
+
+    monkeypatch.setattr(contestant, "choose_actions", choose_actions)
+    return contestant, reacted_to
+
+
+def test_steady_state_reacts_reaction_time_ticks_late(monkeypatch):
+    reaction_time = 6
+    # a coin flip of 0 never consumes more than it must to keep up
+    contestant, reacted_to = _contestant(monkeypatch, reaction_time, 0.0)
+    for tick in range(40):
+        reacted_to.clear()
+        contestant.update(tick)
+        if tick < reaction_time:
+            assert reacted_to == []
+        else:
+            assert reacted_to == [tick - reaction_time]
+    assert len(contestant._reaction_window) == reaction_time
+
+
+def test_reactions_are_clamped_to_the_window(monkeypatch):
+    # a coin flip of 2 on top of catching up asks for more states than are stored
+    contestant, _ = _contestant(monkeypatch, 1, 0.99)
+    for tick in range(5):
+        contestant._reaction_window.push(tick, tick)
+    assert contestant._get_num_reactions_this_step() == 5
+    contestant._reaction_window = ReactionWindow(Contestant.MAX_REACTION_TIME + 1)
+    contestant._reaction_window.push(0, 0)
+    assert contestant._get_num_reactions_this_step() == 1
+
+
+def test_window_is_not_consumed_below_the_min_reaction_time(monkeypatch):
+    contestant, _ = _contestant(monkeypatch, 8, 0.99)
+    for tick in range(3):
+        contestant._reaction_window.push(tick, tick)
+    assert contestant._get_num_reactions_this_step() == 0
+
+
+@pytest.mark.parametrize("uniform", [0.0, 0.5, 0.99])
+def test_max_reaction_time_never_drops_states(monkeypatch, uniform):
+    contestant, reacted_to = _contestant(
+        monkeypatch, Contestant.MAX_REACTION_TIME, uniform
+    )
+    ticks = 200
+    for tick in range(ticks):
+        contestant.update(tick)
+        assert len(contestant._reaction_window) <= Contestant.MAX_REACTION_TIME
+    assert contestant._reaction_window.dropped == 0
+    # every state is reacted to once, in the order it was perceived
+    still_waiting = len(contestant._reaction_window)
+    assert reacted_to == list(range(ticks - still_waiting))
@@ -0,0 +1,60 @@
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from sim_clock import FixedTimestepClock, resample_trace
+
+
+def _rotation_z(angle):
+    matrix = np.eye(4)
+    matrix[:2, :2] = [[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]]
+    return matrix
+
+
+def test_clock_ticks_and_wall_time():
+    assert FixedTimestepClock.total_ticks(0.1, 1.0) == 10
+    assert FixedTimestepClock.total_ticks(0.1, 0.95) == 10
+    assert FixedTimestepClock.total_ticks(0.25, 1.0) == 4
+    clock = FixedTimestepClock(0.1)
+    assert clock.advance(0.25) == 2
+    assert clock.alpha() == pytest.approx(0.5)
+    assert clock.advance(0.06) == 1
+    assert clock.alpha() == pytest.approx(0.1)
+    for _ in range(3):
+        clock.step()
+    assert clock.time == pytest.approx(0.3)
+    with pytest.raises(ValueError):
+        FixedTimestepClock(0)
+
+
+def test_resample_two_tick_trace_to_24_fps():
+    # one contestant whose ik targets move from the origin to (1, 2, 3) while the rig
+    # turns a quarter round the z axis and moves one unit along x
+    end = _rotation_z(np.pi / 2)
+    end[:3, 3] = [1.0, 0.0, 0.0]
+    trace = SimpleNamespace(
+        path="two_ticks",
+        ticks=2,
+        delta=0.1,
+        body_locations=np.stack(
+            [np.zeros((1, 8, 3)), np.broadcast_to([1.0, 2.0, 3.0], (1, 8, 3))]
+        ),
+        transforms=np.stack([np.eye(4)[None], end[None]]),
+    )
+    times, locations, transforms = resample_trace(trace, 24)
+    # the ticks are at 0.1s and 0.2s, the frames between them at 3/24s and 4/24s
+    assert np.allclose(times, [3 / 24, 4 / 24])
+    assert locations.shape == (2, 1, 8, 3)
+    assert transforms.shape == (2, 1, 4, 4)
+    for frame, time in enumerate(times):
+        t = (time - 0.1) / 0.1
+        assert np.allclose(locations[frame], t * np.array([1.0, 2.0, 3.0]))
+        expected = _rotation_z(t * np.pi / 2)
+        expected[:3, 3] = [t, 0.0, 0.0]
+        assert np.allclose(transforms[frame, 0], expected)
@@ -0,0 +1,115 @@
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+from action_list import Attack
+from action_table import action_id
+from collision import spheres_vs_boxes, swept_spheres_vs_boxes
+from common import BodyPart, Vec3
+from contestant import ConcreteAction, Contestant
+from environment import Environment, _strike_locations
+
+# steps a sweep is sampled at to check it
+SAMPLES = 2001
+
+
+def _random_sweeps(rng, count):
+    starts = rng.uniform(-1.5, 1.5, (count, 3))
+    ends = rng.uniform(-1.5, 1.5, (count, 3))
+    radii = rng.uniform(0.05, 0.3, count)
+    angles = rng.uniform(-np.pi, np.pi, count)
+    rotations = np.zeros((count, 3, 3))
+    rotations[:, 0, 0] = rotations[:, 1, 1] = np.cos(angles)
+    rotations[:, 0, 1], rotations[:, 1, 0] = -np.sin(angles), np.sin(angles)
+    rotations[:, 2, 2] = 1
+    half_extents = rng.uniform(0.1, 0.6, (count, 3))
+    return starts, ends, radii, rotations, half_extents
+
+
+def test_swept_matches_densely_sampled_spheres():
+    rng = np.random.default_rng(0)
+    starts, ends, radii, rotations, half_extents = _random_sweeps(rng, 300)
+    centers = np.zeros((300, 3))
+    hits, times_of_impact = swept_spheres_vs_boxes(
+        starts, ends, radii, centers, rotations, half_extents
+    )
+
+    t = np.linspace(0, 1, SAMPLES)
+    for n in range(300):
+        path = starts[n] + t[:, np.newaxis] * (ends[n] - starts[n])
+        touching = spheres_vs_boxes(
+            path,
+            np.full(SAMPLES, radii[n]),
+            centers[n : n + 1],
+            rotations[n : n + 1],
+            half_extents[n : n + 1],
+        )[:, 0]
+        if touching.any():
+            assert hits[n]
+            first = t[np.argmax(touching)]
+            assert first - 1 / (SAMPLES - 1) <= times_of_impact[n] <= first
+        elif hits[n]:
+            # touches between two samples only, barely
+            assert np.isfinite(times_of_impact[n])
+        else:
+            assert times_of_impact[n] == np.inf
+
+
+def test_fast_sphere_through_box_hits_between_samples():
+    # both ends are well clear of the box, the middle of the sweep is inside it
+    hits, times_of_impact = swept_spheres_vs_boxes(
+        np.array([-2.0, 0, 0]),
+        np.array([2.0, 0, 0]),
+        0.05,
+        np.zeros(3),
+        np.eye(3),
+        np.full(3, 0.1),
+    )
+    assert hits
+    assert np.isclose(times_of_impact, (2 - 0.15) / 4)
+
+
+def _fighters():
+    jack, jill = Contestant("Jack", id=1), Contestant("Jill", id=2)
+    env = Environment({jack: 1, jill: 2}, pose_backend="headless")
+    return jack, jill, env
+
+
+# move jack's left hand from <start> to <end> during a jab and return the hits
+def _jab(env, jack, start, end, action=None):
+    action = action or ConcreteAction(Attack["JAB_HEAD"], [])
+    sweep_starts = _strike_locations(jack)
+    sweep_starts[BodyPart.HAND_L] = np.array(start, dtype=np.float64)
+    jack._body_locations["hand_l"] = Vec3(end)
+    env._update_proxies(jack, sweep_starts)
+    return env._calculate_hits(jack, {BodyPart.HAND_L: action}, sweep_starts)
+
+
+def test_strike_lands_once_while_the_limb_stays_in_the_box():
+    jack, jill, env = _fighters()
+    head = jill._body_locations["head"].data
+    outside, inside = head + [0.5, 0, 0], head + [0.05, 0, 0]
+
+    hits = _jab(env, jack, outside, inside)
+    assert len(hits) == 1 and 0 < hits[0].time_of_impact < 1
+    # the hit carries the id of the action, names aren't unique
+    assert hits[0].action_id == action_id(Attack["JAB_HEAD"])
+    # a new jab starting in the box, still touching the head, doesn't land again
+    deeper = head + [0.01, 0, 0]
+    assert _jab(env, jack, inside, deeper) == []
+    assert _jab(env, jack, deeper, deeper) == []
+    # pulled out and back in, it lands again
+    assert _jab(env, jack, deeper, outside) == []
+    assert len(_jab(env, jack, outside, inside)) == 1
+
+
+def test_limb_resting_in_a_box_does_not_strike():
+    jack, jill, env = _fighters()
+    head = jill._body_locations["head"].data
+    inside = head + [0.05, 0, 0]
+    # already touching and not moving towards the box
+    assert _jab(env, jack, inside, inside + [0.02, 0, 0]) == []
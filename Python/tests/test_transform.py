@@ -0,0 +1,50 @@
+import sys
+import os
+
+dir = os.path.dirname(os.path.dirname(__file__))
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import numpy as np
+from common import Transform, Vec3, global_to_local, local_to_global
+
+
+# rigid transform turning <angle> around the z axis, then moving by <offset>
+def _matrix(angle, offset):
+    matrix = np.eye(4)
+    matrix[:2, :2] = [[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]]
+    matrix[:3, 3] = offset
+    return matrix
+
+
+def test_set_invalidates_the_cached_inverse():
+    first = _matrix(0.3, [1.0, 2.0, 3.0])
+    transform = Transform(first)
+    inverse = transform.inverse
+    assert transform.inverse is inverse
+    # the same values keep the cache, even from another array
+    transform.set(first.copy())
+    assert transform.inverse is inverse
+    second = _matrix(-1.2, [0.5, -4.0, 2.0])
+    transform.set(second)
+    assert transform.inverse is not inverse
+    assert np.allclose(transform.inverse, np.linalg.inv(second))
+    # the transform keeps its own copy of the matrix
+    second[0, 3] = 100.0
+    assert transform.matrix[0, 3] == 0.5
+
+
+def test_to_local_matches_the_inverse_matrix():
+    matrix = _matrix(2.1, [-3.0, 0.25, 1.5])
+    # a scaled transform too, so the inverse isn't just the transpose
+    matrix[:3, :3] *= 1.7
+    transform = Transform(matrix)
+    points = np.random.default_rng(0).normal(size=(50, 3))
+    homogeneous = np.hstack([points, np.ones((50, 1))])
+    expected = (homogeneous @ np.linalg.inv(matrix).T)[:, :3]
+    assert np.allclose(transform.to_local(points), expected)
+    assert np.allclose(transform.to_local(points[7]), expected[7])
+    assert np.allclose(transform.to_global(transform.to_local(points)), points)
+    local = global_to_local(Vec3(points[3]), transform)
+    assert np.allclose(local.data, expected[3])
+    assert np.allclose(local_to_global(local, matrix).data, points[3])
@@ -0,0 +1,167 @@
+"""
+Opt-in wall time profiler for the fight loop. Pass a TickProfiler to fight() and every
+stage of every tick is timed into preallocated arrays:
+    times   float64 (ticks, stages, contestants + 1)  seconds spent in each stage
+    counts  int64   (ticks, stages, contestants + 1)  times each stage ran
+The last contestant column holds stages that don't run for a single contestant.
+Stage times include the stages nested in them (e.g. pose_engine.update is part of
+environment.update). Time spent in log handlers, or queueing events for the JSONL sink,
+is its own stage, wherever it happens.
+
+When the fight ends the profiler logs a summary table and, if given a path, writes a
+collapsed stack file ("fight;tick;environment.update;pose_engine.update 1234" per line,
+self time in microseconds) that flamegraph.pl, speedscope or inferno can read.
+
+The instrumented code only checks tick_profiler.active, so a fight without a profiler
+pays one attribute lookup per stage.
+"""
+
+import sys
+import os
+
+dir = os.path.dirname(__file__)
+if not dir in sys.path:
+    sys.path.append(dir)
+
+import time
+import numpy as np
+from logger import logger, current_sink
+
+TICK = 0
+CONTESTANT_UPDATE = 1
+CHOOSE_ACTIONS = 2
+ENVIRONMENT_UPDATE = 3
+POSE_ENGINE_UPDATE = 4
+HIT_DETECTION = 5
+CURRENT_STATE = 6
+RECORDER = 7
+LOGGING = 8
+STAGE_NAMES = [
+    "tick",
+    "contestant.update",
+    "choose_actions",
+    "environment.update",
+    "pose_engine.update",
+    "hit_detection",
+    "current_state",
+    "recorder",
+    "logging",
+]
+
+# profiler of the fight running right now, None if it isn't profiled
+active = None
+
+
+class TickProfiler:
+    def __init__(self, collapsed_path=None):
+        self.collapsed_path = collapsed_path
+        self.times = np.zeros((0, len(STAGE_NAMES), 1))
+        self.counts = np.zeros((0, len(STAGE_NAMES), 1), dtype=np.int64)
+        self.contestant_names = []
+        self.tick = 0
+        self._slots = {}
+        # [stage, slot, start time, time of the stages nested in it]
+        self._stack = []
+        # stage names from the root down -> self time
+        self._self_times = {}
+        # (object, method name) of every logging method wrapped to be timed
+        self._timed_methods = []
+
+    # called by fight() before the first tick
+    def begin(self, contestants, total_ticks):
+        C = len(contestants)
+        self.times = np.zeros((total_ticks, len(STAGE_NAMES), C + 1))
+        self.counts = np.zeros((total_ticks, len(STAGE_NAMES), C + 1), dtype=np.int64)
+        self.contestant_names = [contestant.name for contestant in contestants]
+        self._slots = {
+            contestant.id: slot for slot, contestant in enumerate(contestants)
+        }
+        self._stack = []
+        self._self_times = {}
+        self._time_log_handlers()
+
+    def start_tick(self, tick):
+        self.tick = tick
+        self.start(TICK)
+
+    # start timing <stage>, for the contestant with id <contestant_id> if given
+    def start(self, stage, contestant_id=None):
+        slot = self._slots.get(contestant_id, len(self._slots))
+        self._stack.append([stage, slot, time.perf_counter(), 0.0])
+
+    # stop timing the stage started last
+    def stop(self):
+        stage, slot, start, nested = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        if self.tick < len(self.times):
+            self.times[self.tick, stage, slot] += elapsed
+            self.counts[self.tick, stage, slot] += 1
+        if self._stack:
+            self._stack[-1][3] += elapsed
+        path = tuple(entry[0] for entry in self._stack) + (stage,)
+        self._self_times[path] = self._self_times.get(path, 0.0) + elapsed - nested
+
+    # called by fight() when the fight ends, even if it ended with an exception
+    def end(self):
+        while self._stack:
+            self.stop()
+        self._restore_log_handlers()
+        logger.info("\n" + self.summary())
+        if self.collapsed_path:
+            self.write_collapsed(self.collapsed_path)
+
+    # table of the total time, calls and time per call of every stage, per contestant
+    def summary(self):
+        columns = self.contestant_names + ["(shared)"]
+        lines = [
+            f"{'stage':<20} {'contestant':<12} {'total ms':>10} {'calls':>8} "
+            f"{'us/call':>9} {'% of ticks':>10}"
+        ]
+        total_time = self.times[:, TICK].sum()
+        stage_times = self.times.sum(axis=0)
+        stage_counts = self.counts.sum(axis=0)
+        for stage, name in enumerate(STAGE_NAMES):
+            for slot, column in enumerate(columns):
+                calls = stage_counts[stage, slot]
+                if not calls:
+                    continue
+                seconds = stage_times[stage, slot]
+                share = 100 * seconds / total_time if total_time else 0.0
+                lines.append(
+                    f"{name:<20} {column[:12]:<12} {seconds * 1e3:>10.3f} {calls:>8} "
+                    f"{seconds * 1e6 / calls:>9.1f} {share:>10.1f}"
+                )
+        return "\n".join(lines)
+
+    def write_collapsed(self, path):
+        with open(path, "w") as collapsed_file:
+            for stages, seconds in sorted(self._self_times.items()):
+                stack = ";".join(["fight"] + [STAGE_NAMES[stage] for stage in stages])
+                collapsed_file.write(f"{stack} {max(round(seconds * 1e6), 0)}\n")
+
+    # time every record the fight logs as it is handled, or as it is queued when
+    # events go to a JSONL sink
+    def _time_log_handlers(self):
+        for handler in logger.handlers:
+            self._time_method(handler, "handle")
+        sink = current_sink()
+        if sink is not None:
+            self._time_method(sink, "put")
+
+    def _time_method(self, owner, name):
+        method = getattr(owner, name)
+
+        def timed(*args, method=method):
+            self.start(LOGGING)
+            try:
+                return method(*args)
+            finally:
+                self.stop()
+
+        setattr(owner, name, timed)
+        self._timed_methods.append((owner, name))
+
+    def _restore_log_handlers(self):
+        for owner, name in self._timed_methods:
+            delattr(owner, name)
+        self._timed_methods = []